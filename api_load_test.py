@@ -0,0 +1,176 @@
+"""
+Load test for api_server.py: uploads a dataset, then has N concurrent clients
+call the profile and query endpoints for a fixed time and reports requests/sec
+and latency percentiles per endpoint.
+
+Queries are sent as SQL (the generic ones benchmark.py uses), so no LLM calls
+are made and the numbers measure the server itself.
+
+    python api_load_test.py --spawn                           # starts a server for the run
+    python api_load_test.py --url http://127.0.0.1:8765 --clients 16 --duration 30 --file big.csv
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+import numpy as np
+
+from benchmark import benchmark_queries
+from synthetic_data import PROFILES, generate_dataset, write_dataset
+
+
+def request(url, method="GET", body=None, content_type="application/json", timeout=300):
+    """(status, decoded JSON or raw bytes, seconds) for one request."""
+    if isinstance(body, (dict, list)):
+        body = json.dumps(body).encode("utf-8")
+    req = urllib.request.Request(url, data=body, method=method)
+    if body is not None:
+        req.add_header("Content-Type", content_type)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            status, payload, kind = response.status, response.read(), response.headers.get_content_type()
+    except urllib.error.HTTPError as e:
+        status, payload, kind = e.code, e.read(), e.headers.get_content_type()
+    seconds = time.perf_counter() - start
+    if kind == "application/json":
+        payload = json.loads(payload)
+    return status, payload, seconds
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(workers=None):
+    """Starts api_server.py on a free local port; returns (process, base url) once it answers."""
+    port = _free_port()
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "api_server.py"),
+               "--port", str(port)]
+    if workers:
+        command += ["--workers", str(workers)]
+    process = subprocess.Popen(command)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if request(f"{url}/health", timeout=2)[0] == 200:
+                return process, url
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("api_server.py did not start within 60s")
+
+
+def upload(url, path):
+    with open(path, "rb") as f:
+        data = f.read()
+    name = os.path.basename(path)
+    status, payload, seconds = request(f"{url}/datasets?name={name}", "POST", data,
+                                       content_type="application/octet-stream")
+    if status not in (200, 201):
+        raise RuntimeError(f"upload failed ({status}): {payload}")
+    return payload, seconds
+
+
+def run_load(url, dataset_id, queries, clients, duration, profile_share=0.3):
+    """
+    Runs ``clients`` threads for ``duration`` seconds; each picks the profile
+    endpoint with probability profile_share and otherwise one of ``queries``.
+    Returns {endpoint: {"latencies": [...], "errors": n}}.
+    """
+    stats = defaultdict(lambda: {"latencies": [], "errors": 0})
+    stats_lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(seed):
+        rng = np.random.default_rng(seed)
+        while time.perf_counter() < stop_at:
+            if not queries or rng.random() < profile_share:
+                endpoint = "profile"
+                status, _, seconds = request(f"{url}/datasets/{dataset_id}/profile")
+            else:
+                endpoint = "query"
+                sql = queries[rng.integers(len(queries))]
+                status, _, seconds = request(f"{url}/datasets/{dataset_id}/query", "POST",
+                                             {"sql": sql, "limit": 100})
+            with stats_lock:
+                if status == 200:
+                    stats[endpoint]["latencies"].append(seconds)
+                else:
+                    stats[endpoint]["errors"] += 1
+
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return dict(stats)
+
+
+def print_results(stats, duration):
+    print(f"\n{'endpoint':<10} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    total = 0
+    for endpoint, row in sorted(stats.items()):
+        latencies = np.array(row["latencies"]) * 1000
+        total += len(latencies)
+        if len(latencies):
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        else:
+            p50 = p95 = p99 = float("nan")
+        print(f"{endpoint:<10} {len(latencies):>9} {row['errors']:>7} {len(latencies) / duration:>8.1f} "
+              f"{p50:>8.1f} {p95:>8.1f} {p99:>8.1f}")
+    print(f"{'total':<10} {total:>9} {'':>7} {total / duration:>8.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure api_server.py throughput and latency.")
+    parser.add_argument("--url", default="http://127.0.0.1:8765", help="Base URL of a running server.")
+    parser.add_argument("--spawn", action="store_true", help="Start a server on a free port for the run.")
+    parser.add_argument("--server-workers", type=int, default=None, help="--workers for the spawned server.")
+    parser.add_argument("--file", default=None, help="CSV/XLSX to upload (default: a synthetic dataset).")
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows of the synthetic dataset.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="lung")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent client threads.")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load.")
+    args = parser.parse_args(argv)
+
+    process = None
+    url = args.url.rstrip("/")
+    with tempfile.TemporaryDirectory(prefix="dw-load-") as data_dir:
+        try:
+            if args.spawn:
+                process, url = spawn_server(args.server_workers)
+            path = args.file or write_dataset(generate_dataset(args.rows, args.profile),
+                                              os.path.join(data_dir, f"{args.profile}_{args.rows}.csv"))
+            dataset, seconds = upload(url, path)
+            print(f"Uploaded {os.path.basename(path)}: {dataset['rows']:,} rows in {seconds:.2f}s")
+            # A second upload of the same bytes is answered from the dataset store
+            _, seconds = upload(url, path)
+            print(f"Re-upload (cached): {seconds:.3f}s")
+
+            _, eda, _ = request(f"{url}/datasets/{dataset['id']}/profile")
+            queries = benchmark_queries(eda)
+            print(f"Running {args.clients} clients for {args.duration:.0f}s against {url} ...")
+            stats = run_load(url, dataset["id"], queries, args.clients, args.duration)
+            print_results(stats, args.duration)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+    return 0 if all(row["errors"] == 0 for row in stats.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+"""
+Local HTTP API for Data Whisperer's profiling, DataPeek and report export,
+for tools that want them without Streamlit's rerun-per-interaction model.
+
+Datasets are loaded through the shared dataset store (dataset_store.py), so
+uploading the same file twice, or a file the Streamlit app already has open in
+this process, doesn't clean and profile it again. Profiling and queries run on a
+fixed pool of worker threads; reports go through the report job queue
+(report_jobs.py) and are polled for.
+
+    python api_server.py --port 8765 --workers 4
+
+Endpoints (JSON in and out unless noted):
+
+    GET    /health                          store and worker pool status
+    POST   /datasets?name=sales.csv[&sheet=S]
+                                            body: the raw CSV/XLSX bytes -> {"id", "rows", ...}
+    GET    /datasets                        loaded datasets
+    GET    /datasets/<id>                   one dataset's summary
+    DELETE /datasets/<id>                   unloads it
+    GET    /datasets/<id>/profile           the enhanced_eda_json profile
+    POST   /datasets/<id>/query             {"question": "..."} or {"sql": "SELECT ..."},
+                                            optional "limit" (rows returned, default 1000)
+    POST   /datasets/<id>/reports           {"kind": "pptx" | "html", ...builder options} -> {"job_id"}
+    GET    /reports/<job_id>                job status and progress
+    GET    /reports/<job_id>/file           the finished report (binary)
+
+Queries given as "sql" run as is against the table "dataset" (DuckDB, no file
+system access); "question"s go through generate_sql_query like DataPeek does.
+The server has no authentication and binds to localhost by default.
+"""
+import os
+import sys
+import json
+import logging
+import uuid
+import argparse
+import threading
+import contextvars
+from http import HTTPStatus
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import perf
+import report_jobs
+import dataset_store
+from outlier_index import match_outlier_query
+from smart_query import generate_sql_query, execute_sql_on_df
+
+API_WORKERS = min(4, os.cpu_count() or 1)
+# Requests waiting for a worker beyond this many are turned away with 503
+MAX_QUEUED_REQUESTS = 64
+REQUEST_TIMEOUT_SECONDS = 300
+MAX_UPLOAD_BYTES = int(os.environ.get("DW_API_MAX_UPLOAD_MB", "200")) * 1024 * 1024
+DEFAULT_QUERY_LIMIT = 1000
+# Builder options a client may set, per report kind
+REPORT_OPTIONS = {"pptx": ("image_format", "dpi", "max_dimension"), "html": ("plotlyjs",)}
+REPORT_MIME = {
+    "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "html": "text/html; charset=utf-8",
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+_pool = None
+_pending = None
+_pool_lock = threading.Lock()
+# Dataset handles held by the API, by store key; each keeps its dataset in the store
+_datasets = {}
+_datasets_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool, _pending
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=API_WORKERS, thread_name_prefix="api")
+            _pending = threading.BoundedSemaphore(API_WORKERS + MAX_QUEUED_REQUESTS)
+    return _pool, _pending
+
+
+def run_in_pool(func, *args):
+    """Runs func on the worker pool and waits for it, keeping the caller's perf run."""
+    pool, pending = _get_pool()
+    if not pending.acquire(blocking=False):
+        raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, "server busy, try again later")
+    try:
+        future = pool.submit(contextvars.copy_context().run, func, *args)
+        return future.result(timeout=REQUEST_TIMEOUT_SECONDS)
+    except FutureTimeout:
+        raise ApiError(HTTPStatus.GATEWAY_TIMEOUT, "request timed out")
+    finally:
+        pending.release()
+
+
+def _dataset_summary(handle):
+    return {
+        "id": handle.key,
+        "name": handle.file_name,
+        "rows": int(handle.df.shape[0]),
+        "columns": [str(col) for col in handle.df.columns],
+        "fingerprint": handle.fingerprint,
+    }
+
+
+def _get_handle(dataset_id):
+    with _datasets_lock:
+        handle = _datasets.get(dataset_id)
+    if handle is None:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"unknown dataset {dataset_id}")
+    return handle
+
+
+def load_dataset(data, file_name, sheet_name=None):
+    """Returns (summary, created) for uploaded file bytes."""
+    if not file_name.lower().endswith((".csv", ".xlsx")):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "name must end in .csv or .xlsx")
+    key = dataset_store.content_key(data, sheet_name)
+    with _datasets_lock:
+        handle = _datasets.get(key)
+    if handle is not None:
+        return _dataset_summary(handle), False
+    handle = dataset_store.acquire(data, file_name, sheet_name)
+    if handle is None:
+        raise ApiError(HTTPStatus.UNPROCESSABLE_ENTITY, "could not read or clean the file (see server log)")
+    with _datasets_lock:
+        existing = _datasets.setdefault(key, handle)
+    if existing is not handle:
+        # Another request uploaded the same content meanwhile
+        handle.release()
+    return _dataset_summary(existing), existing is handle
+
+
+def unload_dataset(dataset_id):
+    with _datasets_lock:
+        handle = _datasets.pop(dataset_id, None)
+    if handle is None:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"unknown dataset {dataset_id}")
+    handle.release()
+
+
+def run_query(handle, question=None, sql=None, limit=DEFAULT_QUERY_LIMIT):
+    """DataPeek for the API: the matching rows (up to limit) and the SQL that selected them."""
+    outlier_match = match_outlier_query(question, handle.outlier_index) if question else None
+    if outlier_match:
+        col, method = outlier_match
+        result = handle.outlier_index.rows(handle.df, col, method)
+        sql = None
+    else:
+        if sql is None:
+            sql = generate_sql_query(question, handle.eda)
+        import duckdb
+        try:
+            result = execute_sql_on_df(handle.df, sql, handle.eda, raise_errors=True)
+        except duckdb.Error as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"query failed: {e}")
+    page = result.head(limit)
+    return {
+        "sql": sql,
+        "outlier_match": list(outlier_match) if outlier_match else None,
+        "row_count": int(len(result)),
+        "truncated": len(result) > limit,
+        "columns": [str(col) for col in result.columns],
+        "rows": json.loads(page.to_json(orient="records", date_format="iso")),
+    }
+
+
+def submit_report(handle, options):
+    kind = options.pop("kind", "pptx")
+    if kind not in report_jobs.REPORT_BUILDERS:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"kind must be one of {', '.join(report_jobs.REPORT_BUILDERS)}")
+    unknown = sorted(set(options) - set(REPORT_OPTIONS[kind]))
+    if unknown:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"unsupported {kind} option(s): {', '.join(unknown)}")
+    stem = os.path.splitext(handle.file_name)[0]
+    return report_jobs.submit_report(handle.eda, handle.df, handle.fingerprint, handle.file_name,
+                                     file_name=f"{stem}_EDA_Report.{kind}", label=f"Download {kind.upper()}",
+                                     report_options=options, kind=kind)
+
+
+def _job_status(job):
+    status = {key: value for key, value in job.items() if key != "result"}
+    status["progress"] = round(report_jobs.progress_fraction(job), 3)
+    return status
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "DataWhispererAPI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logging.debug("%s - %s", self.address_string(), format % args)
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        if content_type == "application/json":
+            body = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_UPLOAD_BYTES:
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                           f"body over the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit")
+        self._body_read = True
+        return self.rfile.read(length) if length else b""
+
+    def _send_error(self, status, message):
+        headers = None
+        if not self._body_read and int(self.headers.get("Content-Length") or 0):
+            # The unread body is still in the socket and would be parsed as the
+            # next request on this keep-alive connection, so close it instead
+            self.close_connection = True
+            headers = {"Connection": "close"}
+        self._send(status, {"error": message}, headers=headers)
+
+    def _read_json(self):
+        body = self._read_body()
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "body must be JSON")
+        if not isinstance(payload, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "body must be a JSON object")
+        return payload
+
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        # One run per request, named after the endpoint
+        endpoint = '-'.join(parts[:1] + parts[2:3]) or 'root'
+        perf.begin_run(f"api-{method.lower()}-{endpoint}-{uuid.uuid4().hex[:8]}")
+        self._body_read = False
+        try:
+            self._route(method, parts, query)
+        except ApiError as e:
+            self._send_error(e.status, str(e))
+        except Exception as e:
+            logging.exception(f"{method} {self.path} failed")
+            self._send_error(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+
+    def _route(self, method, parts, query):
+        if parts == ["health"] and method == "GET":
+            return self._send(HTTPStatus.OK, {
+                "status": "ok",
+                "workers": API_WORKERS,
+                "datasets": len(_datasets),
+                "store": dataset_store.stats(),
+            })
+
+        if parts == ["datasets"]:
+            if method == "GET":
+                with _datasets_lock:
+                    handles = list(_datasets.values())
+                return self._send(HTTPStatus.OK, [_dataset_summary(handle) for handle in handles])
+            if method == "POST":
+                if "name" not in query:
+                    raise ApiError(HTTPStatus.BAD_REQUEST, "the file name is required (?name=data.csv)")
+                data = self._read_body()
+                if not data:
+                    raise ApiError(HTTPStatus.BAD_REQUEST, "empty body; send the file's bytes")
+                summary, created = run_in_pool(load_dataset, data, os.path.basename(query["name"]),
+                                               query.get("sheet"))
+                return self._send(HTTPStatus.CREATED if created else HTTPStatus.OK, summary)
+
+        if len(parts) >= 2 and parts[0] == "datasets":
+            handle = _get_handle(parts[1])
+            action = parts[2] if len(parts) == 3 else None
+            if action is None and len(parts) == 2:
+                if method == "GET":
+                    return self._send(HTTPStatus.OK, _dataset_summary(handle))
+                if method == "DELETE":
+                    unload_dataset(handle.key)
+                    return self._send(HTTPStatus.OK, {"deleted": handle.key})
+            if action == "profile" and method == "GET":
+                return self._send(HTTPStatus.OK, handle.eda)
+            if action == "query" and method == "POST":
+                payload = self._read_json()
+                question, sql = payload.get("question"), payload.get("sql")
+                if not isinstance(question or sql, str) or (question and sql):
+                    raise ApiError(HTTPStatus.BAD_REQUEST, 'give either "question" or "sql" (a string)')
+                try:
+                    limit = int(payload.get("limit", DEFAULT_QUERY_LIMIT))
+                except (TypeError, ValueError):
+                    raise ApiError(HTTPStatus.BAD_REQUEST, '"limit" must be an integer')
+                return self._send(HTTPStatus.OK, run_in_pool(run_query, handle, question, sql, max(limit, 0)))
+            if action == "reports" and method == "POST":
+                job_id = submit_report(handle, self._read_json())
+                return self._send(HTTPStatus.ACCEPTED, {"job_id": job_id},
+                                  headers={"Location": f"/reports/{job_id}"})
+
+        if len(parts) in (2, 3) and parts[0] == "reports" and method == "GET":
+            job = report_jobs.get_job(parts[1])
+            if job is None:
+                raise ApiError(HTTPStatus.NOT_FOUND, f"unknown report job {parts[1]}")
+            if len(parts) == 2:
+                return self._send(HTTPStatus.OK, _job_status(job))
+            if parts[2] == "file":
+                if job["status"] != report_jobs.DONE:
+                    raise ApiError(HTTPStatus.CONFLICT, f"report is {job['status']}")
+                return self._send(HTTPStatus.OK, job["result"], content_type=REPORT_MIME[job["kind"]],
+                                  headers={"Content-Disposition": f'attachment; filename="{job["file_name"]}"'})
+
+        raise ApiError(HTTPStatus.NOT_FOUND, f"no route for {method} {urlparse(self.path).path}")
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+
+def make_server(host="127.0.0.1", port=8765):
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    global API_WORKERS
+    parser = argparse.ArgumentParser(description="Serve Data Whisperer's profiling, query and report API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="Threads profiling and querying.")
+    args = parser.parse_args(argv)
+
+    API_WORKERS = max(1, args.workers)
+    server = make_server(args.host, args.port)
+    logging.info(f"Data Whisperer API on http://{args.host}:{server.server_port} ({API_WORKERS} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
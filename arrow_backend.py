@@ -0,0 +1,113 @@
+import os
+import logging
+
+import pandas as pd
+
+# Opt-in Arrow-backed data mode (DW_ARROW=1). Text columns are held as Arrow
+# string arrays instead of NumPy arrays of Python str objects, which lets them
+# cross into and out of DuckDB without being converted:
+#
+# - CSVs are parsed by pyarrow and the text columns keep the parsed buffers.
+# - DataPeek queries register the frame with DuckDB as an Arrow table (a
+#   zero-copy view of those buffers) and read the result back as Arrow, so
+#   neither side materialises a Python object per cell.
+#
+# Numeric and datetime columns stay NumPy-backed: cleaning and profiling rely on
+# reductions (skew, kurtosis, histograms) that pandas' ArrowDtype doesn't
+# support yet, and DuckDB already scans NumPy columns without copying.
+#
+# The mode is process-wide because the dataset store shares frames between
+# sessions. It needs pyarrow; if that can't be imported the default NumPy path
+# is used and a warning is logged.
+ENABLED = os.environ.get("DW_ARROW") == "1"
+# "pyarrow_numpy" strings use NaN for missing values and return NumPy results
+# from string methods, so they behave like the object columns they replace
+STRING_DTYPE = "string[pyarrow_numpy]"
+
+_available = None
+
+
+def available():
+    """Whether pyarrow can be imported (checked once)."""
+    global _available
+    if _available is None:
+        try:
+            import pyarrow  # noqa: F401
+            _available = True
+        except Exception as e:
+            logging.warning(f"Arrow-backed mode unavailable, using NumPy-backed frames: {e}")
+            _available = False
+    return _available
+
+
+def enabled():
+    return ENABLED and available()
+
+
+def _types_mapper(arrow_type):
+    import pyarrow as pa
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.StringDtype("pyarrow_numpy")
+    return None
+
+
+def to_arrow(df):
+    """
+    df as a pyarrow Table. Arrow string columns and NumPy numeric columns are
+    wrapped without copying; object columns are converted.
+    """
+    import pyarrow as pa
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def from_arrow(table):
+    """
+    A frame for a pyarrow Table: text columns stay Arrow-backed, everything else
+    becomes NumPy-backed the way pandas' own readers would produce it.
+    """
+    import pyarrow as pa
+    # Without the pandas metadata from_pandas() stores, the dtypes are chosen
+    # here rather than restored
+    table = table.replace_schema_metadata(None)
+    # DuckDB returns SUM()s and the like as decimals, which would come back as
+    # Python Decimal objects, and all-empty columns would be None objects
+    # where pandas' readers give float NaN
+    for i, field in enumerate(table.schema):
+        if pa.types.is_decimal(field.type) or pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+    return table.to_pandas(types_mapper=_types_mapper, date_as_object=False)
+
+
+def arrow_strings(df):
+    """Converts df's all-string object columns to Arrow strings (e.g. after an Excel read)."""
+    for col in df.columns:
+        if pd.api.types.is_object_dtype(df[col]) and pd.api.types.infer_dtype(df[col], skipna=True) == "string":
+            df[col] = df[col].astype(STRING_DTYPE)
+    return df
+
+
+def _unique_names(names):
+    # Repeated headers get pd.read_csv's ".1", ".2", ... suffixes
+    seen = {}
+    unique = []
+    for name in names:
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        unique.append(f"{name}.{count}" if count else name)
+    return unique
+
+
+def read_csv(file):
+    """
+    A CSV parsed by pyarrow and converted to a frame once, keeping the parsed
+    text buffers. Missing values are read the way pd.read_csv reads them.
+    """
+    from pyarrow import csv
+    # pd.read_csv's own missing-value markers ("NA", "None", "" ...), which
+    # differ slightly from pyarrow's defaults
+    from pandas._libs.parsers import STR_NA_VALUES
+    options = csv.ConvertOptions(null_values=sorted(STR_NA_VALUES), strings_can_be_null=True)
+    table = csv.read_csv(file, convert_options=options)
+    if len(set(table.column_names)) < table.num_columns:
+        table = table.rename_columns(_unique_names(table.column_names))
+    return from_arrow(table)
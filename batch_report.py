@@ -0,0 +1,187 @@
+"""
+Headless batch run of the Data Whisperer pipeline.
+
+Runs read -> clean -> profile (and optionally the PPT and/or HTML report) for
+every CSV/XLSX file matched by the inputs, one file per worker process. Each
+file's profile is written to <output-dir>/<name>.eda.json next to its reports,
+and a per-file timing summary is printed and saved as batch_summary.json.
+
+    python batch_report.py extracts/                         # profiles only
+    python batch_report.py "extracts/*.csv" --report pptx --workers 8
+    python batch_report.py a.csv b.xlsx --report both -o nightly/
+"""
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+SUPPORTED_EXTENSIONS = (".csv", ".xlsx")
+REPORT_CHOICES = ["none", "pptx", "html", "both"]
+STAGES = ["read", "clean", "profile", "report"]
+
+
+def expand_inputs(inputs):
+    """Files matched by each input (a file, a directory or a glob), de-duplicated and sorted."""
+    paths = set()
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            candidates = glob.glob(pattern, recursive=True)
+        paths.update(os.path.abspath(path) for path in candidates
+                     if os.path.isfile(path) and path.lower().endswith(SUPPORTED_EXTENSIONS))
+    return sorted(paths)
+
+
+def output_names(paths):
+    """Output file stem for each path; stems shared by several inputs get a numeric suffix."""
+    names = {}
+    used = set()
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name, n = stem, 1
+        while name in used:
+            n += 1
+            name = f"{stem}_{n}"
+        used.add(name)
+        names[path] = name
+    return names
+
+
+def _init_worker():
+    # Files are already spread over processes, so figures are rendered in-process
+    import figure_render
+    figure_render.RENDER_WORKERS = 1
+    logging.basicConfig(level=logging.WARNING)
+
+
+def process_file(path, output_dir, name, report="none"):
+    """
+    Runs the pipeline on one file. Never raises: failures are reported in the
+    returned dict's "error", alongside per-stage timings in seconds.
+    """
+    from clean_and_EDA_generate import read_and_validate_file, clean_data, enhanced_eda_json
+
+    result = {"file": path, "name": name, "status": "ok", "error": None, "rows": None, "columns": None,
+              "outputs": [], "timings": {}}
+    timings = result["timings"]
+
+    def timed(stage, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[stage] = round(time.perf_counter() - start, 3)
+
+    try:
+        with open(path, "rb") as f:
+            df = timed("read", read_and_validate_file, f)
+        if df is None:
+            raise ValueError("could not read the file or it is empty (see log)")
+        df = timed("clean", clean_data, df)
+        if df is None:
+            raise ValueError("cleaning failed (see log)")
+        result["rows"], result["columns"] = int(df.shape[0]), int(df.shape[1])
+
+        eda = timed("profile", enhanced_eda_json, df)
+        if eda is None:
+            raise ValueError("profiling failed (see log)")
+        profile_path = os.path.join(output_dir, f"{name}.eda.json")
+        with open(profile_path, "w", encoding="utf-8") as f:
+            json.dump(eda, f, indent=2, default=str)
+        result["outputs"].append(profile_path)
+
+        if report != "none":
+            result["outputs"] += timed("report", _write_reports, df, eda, output_dir, name,
+                                       os.path.basename(path), report)
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = str(e)
+    return result
+
+
+def _write_reports(df, eda, output_dir, name, dataset_name, report):
+    import figures
+    from utils import dataset_fingerprint
+    from generate_report import generate_section_insights, generate_eda_report_ppt, generate_eda_report_html
+
+    report_figs = figures.report_figures(dataset_fingerprint(df), df, eda)
+    fig_kwargs = {f"{section}_figs": figs for section, figs in report_figs.items()}
+    # One round of LLM commentary shared by both formats
+    insights = generate_section_insights(eda)
+    written = []
+    if report in ("pptx", "both"):
+        ppt_path = os.path.join(output_dir, f"{name}.pptx")
+        ppt_buffer = generate_eda_report_ppt(eda, df, dataset_name=dataset_name, insights=insights, **fig_kwargs)
+        with open(ppt_path, "wb") as f:
+            f.write(ppt_buffer.getvalue())
+        written.append(ppt_path)
+    if report in ("html", "both"):
+        html_path = os.path.join(output_dir, f"{name}.html")
+        generate_eda_report_html(eda, df, dataset_name=dataset_name, insights=insights,
+                                 output_path=html_path, **fig_kwargs)
+        written.append(html_path)
+    return written
+
+
+def print_summary(results, wall_seconds):
+    header = f"{'file':<32} {'rows':>10} {'cols':>5} " + " ".join(f"{s:>8}" for s in STAGES) + f" {'total':>8}  status"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        timings = result["timings"]
+        stage_cells = " ".join(f"{timings[s]:8.2f}" if s in timings else f"{'-':>8}" for s in STAGES)
+        rows = f"{result['rows']:,}" if result["rows"] is not None else "-"
+        cols = result["columns"] if result["columns"] is not None else "-"
+        status = result["status"] if result["error"] is None else f"{result['status']}: {result['error']}"
+        print(f"{result['name'][:32]:<32} {rows:>10} {cols:>5} {stage_cells} "
+              f"{sum(timings.values()):8.2f}  {status}")
+    failed = sum(result["status"] != "ok" for result in results)
+    busy = sum(sum(result["timings"].values()) for result in results)
+    print(f"\n{len(results)} files ({failed} failed) in {wall_seconds:.2f}s wall, {busy:.2f}s summed across workers")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile (and optionally report on) many datasets headlessly.")
+    parser.add_argument("inputs", nargs="+", help="CSV/XLSX files, directories or glob patterns.")
+    parser.add_argument("-o", "--output-dir", default="batch_output", help="Where profiles and reports are written.")
+    parser.add_argument("--report", choices=REPORT_CHOICES, default="none", help="Report format(s) to build per file.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes.")
+    args = parser.parse_args(argv)
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        print("No CSV or XLSX files matched the inputs.")
+        return 1
+    os.makedirs(args.output_dir, exist_ok=True)
+    names = output_names(paths)
+
+    start = time.perf_counter()
+    results = []
+    workers = max(1, min(args.workers, len(paths)))
+    if workers == 1:
+        _init_worker()
+        for path in paths:
+            results.append(process_file(path, args.output_dir, names[path], args.report))
+            print(f"done {names[path]}", file=sys.stderr)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(process_file, path, args.output_dir, names[path], args.report) for path in paths]
+            for future in as_completed(futures):
+                results.append(future.result())
+                print(f"done {results[-1]['name']}", file=sys.stderr)
+    wall_seconds = time.perf_counter() - start
+
+    results.sort(key=lambda result: result["file"])
+    print_summary(results, wall_seconds)
+    with open(os.path.join(args.output_dir, "batch_summary.json"), "w", encoding="utf-8") as f:
+        json.dump({"wall_seconds": round(wall_seconds, 3), "files": results}, f, indent=2)
+    return 0 if all(result["status"] == "ok" for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
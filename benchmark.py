@@ -0,0 +1,287 @@
+"""
+Pipeline benchmark on synthetic data (see synthetic_data.py).
+
+For each profile and size, writes a synthetic CSV and times each stage of the
+app's pipeline on it: read_and_validate_file, clean_data, enhanced_eda_json,
+validate_and_fix_query + execute_sql_on_df on a few generic queries, and the
+report build (figures + HTML report with placeholder commentary, so no LLM
+calls are made). Peak memory per stage is measured with tracemalloc, which
+slows every stage down by a similar factor, so runs stay comparable. On Linux
+the peak resident set size above the stage's starting point is recorded too;
+unlike tracemalloc it also sees memory allocated by pyarrow and DuckDB.
+
+--arrow runs the pipeline in the Arrow-backed mode (see arrow_backend.py), and
+is compared against earlier --arrow runs only; run both to compare the modes.
+The data options (--missing-rate, --cardinality, --date-columns, ...) are
+passed to generate_dataset; runs are only compared with runs on the same data.
+
+Results are appended to a JSON history and compared against the previous run:
+
+    python benchmark.py                                  # 10k, 100k and 1M rows
+    python benchmark.py --sizes 10000,10000000 --profiles lung
+    python benchmark.py --fail-on-regression 0.15        # exit 1 if a stage got >15% slower
+    python benchmark.py --sizes 1000000 --arrow
+    python benchmark.py --sizes 100000 --date-columns 3 --extra-categorical 20 --cardinality 50000
+"""
+import os
+import re
+import sys
+import json
+import ctypes
+import time
+import argparse
+import warnings
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+
+import pandas as pd
+
+import arrow_backend
+from semantic_types import is_categorical
+from synthetic_data import PROFILES, generate_dataset, write_dataset
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_HISTORY = "benchmark_history.json"
+# Stages faster than this are too noisy to flag as regressions
+MIN_COMPARABLE_SECONDS = 0.05
+# generate_dataset's defaults, recorded with runs made before the data options existed
+DEFAULT_DATA_OPTIONS = {"missing_rate": 0.02, "duplicate_rate": 0.01, "extra_numeric": 0,
+                        "extra_categorical": 0, "cardinality": 20, "date_columns": 0}
+
+
+def _rss_kb(field):
+    with open("/proc/self/status", encoding="ascii") as f:
+        return int(re.search(rf"^{field}:\s+(\d+) kB", f.read(), re.MULTILINE).group(1))
+
+
+def _reset_peak_rss():
+    """Resets the process's peak RSS and returns the current RSS in kB, or None where unsupported."""
+    try:
+        # Hand freed heap pages back first (glibc), or later stages reuse them without growing the RSS
+        ctypes.CDLL(None).malloc_trim(0)
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return _rss_kb("VmRSS")
+    except (OSError, AttributeError):
+        return None
+
+
+def measure(func, *args, **kwargs):
+    """
+    Runs func and returns (result, seconds, peak traced memory in MB, peak RSS
+    growth in MB or None).
+    """
+    rss_base = _reset_peak_rss()
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    rss_peak = None
+    if rss_base is not None:
+        rss_peak = max(_rss_kb("VmHWM") - rss_base, 0) / 1024
+    return result, seconds, peak / (1024 * 1024), rss_peak
+
+
+def benchmark_queries(eda):
+    """Generic filter, aggregate and sort queries over the profiled columns."""
+    columns = eda["columns"]
+    numeric = [col for col, det in columns.items() if "numeric_stats" in det]
+    categorical = [col for col, det in columns.items() if is_categorical(det)]
+    queries = []
+    if numeric:
+        median = columns[numeric[0]]["numeric_stats"]["median"]
+        queries.append(f'SELECT * FROM dataset WHERE "{numeric[0]}" > {median};')
+        queries.append(f'SELECT * FROM dataset ORDER BY "{numeric[-1]}" DESC LIMIT 100;')
+    if numeric and categorical:
+        group = categorical[-1]
+        queries.append(f'SELECT "{group}", COUNT(*) AS n, AVG("{numeric[0]}") AS mean_value '
+                       f'FROM dataset GROUP BY "{group}";')
+    return queries
+
+
+def run_queries(df, eda, queries):
+    from smart_query import validate_and_fix_query, execute_sql_on_df
+    rows = 0
+    for query in queries:
+        validate_and_fix_query(query, eda)
+        rows += len(execute_sql_on_df(df, query, eda))
+    return rows
+
+
+def build_report(df, eda, dataset_name):
+    import figures
+    from utils import dataset_fingerprint
+    from generate_report import SECTION_TOPICS, generate_eda_report_html
+
+    report_figs = figures.report_figures(dataset_fingerprint(df), df, eda)
+    insights = {key: f"Benchmark placeholder commentary for {key}." for key in [*SECTION_TOPICS, "overall"]}
+    return generate_eda_report_html(eda, df, dataset_name=dataset_name, insights=insights, plotlyjs="cdn",
+                                    **{f"{section}_figs": figs for section, figs in report_figs.items()})
+
+
+def benchmark_dataset(profile, rows, data_dir, seed=0, verbose=True, **data_options):
+    """
+    Times every stage on one synthetic dataset, generated with data_options
+    (generate_dataset's keyword arguments); returns one result dict per stage.
+    """
+    from clean_and_EDA_generate import read_and_validate_file, clean_data, enhanced_eda_json
+    import figures
+
+    path = write_dataset(generate_dataset(rows, profile, seed=seed, **data_options), os.path.join(data_dir, f"{profile}_{rows}.csv"))
+    file_mb = os.path.getsize(path) / (1024 * 1024)
+    results = []
+
+    def record(stage, seconds, peak_mb, rss_mb):
+        results.append({"profile": profile, "rows": rows, "stage": stage, "seconds": round(seconds, 4),
+                        "peak_mb": round(peak_mb, 1), "rss_mb": round(rss_mb, 1) if rss_mb is not None else None})
+        if verbose:
+            rss = f"{rss_mb:9.1f} MB" if rss_mb is not None else f"{'-':>12}"
+            print(f"  {profile:>8} {rows:>11,} {stage:>8} {seconds:9.3f}s {peak_mb:9.1f} MB {rss}", flush=True)
+
+    with open(path, "rb") as f:
+        df, *measured = measure(read_and_validate_file, f)
+    record("read", *measured)
+    df, *measured = measure(clean_data, df)
+    record("clean", *measured)
+    eda, *measured = measure(enhanced_eda_json, df)
+    record("profile", *measured)
+    _, *measured = measure(run_queries, df, eda, benchmark_queries(eda))
+    record("query", *measured)
+    _, *measured = measure(build_report, df, eda, os.path.basename(path))
+    record("report", *measured)
+
+    figures.clear_figure_cache()
+    os.remove(path)
+    for result in results:
+        result["file_mb"] = round(file_mb, 1)
+    return results
+
+
+def warm_up(data_dir):
+    """Runs the pipeline once on a tiny dataset so lazy imports aren't charged to the first measurement."""
+    benchmark_dataset("lung", 1_000, data_dir, verbose=False)
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "arrow": arrow_backend.enabled(),
+    }
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(results, previous, threshold):
+    """
+    Prints time and memory changes against the previous run's matching
+    (profile, rows, stage) results. Returns the stages that got slower by more
+    than threshold (a fraction).
+    """
+    baseline = {(r["profile"], r["rows"], r["stage"]): r for r in previous["results"]}
+    regressions = []
+    print(f"\nCompared with {previous.get('commit') or 'previous run'} ({previous['timestamp']}):")
+    for result in results:
+        key = (result["profile"], result["rows"], result["stage"])
+        before = baseline.get(key)
+        if before is None or before["seconds"] <= 0:
+            continue
+        change = result["seconds"] / before["seconds"] - 1
+        memory_change = result["peak_mb"] - before["peak_mb"]
+        rss_change = ""
+        if result.get("rss_mb") is not None and before.get("rss_mb") is not None:
+            rss_change = f", RSS {result['rss_mb'] - before['rss_mb']:+.1f} MB"
+        flag = ""
+        if change > threshold and max(result["seconds"], before["seconds"]) >= MIN_COMPARABLE_SECONDS:
+            flag = "  <-- slower"
+            regressions.append(key)
+        print(f"  {key[0]:>8} {key[1]:>11,} {key[2]:>8} {before['seconds']:9.3f}s -> {result['seconds']:9.3f}s "
+              f"({change:+.0%}), peak {memory_change:+.1f} MB{rss_change}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Data Whisperer pipeline on synthetic data.")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="Comma-separated row counts.")
+    parser.add_argument("--profiles", default="students,lung",
+                        help=f"Comma-separated synthetic profiles ({', '.join(sorted(PROFILES))}).")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON file the results are appended to.")
+    parser.add_argument("--no-save", action="store_true", help="Don't append this run to the history.")
+    parser.add_argument("--fail-on-regression", type=float, default=None, metavar="FRACTION",
+                        help="Exit 1 if any stage is slower than the previous run by more than this fraction.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--arrow", action="store_true", help="Use the Arrow-backed pipeline mode (needs pyarrow).")
+    data = parser.add_argument_group("synthetic data")
+    data.add_argument("--missing-rate", type=float, default=DEFAULT_DATA_OPTIONS["missing_rate"],
+                      help="Share of cells left empty.")
+    data.add_argument("--duplicate-rate", type=float, default=DEFAULT_DATA_OPTIONS["duplicate_rate"],
+                      help="Share of rows repeating an earlier row.")
+    data.add_argument("--extra-numeric", type=int, default=DEFAULT_DATA_OPTIONS["extra_numeric"],
+                      help="Additional numeric columns, for wide data.")
+    data.add_argument("--extra-categorical", type=int, default=DEFAULT_DATA_OPTIONS["extra_categorical"],
+                      help="Additional categorical columns, for wide data.")
+    data.add_argument("--cardinality", type=int, default=DEFAULT_DATA_OPTIONS["cardinality"],
+                      help="Distinct values per additional categorical column.")
+    data.add_argument("--date-columns", type=int, default=DEFAULT_DATA_OPTIONS["date_columns"],
+                      help="Date columns, stored as text like a CSV's, so clean_data parses them.")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    profiles = [profile.strip() for profile in args.profiles.split(",")]
+    unknown = [profile for profile in profiles if profile not in PROFILES]
+    if unknown:
+        parser.error(f"unknown profile(s): {', '.join(unknown)}")
+    arrow_backend.ENABLED = args.arrow
+    if args.arrow and not arrow_backend.available():
+        parser.error("--arrow needs a working pyarrow installation")
+
+    data_options = {option: getattr(args, option) for option in DEFAULT_DATA_OPTIONS}
+    run = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), **environment(), "data": data_options, "results": []}
+    print(f"  {'profile':>8} {'rows':>11} {'stage':>8} {'time':>10} {'peak':>12} {'peak RSS':>12}")
+    # clean_data's datetime sniffing warns once per text column
+    warnings.filterwarnings("ignore", message="Could not infer format")
+    with tempfile.TemporaryDirectory(prefix="dw-bench-") as data_dir:
+        warm_up(data_dir)
+        for profile in profiles:
+            for rows in sizes:
+                run["results"] += benchmark_dataset(profile, rows, data_dir, seed=args.seed, **data_options)
+
+    history = load_history(args.history)
+    regressions = []
+    previous = next((past for past in reversed(history) if past.get("arrow", False) == run["arrow"]
+                     and past.get("data", DEFAULT_DATA_OPTIONS) == data_options), None)
+    if previous is not None:
+        regressions = compare(run["results"], previous,
+                              args.fail_on_regression if args.fail_on_regression is not None else 0.10)
+    if not args.no_save:
+        history.append(run)
+        with open(args.history, "w", encoding="utf-8") as f:
+            json.dump(history, f, indent=2)
+        print(f"\nSaved to {args.history} ({len(history)} runs).")
+    if args.fail_on_regression is not None and regressions:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import json
+import time
+import logging
+import datetime
+
+from utils import get_genai, model_name
+from telemetry import record_llm_call, usage_tokens
+
+SYSTEM_PROMPT = (
+    "Your role is a data analyst and answers user questions so try to be conversational. "
+    "Answer using the dataset context below and the earlier turns of this conversation.\n"
+    "Dataset context (JSON): "
+)
+
+# Gemini only accepts cached contents above a minimum size; smaller contexts are
+# sent as the system instruction instead.
+MIN_CACHED_CONTEXT_TOKENS = 4096
+DEFAULT_HISTORY_TOKENS = 4000
+DEFAULT_CACHE_TTL_SECONDS = 3600
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token), good enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+def _round_floats(obj, digits=4):
+    if isinstance(obj, float):
+        return float(f"{obj:.{digits}g}")
+    if isinstance(obj, dict):
+        return {k: _round_floats(v, digits) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_round_floats(v, digits) for v in obj]
+    return obj
+
+
+def compact_eda_context(eda):
+    """
+    Shrinks an enhanced_eda_json summary for use as chat context:
+    - drops the full correlation matrix (the strong correlations are kept),
+    - drops missing_data_overall (already reported per column),
+    - rounds floats to 4 significant digits,
+    - serialises without whitespace.
+    """
+    context = {k: v for k, v in eda.items() if k not in ("correlations", "missing_data_overall")}
+    return json.dumps(_round_floats(context), separators=(",", ":"), default=str)
+
+
+class ChatSession:
+    """
+    Multi-turn Ask AI conversation about one dataset.
+
+    The dataset context is attached once as the system instruction (or as Gemini
+    cached content when it is large enough and the model supports caching) and
+    each turn only sends the question plus as much recent history as fits in
+    ``history_token_budget``.
+    """
+
+    def __init__(self, eda, type="flash", history_token_budget=DEFAULT_HISTORY_TOKENS,
+                 cache_ttl=DEFAULT_CACHE_TTL_SECONDS):
+        self.context = compact_eda_context(eda)
+        self.type = type
+        self.history_token_budget = history_token_budget
+        self.cache_ttl = cache_ttl
+        self.turns = []
+        self.cached_content = None
+        self._model = None
+
+    def _create_model(self):
+        genai = get_genai()
+        name = model_name(self.type)
+        system_instruction = SYSTEM_PROMPT + self.context
+        if estimate_tokens(system_instruction) >= MIN_CACHED_CONTEXT_TOKENS:
+            try:
+                self.cached_content = genai.caching.CachedContent.create(
+                    model=f"models/{name}",
+                    system_instruction=system_instruction,
+                    ttl=datetime.timedelta(seconds=self.cache_ttl),
+                )
+                return genai.GenerativeModel.from_cached_content(self.cached_content)
+            except Exception as e:
+                logging.info(f"Context caching unavailable for {name}, using system instruction: {e}")
+        return genai.GenerativeModel(name, system_instruction=system_instruction)
+
+    def _get_model(self):
+        if self._model is None:
+            self._model = self._create_model()
+        return self._model
+
+    def history_window(self):
+        """Most recent (question, answer) turns that fit in the history token budget."""
+        window = []
+        used = 0
+        for question, answer in reversed(self.turns):
+            cost = estimate_tokens(question) + estimate_tokens(answer)
+            if used + cost > self.history_token_budget:
+                break
+            window.append((question, answer))
+            used += cost
+        return list(reversed(window))
+
+    def add_turn(self, question, answer):
+        """Records a completed turn, e.g. one answered outside the session."""
+        self.turns.append((question, answer))
+
+    def send(self, question):
+        contents = []
+        for past_question, past_answer in self.history_window():
+            contents.append({"role": "user", "parts": [past_question]})
+            contents.append({"role": "model", "parts": [past_answer]})
+        contents.append({"role": "user", "parts": [question]})
+        # The cached or system-instruction context is part of every request's input
+        prompt_chars = len(SYSTEM_PROMPT) + len(self.context) + sum(len(c["parts"][0]) for c in contents)
+        start = time.perf_counter()
+        try:
+            response = self._get_model().generate_content(contents)
+            answer = response.text.strip()
+        except Exception as e:
+            record_llm_call("chat", model_name(self.type), prompt_chars, 0,
+                            time.perf_counter() - start, error=str(e))
+            return f"Error: {e}"
+        prompt_tokens, response_tokens = usage_tokens(response)
+        record_llm_call("chat", model_name(self.type), prompt_chars, len(answer), time.perf_counter() - start,
+                        prompt_tokens=prompt_tokens, response_tokens=response_tokens)
+        self.add_turn(question, answer)
+        return answer
+
+    def close(self):
+        """Deletes the server-side cached context, if one was created."""
+        if self.cached_content is not None:
+            try:
+                self.cached_content.delete()
+            except Exception as e:
+                logging.info(f"Could not delete cached chat context: {e}")
+            self.cached_content = None
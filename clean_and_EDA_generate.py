@@ -2,20 +2,36 @@ import pandas as pd
 import numpy as np
 import logging
 import json
+import time
+from contextlib import contextmanager
+
+from outlier_index import build_outlier_index
+from duplicate_index import build_duplicate_index
+from semantic_types import ID, FREE_TEXT, BOOLEAN, NUMERIC_STRING, NULL_TOKENS
+from semantic_types import detect_semantic_types, describe_sample, sample_values
+from profile_sampling import sample_positions, annotate_sampled_profile
+import arrow_backend
+import perf
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+@perf.timed("read_file")
 def read_and_validate_file(uploaded_file, sheet_name=None):
     try:
         file_name = uploaded_file.name.lower()
 
         if file_name.endswith('.csv'):
-            df = pd.read_csv(uploaded_file)
+            if arrow_backend.enabled():
+                df = arrow_backend.read_csv(uploaded_file)
+            else:
+                df = pd.read_csv(uploaded_file)
         elif file_name.endswith('.xlsx'):
             excel_file = pd.ExcelFile(uploaded_file)
             if sheet_name is None:
                 sheet_name = excel_file.sheet_names[0]
             df = excel_file.parse(sheet_name)
+            if arrow_backend.enabled():
+                df = arrow_backend.arrow_strings(df)
         else:
             logging.error("Unsupported file format. Please upload a CSV or XLSX file.")
             return None
@@ -30,141 +46,280 @@ def read_and_validate_file(uploaded_file, sheet_name=None):
         return None
 
 
+# Yes/no style columns are turned into 1/0
+BOOLEAN_MAPPINGS = [{"yes": 1, "no": 0}, {"true": 1, "false": 0}]
+# Text columns are only parsed as dates in full if this many sampled values
+# parse; the full column must then reach the 80% rule
+DATETIME_SNIFF_SAMPLE = 200
+DATETIME_SNIFF_RATIO = 0.5
+
+
+@contextmanager
+def _clean_step(timings, name):
+    start = time.perf_counter()
+    with perf.stage(f"clean:{name}"):
+        yield
+    timings[name] = time.perf_counter() - start
+
+
+def _normalize_boolean(series):
+    """
+    series as 1/0 if its values are yes/no or true/false (in any case or
+    padding), else None. Works on the distinct values' codes, so only those
+    are stripped and lowercased, not every row.
+    """
+    codes, uniques = pd.factorize(series)
+    normalized = [str(value).strip().lower() for value in uniques]
+    for mapping in BOOLEAN_MAPPINGS:
+        if set(normalized) == set(mapping):
+            lookup = np.array([mapping[value] for value in normalized])
+            if (codes < 0).any():
+                values = np.where(codes >= 0, lookup[codes].astype(float), np.nan)
+            else:
+                values = lookup[codes]
+            return pd.Series(values, index=series.index, name=series.name)
+    return None
+
+
+def _parse_numeric_strings(series):
+    """
+    series as numbers if every non-missing value parses (NULL_TOKENS becoming
+    missing), else None, so that no real entry is silently turned into a gap
+    for the fill step to invent a value for. Parses the distinct values only.
+    """
+    codes, uniques = pd.factorize(series)
+    text = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    null_token = text.str.lower().isin(NULL_TOKENS)
+    parsed = pd.to_numeric(text.mask(null_token), errors="coerce")
+    unparsed = (parsed.isna() & ~null_token).to_numpy()
+    if unparsed.any():
+        failed = int(np.isin(codes, np.flatnonzero(unparsed)).sum())
+        logging.info(f"Column '{series.name}' kept as text: {failed:,} values are not numbers "
+                     f"(e.g. {text[unparsed].iloc[0]!r})")
+        return None
+    if (codes < 0).any() or null_token.any():
+        parsed = parsed.to_numpy(dtype=float)
+        values = np.where(codes >= 0, parsed[np.maximum(codes, 0)], np.nan)
+    else:
+        # Whole numbers stay integers, as with pd.to_numeric on the column
+        values = parsed.to_numpy()[codes]
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def _looks_like_dates(series):
+    sample = sample_values(series, DATETIME_SNIFF_SAMPLE)
+    return not sample.empty and pd.to_datetime(sample, errors='coerce').notnull().mean() >= DATETIME_SNIFF_RATIO
+
+
+@perf.timed("clean_data")
 def clean_data(df):
+    """
+    Cleans df in place (and returns it): drops columns over 50% missing,
+    fills the remaining gaps (median for numbers, mode for categories), drops
+    duplicate rows, parses date columns, turns yes/no columns into 1/0 and
+    normalises column names. Each step's time is recorded as a "clean:<step>"
+    perf stage and logged.
+
+    The duplicates removed (count and largest groups, by row position in the
+    input) are kept in df.attrs["duplicates_removed"] for the profile.
+    """
+    timings = {}
     try:
+        with _clean_step(timings, "types"):
+            semantic_types = detect_semantic_types(df)
+            for col, semantic_type in semantic_types.items():
+                if semantic_type == NUMERIC_STRING:
+                    converted = _parse_numeric_strings(df[col])
+                    if converted is not None:
+                        df[col] = converted
+
         numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-        categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
-        date_cols = df.select_dtypes(include=['datetime']).columns.tolist()
-        
-        for col in df.columns:
-            missing_percentage = df[col].isnull().mean() * 100
-            if missing_percentage > 50:
-                df.drop(col, axis=1, inplace=True)
-            elif col in numeric_cols:
-                df[col] = df[col].fillna(df[col].median())
-            else:
-                df[col] = df[col].fillna(df[col].mode()[0])
-        
-        initial_rows = df.shape[0]
-        df.drop_duplicates(inplace=True)
-        final_rows = df.shape[0]
-        
-        for col in categorical_cols:
-            try:
-                converted = pd.to_datetime(df[col], errors='coerce')
-                valid_ratio = converted.notnull().mean()
-                if valid_ratio > 0.8:
-                    df[col] = converted
-            except Exception as e:
-                logging.info(f"Column '{col}' could not be converted to datetime: {e}")
-        
-        date_cols = df.select_dtypes(include=['datetime']).columns.tolist()
-        
-        for col in numeric_cols:
-            Q1 = df[col].quantile(0.25)
-            Q3 = df[col].quantile(0.75)
-            IQR = Q3 - Q1
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
-            outliers = df[(df[col] < lower_bound) | (df[col] > upper_bound)]
-        
-        for col in categorical_cols:
-            unique_vals = df[col].dropna().astype(str).str.strip().str.lower().unique()
-            if set(unique_vals) == set(["yes", "no"]):
-                mapping = {"yes": 1, "no": 0}
-                df[col] = df[col].astype(str).str.strip().str.lower().map(mapping)
-            elif set(unique_vals) == set(["true", "false"]):
-                mapping = {"true": 1, "false": 0}
-                df[col] = df[col].astype(str).str.strip().str.lower().map(mapping)
-        
+        categorical_cols = df.select_dtypes(include=['object', 'category', 'string']).columns.tolist()
+
+        with _clean_step(timings, "missing"):
+            missing_ratio = df.isnull().mean()
+            df.drop(columns=missing_ratio.index[missing_ratio > 0.5], inplace=True)
+
+        with _clean_step(timings, "fill"):
+            # Only columns with gaps need a median or mode; identifiers and
+            # comments are left alone, as filling them in would invent data
+            gaps = [col for col in df.columns if missing_ratio[col] > 0]
+            median_cols = [col for col in gaps if col in numeric_cols]
+            mode_cols = [col for col in gaps if col not in numeric_cols
+                         and semantic_types[col] not in (ID, FREE_TEXT)]
+            fill_values = {}
+            if median_cols:
+                fill_values.update(df[median_cols].median().to_dict())
+            if mode_cols:
+                fill_values.update(df[mode_cols].mode().iloc[0].to_dict())
+            if fill_values:
+                df.fillna(fill_values, inplace=True)
+
+        with _clean_step(timings, "dedupe"):
+            initial_rows = df.shape[0]
+            duplicates = build_duplicate_index(df)
+            duplicates_removed = {"rows": duplicates.count(), "largest_groups": duplicates.groups(df)}
+            if duplicates.count():
+                if df.index.is_unique:
+                    df.drop(index=df.index[duplicates.mask()], inplace=True)
+                else:
+                    df.drop_duplicates(inplace=True)
+            final_rows = df.shape[0]
+
+        with _clean_step(timings, "datetime"):
+            for col in [col for col in categorical_cols if col in df.columns]:
+                try:
+                    if not _looks_like_dates(df[col]):
+                        continue
+                    converted = pd.to_datetime(df[col], errors='coerce')
+                    valid_ratio = converted.notnull().mean()
+                    if valid_ratio > 0.8:
+                        df[col] = converted
+                except Exception as e:
+                    logging.info(f"Column '{col}' could not be converted to datetime: {e}")
+
+        with _clean_step(timings, "booleans"):
+            # Only columns whose sample holds nothing but yes/no (or true/false)
+            # values can be yes/no columns; the full column decides the rest
+            for col in categorical_cols:
+                if semantic_types[col] == BOOLEAN and col in df.columns:
+                    normalized = _normalize_boolean(df[col])
+                    if normalized is not None:
+                        df[col] = normalized
+
         df.columns = [col.strip().lower().replace(' ', '_').replace('-', '_') for col in df.columns]
+        df.attrs["duplicates_removed"] = duplicates_removed
+        logging.info(f"Cleaned {initial_rows:,} rows ({initial_rows - final_rows:,} duplicates) in "
+                     + ", ".join(f"{step} {seconds:.3f}s" for step, seconds in timings.items()))
         return df
     except Exception as e:
         logging.error(f"Error during data cleaning: {e}")
         return None
 
 
-def enhanced_eda_json(df):
+@perf.timed("profile")
+def enhanced_eda_json(df, outlier_index=None, duplicate_index=None, sample_size=None, stratify_by=None):
+    """
+    Builds the JSON-serialisable EDA profile of df. Outlier counts, bounds and
+    whiskers come from outlier_index (an OutlierIndex built on df, see
+    outlier_index.get_outlier_index), duplicate counts and groups from
+    duplicate_index (a DuplicateIndex of df); each is built if not given.
+
+    With a sample_size smaller than df, the column statistics are estimated
+    from that many sampled rows (stratified by the stratify_by column, if
+    given) and come with confidence intervals; see profile_sampling.
+    Duplicate counts, and outlier counts when outlier_index is given, are
+    still those of the whole frame.
+    """
     try:
-        eda_summary = {}
-        eda_summary["num_rows"] = df.shape[0]
-        eda_summary["num_columns"] = df.shape[1]
-        columns_info = {}
-        for col in df.columns:
-            col_info = {}
-            col_info["dtype"] = str(df[col].dtype)
-            missing_count = int(df[col].isnull().sum())
-            missing_percent = round(df[col].isnull().mean() * 100, 2)
-            col_info["missing_count"] = missing_count
-            col_info["missing_percent"] = missing_percent
-            
-            if pd.api.types.is_numeric_dtype(df[col]):
-                desc = df[col].describe(percentiles=[0.25, 0.5, 0.75]).to_dict()
-                col_info["numeric_stats"] = {
-                    "mean": desc.get("mean"),
-                    "median": desc.get("50%"),
-                    "min": desc.get("min"),
-                    "max": desc.get("max"),
-                    "std": desc.get("std"),
-                    "25%": desc.get("25%"),
-                    "75%": desc.get("75%")
-                }
-                col_info["skewness"] = df[col].skew()
-                col_info["kurtosis"] = df[col].kurt()
-                Q1 = df[col].quantile(0.25)
-                Q3 = df[col].quantile(0.75)
-                IQR = Q3 - Q1
-                lower_bound = Q1 - 1.5 * IQR
-                upper_bound = Q3 + 1.5 * IQR
-                outlier_count = int(df[(df[col] < lower_bound) | (df[col] > upper_bound)].shape[0])
-                col_info["outlier_count"] = outlier_count
-                col_info["outlier_bounds"] = {"lower_bound": lower_bound, "upper_bound": upper_bound}
-                hist_counts, hist_bins = np.histogram(df[col].dropna(), bins=10)
-                col_info["histogram"] = {
-                    "bins": hist_bins.tolist(),
-                    "counts": hist_counts.tolist()
-                }
-            elif pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_categorical_dtype(df[col]):
+        if duplicate_index is None:
+            duplicate_index = build_duplicate_index(df)
+        if sample_size is not None and len(df) > sample_size:
+            strata = df[stratify_by] if stratify_by is not None else None
+            sample = df.iloc[sample_positions(len(df), sample_size, strata=strata)]
+            eda = _profile(sample, build_outlier_index(sample), _duplicate_summary(df, duplicate_index))
+            return annotate_sampled_profile(eda, sample, df, stratify_by=stratify_by,
+                                            outlier_index=outlier_index)
+        if outlier_index is None:
+            outlier_index = build_outlier_index(df)
+        return _profile(df, outlier_index, _duplicate_summary(df, duplicate_index))
+    except Exception as e:
+        logging.info(f"Error profiling the dataset: {e}")
+        return None
+
+
+def _duplicate_summary(df, duplicate_index):
+    summary = {
+        "duplicate_rows": duplicate_index.count(),
+        "duplicate_percentage": duplicate_index.percentage(),
+        "duplicate_groups": duplicate_index.groups(df),
+    }
+    if "duplicates_removed" in df.attrs:
+        # What clean_data dropped, as the profiled frame has no duplicates left
+        summary["duplicates_removed"] = df.attrs["duplicates_removed"]
+    return summary
+
+
+def _profile(df, outlier_index, duplicates):
+    eda_summary = {}
+    eda_summary["num_rows"] = df.shape[0]
+    eda_summary["num_columns"] = df.shape[1]
+    semantic_types = detect_semantic_types(df)
+    columns_info = {}
+    for col in df.columns:
+        col_info = {}
+        col_info["dtype"] = str(df[col].dtype)
+        col_info["semantic_type"] = semantic_types[col]
+        missing_count = int(df[col].isnull().sum())
+        missing_percent = round(df[col].isnull().mean() * 100, 2)
+        col_info["missing_count"] = missing_count
+        col_info["missing_percent"] = missing_percent
+        
+        if pd.api.types.is_numeric_dtype(df[col]):
+            desc = df[col].describe(percentiles=[0.25, 0.5, 0.75]).to_dict()
+            col_info["numeric_stats"] = {
+                "mean": desc.get("mean"),
+                "median": desc.get("50%"),
+                "min": desc.get("min"),
+                "max": desc.get("max"),
+                "std": desc.get("std"),
+                "25%": desc.get("25%"),
+                "75%": desc.get("75%")
+            }
+            col_info["skewness"] = df[col].skew()
+            col_info["kurtosis"] = df[col].kurt()
+            lower_bound, upper_bound = outlier_index.bounds[(col, "iqr")]
+            col_info["outlier_count"] = outlier_index.count(col, "iqr")
+            col_info["outlier_bounds"] = {"lower_bound": lower_bound, "upper_bound": upper_bound}
+            col_info["outliers"] = outlier_index.summary(col)
+            col_info["whiskers"] = outlier_index.whiskers(df[col])
+            hist_counts, hist_bins = np.histogram(df[col].dropna(), bins=10)
+            col_info["histogram"] = {
+                "bins": hist_bins.tolist(),
+                "counts": hist_counts.tolist()
+            }
+        elif (pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col])
+              or pd.api.types.is_categorical_dtype(df[col])):
+            if semantic_types[col] in (ID, FREE_TEXT):
+                # Top categories of near-unique values say nothing
+                col_info["text_summary"] = describe_sample(df[col])
+            else:
                 top_categories = df[col].value_counts().head(5).to_dict()
                 col_info["top_categories"] = top_categories
-            elif pd.api.types.is_datetime64_any_dtype(df[col]):
-                col_info["min_date"] = str(df[col].min())
-                col_info["max_date"] = str(df[col].max())
-                try:
-                    col_series = pd.to_datetime(df[col], errors='coerce')
-                    monthly_counts = col_series.dt.to_period('M').value_counts().sort_index().to_dict()
-                    if len(monthly_counts) <= 20:
-                        col_info["monthly_distribution"] = {str(k): v for k, v in monthly_counts.items()}
-                except Exception as e:
-                    logging.info(f"Error generating monthly distribution for column '{col}': {e}")
-            
-            columns_info[col] = col_info
-        
-        eda_summary["columns"] = columns_info
-        eda_summary["missing_data_overall"] = (df.isnull().mean() * 100).round(2).to_dict()
-        duplicate_count = int(df.duplicated().sum())
-        eda_summary["duplicate_rows"] = duplicate_count
-        eda_summary["duplicate_percentage"] = round(duplicate_count / df.shape[0] * 100, 2)
-        
-        numeric_df = df.select_dtypes(include=["number"])
-        if not numeric_df.empty:
-            eda_summary["correlations"] = numeric_df.corr().round(2).to_dict()
-            strong_corr = {}
-            corr_matrix = numeric_df.corr().round(2)
-            threshold = 0.3
-            for col1 in corr_matrix.columns:
-                for col2 in corr_matrix.index:
-                    if col1 != col2 and abs(corr_matrix.loc[col2, col1]) >= threshold:
-                        key = f"{col2} vs {col1}"
-                        strong_corr[key] = corr_matrix.loc[col2, col1]
-            eda_summary["strong_correlations"] = strong_corr
-        else:
-            eda_summary["correlations"] = {}
-            eda_summary["strong_correlations"] = {}
+        elif pd.api.types.is_datetime64_any_dtype(df[col]):
+            col_info["min_date"] = str(df[col].min())
+            col_info["max_date"] = str(df[col].max())
+            try:
+                col_series = pd.to_datetime(df[col], errors='coerce')
+                monthly_counts = col_series.dt.to_period('M').value_counts().sort_index().to_dict()
+                if len(monthly_counts) <= 20:
+                    col_info["monthly_distribution"] = {str(k): v for k, v in monthly_counts.items()}
+            except Exception as e:
+                logging.info(f"Error generating monthly distribution for column '{col}': {e}")
         
-        eda_string = json.dumps(eda_summary, indent=4)
-        eda_obj = json.loads(eda_string)
-        return eda_obj
-    except Exception as e:
-        return None
+        columns_info[col] = col_info
+    
+    eda_summary["columns"] = columns_info
+    eda_summary["missing_data_overall"] = (df.isnull().mean() * 100).round(2).to_dict()
+    eda_summary.update(duplicates)
+    
+    numeric_df = df.select_dtypes(include=["number"])
+    if not numeric_df.empty:
+        eda_summary["correlations"] = numeric_df.corr().round(2).to_dict()
+        strong_corr = {}
+        corr_matrix = numeric_df.corr().round(2)
+        threshold = 0.3
+        for col1 in corr_matrix.columns:
+            for col2 in corr_matrix.index:
+                if col1 != col2 and abs(corr_matrix.loc[col2, col1]) >= threshold:
+                    key = f"{col2} vs {col1}"
+                    strong_corr[key] = corr_matrix.loc[col2, col1]
+        eda_summary["strong_correlations"] = strong_corr
+    else:
+        eda_summary["correlations"] = {}
+        eda_summary["strong_correlations"] = {}
+    
+    eda_string = json.dumps(eda_summary, indent=4)
+    eda_obj = json.loads(eda_string)
+    return eda_obj
 
@@ -0,0 +1,237 @@
+import io
+import os
+import time
+import hashlib
+import logging
+import weakref
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import perf
+from utils import dataset_fingerprint
+from outlier_index import get_outlier_index
+from duplicate_index import row_hashes, build_duplicate_index
+from clean_and_EDA_generate import read_and_validate_file, clean_data, enhanced_eda_json
+from profile_sampling import SAMPLE_SIZE, SAMPLED_PROFILE_MIN_ROWS, default_strata
+
+# Process-wide store of cleaned datasets and their profiles, keyed by a hash of
+# the uploaded file's content. Sessions that open the same file (e.g. everyone
+# clicking the demo CSV) share one cleaned frame instead of each holding a copy,
+# and the read -> clean -> profile work is done once instead of on every rerun.
+#
+# Stored frames are shared and must be treated as read-only. Code that needs to
+# modify the data calls DatasetHandle.mutable(), which gives the session its own
+# copy on first use (copy-on-write); code that derives new frames (DataPeek's
+# query results, which it then cleans in place) needs no copy. pandas can't
+# make a frame read-only, so this is checked rather than enforced: a stored
+# frame whose shape, columns or dtypes have changed is reported as an error
+# and dropped from the store, so later sessions get a freshly built one.
+#
+# Each DatasetHandle holds a reference on its entry until it is released or
+# garbage collected (e.g. when its Streamlit session ends). Unreferenced entries
+# stay cached for reuse and are evicted least-recently-used once the store is
+# over its memory budget.
+#
+# Frames of SAMPLED_PROFILE_MIN_ROWS rows or more are first profiled from a
+# sample (marked eda["approximate"]); the exact profile is then built in the
+# background and replaces it, which handles see on their next read of ``eda``.
+STORE_MAX_BYTES = int(os.environ.get("DW_STORE_MAX_MB", "1024")) * 1024 * 1024
+
+_entries = OrderedDict()
+_store_lock = threading.Lock()
+_build_locks = {}
+_profile_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="exact-profile")
+
+
+def content_key(data, sheet_name=None):
+    """Store key for a file's raw bytes (and, for Excel files, the sheet read from it)."""
+    digest = hashlib.blake2b(data, digest_size=16)
+    if sheet_name is not None:
+        digest.update(f"\0sheet:{sheet_name}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class DatasetHandle:
+    """
+    A session's reference to a stored dataset. ``df``, ``eda``,
+    ``fingerprint`` and ``outlier_index`` are shared with every other session
+    using the same file and must not be modified. ``file_name`` is the name it
+    was first loaded under.
+    """
+
+    def __init__(self, key, entry):
+        self.key = key
+        self._entry = entry
+        self.file_name = entry["file_name"]
+        self.df = entry["df"]
+        self.fingerprint = entry["fingerprint"]
+        self.outlier_index = entry["outlier_index"]
+        self._private_df = None
+        self._finalizer = weakref.finalize(self, _release, key, entry)
+
+    @property
+    def eda(self):
+        """The dataset's profile: the exact one once built, until then the sampled one."""
+        return self._entry["eda"]
+
+    @property
+    def profile_pending(self):
+        """Whether the exact profile is still being built to replace an approximate one."""
+        return self._entry["profile_pending"]
+
+    def mutable(self):
+        """This handle's private, writable copy of the data, made on first use."""
+        if self._private_df is None:
+            self._private_df = self.df.copy(deep=True)
+        return self._private_df
+
+    def release(self):
+        """Drops the reference on the stored dataset (idempotent)."""
+        self._finalizer()
+
+    @property
+    def released(self):
+        return not self._finalizer.alive
+
+
+def _release(key, entry):
+    with _store_lock:
+        entry["refs"] = max(entry["refs"] - 1, 0)
+        if _entries.get(key) is entry:
+            _evict_locked()
+
+
+def _layout(df):
+    return df.shape, tuple(df.columns), tuple(str(dtype) for dtype in df.dtypes)
+
+
+def _evict_locked():
+    total = sum(entry["nbytes"] for entry in _entries.values())
+    for key in list(_entries):
+        if total <= STORE_MAX_BYTES:
+            break
+        entry = _entries[key]
+        if entry["refs"] == 0:
+            total -= entry["nbytes"]
+            del _entries[key]
+            logging.info(f"Dataset store evicted {key} ({entry['nbytes'] / 1e6:.1f} MB)")
+
+
+def _build_entry(data, file_name, sheet_name):
+    # read_and_validate_file picks the parser from the file name
+    buffer = io.BytesIO(data)
+    buffer.name = file_name
+    df = read_and_validate_file(buffer, sheet_name=sheet_name)
+    if df is None:
+        return None
+    df = clean_data(df)
+    if df is None:
+        return None
+    # One row-hash pass serves both the fingerprint and the duplicate counts
+    hashes = row_hashes(df)
+    fingerprint = dataset_fingerprint(df, row_hashes=hashes)
+    outlier_index = get_outlier_index(df, fingerprint)
+    duplicate_index = build_duplicate_index(df, hashes=hashes)
+    sampled = len(df) >= SAMPLED_PROFILE_MIN_ROWS and len(df) > SAMPLE_SIZE
+    if sampled:
+        eda = enhanced_eda_json(df, outlier_index=outlier_index, duplicate_index=duplicate_index,
+                                sample_size=SAMPLE_SIZE, stratify_by=default_strata(df))
+    else:
+        eda = enhanced_eda_json(df, outlier_index=outlier_index, duplicate_index=duplicate_index)
+    return {
+        "df": df,
+        "eda": eda,
+        "profile_pending": sampled and eda is not None,
+        "duplicate_index": duplicate_index,
+        "fingerprint": fingerprint,
+        "outlier_index": outlier_index,
+        "file_name": file_name,
+        "refs": 0,
+        "nbytes": int(df.memory_usage(deep=True).sum()),
+        "layout": _layout(df),
+        "created": time.time(),
+    }
+
+
+def _build_exact_profile(entry, duplicate_index, file_name):
+    with perf.stage("dataset_store:exact_profile", file=file_name):
+        eda = enhanced_eda_json(entry["df"], outlier_index=entry["outlier_index"],
+                                duplicate_index=duplicate_index)
+    with _store_lock:
+        if eda is not None:
+            entry["eda"] = eda
+        entry["profile_pending"] = False
+
+
+def acquire(data, file_name, sheet_name=None):
+    """
+    Returns a DatasetHandle for the file content ``data``, reading, cleaning
+    and profiling it only if no session has loaded the same content yet.
+    Returns None if the file can't be read or cleaned.
+    """
+    key = content_key(data, sheet_name)
+    with _store_lock:
+        build_lock = _build_locks.setdefault(key, threading.Lock())
+    # One session builds a given dataset; others asking for it meanwhile wait for it
+    with build_lock:
+        with _store_lock:
+            entry = _entries.get(key)
+            if entry is not None and _layout(entry["df"]) != entry["layout"]:
+                logging.error(f"Stored dataset {key} ({entry['file_name']}) was modified in place; "
+                              "use DatasetHandle.mutable() to change data. Rebuilding it.")
+                del _entries[key]
+                entry = None
+            if entry is not None:
+                entry["refs"] += 1
+                _entries.move_to_end(key)
+                return DatasetHandle(key, entry)
+        with perf.stage("dataset_store:build", file=file_name):
+            entry = _build_entry(data, file_name, sheet_name)
+        if entry is None:
+            with _store_lock:
+                _build_locks.pop(key, None)
+            return None
+        # Only needed again for the exact profile
+        duplicate_index = entry.pop("duplicate_index")
+        if entry["profile_pending"]:
+            _profile_executor.submit(_build_exact_profile, entry, duplicate_index, file_name)
+        with _store_lock:
+            _entries[key] = entry
+            entry["refs"] += 1
+            _evict_locked()
+            _build_locks.pop(key, None)
+            return DatasetHandle(key, entry)
+
+
+def open_file(file, sheet_name=None, current=None):
+    """
+    acquire() for an open file or Streamlit UploadedFile. If ``current`` (the
+    session's existing handle) already refers to the same content it is
+    returned as is; otherwise it is released once the new handle is obtained.
+    """
+    data = file.getvalue() if hasattr(file, "getvalue") else file.read()
+    if current is not None and not current.released and current.key == content_key(data, sheet_name):
+        return current
+    handle = acquire(data, os.path.basename(file.name), sheet_name)
+    if current is not None and handle is not current:
+        current.release()
+    return handle
+
+
+def stats():
+    """Entries, total size and references, for monitoring."""
+    with _store_lock:
+        return {
+            "datasets": len(_entries),
+            "total_mb": round(sum(entry["nbytes"] for entry in _entries.values()) / (1024 * 1024), 1),
+            "references": sum(entry["refs"] for entry in _entries.values()),
+            "budget_mb": round(STORE_MAX_BYTES / (1024 * 1024), 1),
+        }
+
+
+def clear():
+    """Drops every unreferenced dataset."""
+    with _store_lock:
+        for key in [key for key, entry in _entries.items() if entry["refs"] == 0]:
+            del _entries[key]
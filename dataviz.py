@@ -1,13 +1,20 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import json
-import deepnote_toolkit
 
 from smart_query import generate_sql_query, execute_sql_on_df
-from generate_report import generate_eda_report_ppt
-from clean_and_EDA_generate import enhanced_eda_json, clean_data, read_and_validate_file
-from utils import get_gemini_response
+from clean_and_EDA_generate import enhanced_eda_json, clean_data
+from utils import get_gemini_response, json_fingerprint, dataset_fingerprint
+import figures
+import report_jobs
+import perf
+import dataset_store
+from outlier_index import get_outlier_index, match_outlier_query
+from semantic_types import is_categorical
+from chat_session import ChatSession
+import prefetch
+import telemetry
+from prefetch import PRE_QUESTIONS, insights_prompt, pre_question_prompt, start_prefetch
 
 
 
@@ -19,14 +26,6 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-deepnote_toolkit.set_integration_env()
-
-numeric_figs = []
-categorical_figs = []
-correlation_figs = []
-time_series_figs = []
-outlier_figs = []
-
 # Custom CSS styling
 st.markdown("""
     <style>
@@ -218,158 +217,22 @@ def load_eda(file_obj):
 def load_csv(file_obj):
     return pd.read_csv(file_obj)
 
-def plot_numeric(col, details, df):
+def plot_numeric(col, details, df, fingerprint):
     with st.container():
         st.subheader(f":bar_chart: {col.capitalize()} Distribution")
-        if "histogram" in details:
-            bins = details["histogram"].get("bins", [])
-            counts = details["histogram"].get("counts", [])
-            if bins and counts:
-                df_hist = pd.DataFrame({"Bin": bins[:-1], "Count": counts})
-                fig = px.bar(
-                    df_hist, 
-                    x="Bin", 
-                    y="Count", 
-                    title=f"{col.capitalize()} Distribution",
-                    template="plotly_white"
-                )
-                fig.update_layout(
-                    plot_bgcolor="rgba(0,0,0,0)",
-                    paper_bgcolor="rgba(0,0,0,0)",
-                    font_color="#333333",
-                    bargap=0.3,
-                    bargroupgap=0.1
-                )
-                fig.update_traces(marker_color="#FF69B4")
-                st.session_state.numeric_figs.append(fig)
-                st.plotly_chart(fig, use_container_width=True)
-            else:
-                fig = px.histogram(
-                    df, 
-                    x=col, 
-                    nbins=10, 
-                    title=f"{col.capitalize()} Distribution",
-                    template="plotly_white"
-                )
-                fig.update_layout(
-                    plot_bgcolor="rgba(0,0,0,0)",
-                    paper_bgcolor="rgba(0,0,0,0)",
-                    font_color="#333333",
-                    bargap=0.3,
-                    bargroupgap=0.1
-                )
-                fig.update_traces(marker_color="#FF69B4")
-                st.session_state.numeric_figs.append(fig)
-                st.plotly_chart(fig, use_container_width=True)
-        else:
-            fig = px.histogram(
-                df, 
-                x=col, 
-                nbins=10, 
-                title=f"{col.capitalize()} Distribution",
-                template="plotly_white"
-            )
-            fig.update_layout(
-                plot_bgcolor="rgba(0,0,0,0)",
-                paper_bgcolor="rgba(0,0,0,0)",
-                font_color="#333333",
-                bargap=0.3,
-                bargroupgap=0.1
-            )
-            fig.update_traces(marker_color="#FF69B4")
-            st.session_state.numeric_figs.append(fig)
-            st.plotly_chart(fig, use_container_width=True)
-        
+        st.plotly_chart(figures.histogram_figure(fingerprint, col, details, df), use_container_width=True)
+
         if details.get("outlier_count", 0) > 0:
-            fig = px.box(
-                df, 
-                y=col, 
-                title=f"{col.capitalize()} Outliers",
-                template="plotly_white"
-            )
-            fig.update_layout(
-                plot_bgcolor="rgba(0,0,0,0)",
-                paper_bgcolor="rgba(0,0,0,0)",
-                font_color="#333333"
-            )
-            fig.update_traces(marker_color="#FF69B4", line=dict(color="#FF69B4"))
-            # Assuming outlier_figs is a global or session variable similar to numeric_figs
-            outlier_figs.append(fig)
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(figures.box_figure(fingerprint, col, details, df), use_container_width=True)
 
 
-def plot_categorical(col, details, df):
+def plot_categorical(col, details, df, fingerprint):
     with st.container():
         st.subheader(f":pie_chart: {col.capitalize()} Distribution")
-        # Define a custom color sequence with a beautiful pink accent and complementary hues.
-        custom_colors = ["#FF69B4", "#FF85C1", "#FF9EC6", "#FFB8CB", "#FFD2D0"]
-        
-        if "top_categories" in details:
-            data = details["top_categories"]
-            df_bar = pd.DataFrame(list(data.items()), columns=["Category", "Count"])
-            if len(data) <= 6:
-                # Create a pie chart for few categories
-                fig = px.pie(
-                    df_bar, 
-                    names="Category", 
-                    values="Count",
-                    title=f"{col.capitalize()} Distribution",
-                    template="plotly_white",
-                    hole=0.3,
-                    color_discrete_sequence=custom_colors
-                )
-                # Update layout for a modern look
-                fig.update_layout(
-                    plot_bgcolor="rgba(0,0,0,0)",
-                    paper_bgcolor="rgba(0,0,0,0)",
-                    font_color="#333333"
-                )
-            else:
-                # Create a bar chart for many categories
-                fig = px.bar(
-                    df_bar, 
-                    x="Category", 
-                    y="Count",
-                    title=f"Top {col.capitalize()} Categories",
-                    template="plotly_white",
-                    color_discrete_sequence=custom_colors
-                )
-                fig.update_layout(
-                    plot_bgcolor="rgba(0,0,0,0)",
-                    paper_bgcolor="rgba(0,0,0,0)",
-                    font_color="#333333",
-                    bargap=0.3,
-                    bargroupgap=0.1
-                )
-                # For bar charts, if you want a single color accent:
-                fig.update_traces(marker_color="#FF69B4")
-                
-            st.session_state.categorical_figs.append(fig)
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            uniq = df[col].value_counts().nlargest(10)
-            df_bar = pd.DataFrame(uniq.items(), columns=["Category", "Count"])
-            fig = px.bar(
-                df_bar, 
-                x="Category", 
-                y="Count",
-                title=f"Top 10 {col.capitalize()} Categories",
-                template="plotly_white",
-                color_discrete_sequence=custom_colors
-            )
-            fig.update_layout(
-                plot_bgcolor="rgba(0,0,0,0)",
-                paper_bgcolor="rgba(0,0,0,0)",
-                font_color="#333333",
-                bargap=0.3,
-                bargroupgap=0.1
-            )
-            fig.update_traces(marker_color="#FF69B4")
-            st.session_state.categorical_figs.append(fig)
-            st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(figures.categorical_figure(fingerprint, col, details, df), use_container_width=True)
 
 
-def plot_correlations(df, eda):
+def plot_correlations(df, eda, fingerprint):
     with st.container():
         st.subheader(":chart_with_upwards_trend: Correlation Analysis")
         num_cols = [col for col, det in eda["columns"].items() 
@@ -379,108 +242,404 @@ def plot_correlations(df, eda):
             st.warning("⚠️ Not enough numeric columns for correlation analysis")
             return
         
-        corr = df[num_cols].corr()
-        threshold = 0.3
+        corr, pairs = figures.correlated_pairs(df, num_cols)
+
+        scatter_mode = "auto"
+        if len(df) > figures.LARGE_SCATTER_ROWS:
+            choice = st.radio(
+                f"{len(df):,} rows: draw correlation scatters as",
+                ["Density heatmap", "Sampled points"],
+                horizontal=True,
+                key="large_scatter_mode"
+            )
+            scatter_mode = "density" if choice == "Density heatmap" else "sample"
         
         # Scatter plots
-        plotted = set()
-        for i in range(len(num_cols)):
-            for j in range(i + 1, len(num_cols)):
-                c1, c2 = num_cols[i], num_cols[j]
-                r = corr.loc[c1, c2]
-                if abs(r) >= threshold:
-                    key = f"{c1}_{c2}"
-                    if key not in plotted:
-                        fig = px.scatter(df, x=c1, y=c2, 
-                                        trendline="ols",
-                                        title=f"{c1.capitalize()} vs {c2.capitalize()} (r = {r:.2f})",
-                                        template="plotly_dark")
-                        fig.update_layout(
-                            plot_bgcolor="#1A2A3A",
-                            paper_bgcolor="#1A2A3A",
-                            font_color="#FAFAFA"
-                        )
-                        st.session_state.categorical_figs.append(fig)
-                        st.plotly_chart(fig, use_container_width=True)
-                        plotted.add(key)
+        for c1, c2, r in pairs:
+            fig = figures.scatter_figure(fingerprint, c1, c2, r, df, mode=scatter_mode)
+            st.plotly_chart(fig, use_container_width=True)
         
         # Heatmap
-        fig = px.imshow(corr,
-                      text_auto=True,
-                      aspect="auto",
-                      title="Correlation Heatmap",
-                      template="plotly_dark")
-        fig.update_layout(
-            plot_bgcolor="#1A2A3A",
-            paper_bgcolor="#1A2A3A",
-            font_color="#FAFAFA"
-        )
-        st.session_state.correlation_figs.append(fig)
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(figures.heatmap_figure(fingerprint, corr), use_container_width=True)
 
-def plot_time_series(df):
+def plot_time_series(df, fingerprint):
     with st.container():
         st.subheader(":clock1: Time Series Analysis")
-        date_cols = df.select_dtypes(include=["datetime", "datetime64[ns]"]).columns.tolist()
-        
-        for col in df.columns:
-            if "date" in col.lower() and col not in date_cols:
-                try:
-                    df[col] = pd.to_datetime(df[col])
-                    date_cols.append(col)
-                except:
-                    continue
+        df, date_cols = figures.detect_date_columns(df)
         
         if not date_cols:
             st.warning("⚠️ No valid date columns detected")
             return
         
+        ts_mode = "auto"
+        if len(df) > figures.TIME_SERIES_MAX_POINTS:
+            choice = st.radio(
+                f"{len(df):,} rows: summarise each series as",
+                ["Mean with min/max band", "Downsampled points (LTTB)"],
+                horizontal=True,
+                key="time_series_mode"
+            )
+            ts_mode = "bands" if choice == "Mean with min/max band" else "lttb"
+        
         for date_col in date_cols:
             st.subheader(f":calendar: Trend Over {date_col.capitalize()}")
-            df_sorted = df.sort_values(by=date_col)
-            numeric_cols = df.select_dtypes(include=["number"]).columns.tolist()
-            
-            for num_col in numeric_cols:
-                fig = px.line(df_sorted, 
-                            x=date_col, 
-                            y=num_col,
-                            title=f"{num_col.capitalize()} Over Time",
-                            template="plotly_dark")
-                fig.update_layout(
-                    plot_bgcolor="#1A2A3A",
-                    paper_bgcolor="#1A2A3A",
-                    font_color="#FAFAFA"
-                )
-                st.session_state.time_series_figs.append(fig)
+            for _, fig in figures.time_series_figures(fingerprint, df, date_col, mode=ts_mode):
                 st.plotly_chart(fig, use_container_width=True)
 
 def generate_pre_questions(eda):
 
-    return [
-        "What are the key trends in this dataset?",
-        "Do you notice any significant outliers?",
-        "How do the variables correlate?",
-        "What time-based patterns are present?",
-        "Any suggestions for further analysis?"
-    ]
+    return PRE_QUESTIONS
+
+
+def render_ai_insights(eda, data_set_name):
+    """Shows the AI insights, polling for them while the background call is still running."""
+    # Insights written from an earlier profile (another dataset, or the sampled
+    # profile the exact one has replaced) are dropped
+    profile_key = json_fingerprint(eda)
+    if st.session_state.get("ai_insights_key") != profile_key:
+        st.session_state.ai_insights = ""
+        st.session_state.ai_insights_key = profile_key
+    if st.session_state.ai_insights == "":
+        render_pending_insights(eda, data_set_name)
+    else:
+        st.markdown(st.session_state.ai_insights)
+
+
+@st.fragment(run_every=2)
+def render_pending_insights(eda, data_set_name):
+    """
+    Re-runs on its own every couple of seconds instead of blocking the page
+    until the prefetched insights arrive, then reruns the page once so they
+    are shown statically and the polling stops.
+    """
+    insights = prefetch.ready(insights_prompt(eda, data_set_name), "lite", "insights")
+    if insights is None:
+        st.info("⏳ AI insights are being generated in the background...")
+        return
+    st.session_state.ai_insights = insights
+    st.rerun()
+
+
+def render_llm_telemetry():
+    """Sidebar summary of LLM calls made by this worker process, with exports."""
+    with st.sidebar.expander("📡 LLM Call Telemetry", expanded=False):
+        summary = telemetry.summarize()
+        if not summary:
+            st.caption("No LLM calls yet.")
+            return
+        total_calls = sum(row["calls"] for row in summary)
+        total_latency = sum(row["total_latency_s"] for row in summary)
+        cache_hits = sum(row["cache_hit_rate"] * row["calls"] for row in summary)
+        col_calls, col_hits = st.columns(2)
+        col_calls.metric("Calls", total_calls)
+        col_hits.metric("Cache hits", f"{cache_hits / total_calls:.0%}")
+        st.metric("Total LLM time", f"{total_latency:.1f} s")
+        st.dataframe(
+            pd.DataFrame(summary)[["call_site", "calls", "avg_latency_s", "total_latency_s",
+                                   "prompt_tokens", "response_tokens", "cache_hit_rate", "errors"]],
+            hide_index=True,
+            use_container_width=True
+        )
+        st.download_button("Export JSON", telemetry.export_json(), file_name="llm_telemetry.json",
+                           mime="application/json")
+        st.download_button("Export Prometheus", telemetry.export_prometheus(), file_name="llm_telemetry.prom",
+                           mime="text/plain")
+
+
+PPTX_MIME = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+REPORT_STAGE_LABELS = {
+    "charts": "Building charts",
+    "insights": "Writing AI commentary",
+    "figures": "Rendering figures",
+    "sections": "Assembling slides",
+}
+
+
+REPORT_KINDS = {"PowerPoint": "pptx", "Interactive HTML": "html"}
+REPORT_MIME = {"pptx": PPTX_MIME, "html": "text/html"}
+
+
+def report_export_options():
+    """
+    Report format and, for the PPT, image settings, chosen in a popover next to
+    the button. Returns (kind, options for the report builder).
+    """
+    with st.popover("Export options"):
+        kind = REPORT_KINDS[st.radio("Report format", list(REPORT_KINDS), horizontal=True, key="report_kind",
+                                     help="The HTML report keeps the charts interactive and is much faster to build.")]
+        if kind == "html":
+            return kind, {}
+        image_format = st.selectbox("Image format", ["png", "jpeg", "webp"], key="report_image_format",
+                                    help="JPEG gives the smallest decks; WebP figures are embedded as PNG.")
+        dpi = st.select_slider("Resolution (DPI)", [72, 96, 150, 200, 300], value=150, key="report_dpi")
+        max_dimension = st.number_input("Max image size (px)", min_value=400, max_value=6000, value=2000,
+                                        step=100, key="report_max_dimension")
+    return kind, {"image_format": image_format, "dpi": dpi, "max_dimension": int(max_dimension)}
+
+
+def render_report_job():
+    """Download button, error or live progress for this session's report job."""
+    job = report_jobs.get_job(st.session_state.report_job)
+    if job is None:
+        st.session_state.report_job = None
+        return
+    if job["status"] == report_jobs.DONE:
+        from generate_report import format_size
+        st.download_button(label=f"{job['label']} ({format_size(job['size_bytes'])})", data=job["result"],
+                           file_name=job["file_name"], mime=REPORT_MIME[job["kind"]])
+    elif job["status"] == report_jobs.FAILED:
+        st.error(f"Report generation failed: {job['error']}")
+    else:
+        render_report_progress()
+
+
+@st.fragment(run_every=1)
+def render_report_progress():
+    """Polls the running report job; reruns the page once it has finished."""
+    job = report_jobs.get_job(st.session_state.report_job)
+    if job is None or report_jobs.is_finished(job):
+        st.rerun()
+    text = REPORT_STAGE_LABELS.get(job["stage"], "Queued")
+    if job["stage"] == "figures" and job["figures_total"]:
+        text += f" ({job['figures_done']}/{job['figures_total']})"
+    elif job["stage"] == "sections" and job["sections_total"]:
+        text += f" ({job['sections_done']}/{job['sections_total']})"
+    st.progress(report_jobs.progress_fraction(job), text=text)
+
+
+PERF_RUNS_KEPT = 20
+
+
+@st.fragment(run_every=2)
+def render_profile_notice(handle):
+    """
+    Marks a profile estimated from a sample as approximate. Reruns the page
+    once the exact profile has replaced it in the dataset store.
+    """
+    approximate = handle.eda.get("approximate")
+    if approximate is None:
+        st.rerun()
+    text = (f"Approximate profile: statistics are estimated from a {approximate['sampling']} sample of "
+            f"{approximate['sample_rows']:,} of {approximate['population_rows']:,} rows, "
+            f"with {approximate['confidence']:.0%} confidence intervals in the profile JSON.")
+    if handle.profile_pending:
+        text += " The exact profile is being computed and will replace it automatically."
+    st.info(text)
+
+
+def render_performance_panel():
+    """Sidebar breakdown of where this session's time (and memory) went, with a trace export."""
+    with st.sidebar.expander("⏱️ Performance", expanded=False):
+        if not perf.memory_tracking():
+            st.caption("Peak memory is not tracked; start the app with DW_PERF_MEMORY=1 to record it.")
+
+        summary = perf.summarize([st.session_state.perf_run])
+        if not summary:
+            st.caption("Nothing measured in this run yet.")
+        else:
+            st.caption("This run")
+            st.dataframe(pd.DataFrame(summary), hide_index=True, use_container_width=True)
+        if st.session_state.report_job:
+            report_summary = perf.summarize([report_jobs.report_run_id(st.session_state.report_job)])
+            if report_summary:
+                st.caption("Latest report export")
+                st.dataframe(pd.DataFrame(report_summary), hide_index=True, use_container_width=True)
+
+        store = dataset_store.stats()
+        st.caption(f"Shared datasets in this process: {store['datasets']} "
+                   f"({store['total_mb']} of {store['budget_mb']} MB, {store['references']} session references)")
+
+        runs = st.session_state.perf_runs + [report_jobs.report_run_id(job_id)
+                                             for job_id in st.session_state.report_jobs]
+        st.download_button("Export trace", perf.export_chrome_trace(runs), file_name="datawhisperer_trace.json",
+                           mime="application/json",
+                           help="Chrome trace format: open in Perfetto (ui.perfetto.dev) or chrome://tracing.")
+
+
+def get_chat_session(eda, dataset_key):
+    """
+    Returns this user's ChatSession for the dataset (identified by
+    dataset_key), starting a fresh one (and clearing the displayed history)
+    when the dataset changes. When only its profile changes, as when the exact
+    profile replaces a sampled one, the conversation carries over to a session
+    with the new context.
+    """
+    session = st.session_state.get("chat_session")
+    profile_key = json_fingerprint(eda)
+    if st.session_state.get("chat_session_key") != dataset_key:
+        if session is not None:
+            session.close()
+        st.session_state.chat_session = ChatSession(eda)
+        st.session_state.chat_session_key = dataset_key
+        st.session_state.chat_history = []
+        st.session_state.selected_question = None
+    elif st.session_state.get("chat_profile_key") != profile_key:
+        st.session_state.chat_session = ChatSession(eda)
+        st.session_state.chat_session.turns = list(session.turns)
+        session.close()
+    st.session_state.chat_profile_key = profile_key
+    return st.session_state.chat_session
+
+
+ANALYSIS_VIEWS = [
+    "📊 Numerical Analysis",
+    "📚 Categorical Analysis",
+    "📈 Correlations",
+    "⏳ Time Series",
+    "🔍 Outliers",
+    "📑 AI Insights",
+    "🤖 Ask AI"
+]
+COLUMNS_PER_PAGE = 8
+
+
+def paginate(items, key):
+    """
+    Splits long column lists into pages so only the visible page's charts are
+    built. Returns the items on the selected page.
+    """
+    if len(items) <= COLUMNS_PER_PAGE:
+        return items
+    pages = (len(items) + COLUMNS_PER_PAGE - 1) // COLUMNS_PER_PAGE
+    page = st.number_input(f"Page (of {pages}, {len(items)} columns)", min_value=1, max_value=pages,
+                           value=1, step=1, key=key)
+    return items[(page - 1) * COLUMNS_PER_PAGE:page * COLUMNS_PER_PAGE]
+
+
+def render_chat(chat_eda):
+    chat_session = get_chat_session(chat_eda, st.session_state.dataset.fingerprint)
+    if "chat_history" not in st.session_state:
+        st.session_state.chat_history = []
+    if "selected_question" not in st.session_state:
+        st.session_state.selected_question = None
+
+    if not st.session_state.chat_history and st.session_state.selected_question is None:
+        st.markdown("Select a question to start the chat:")
+        questions = generate_pre_questions(chat_eda)
+        q_cols = st.columns(len(questions))
+        for i, q in enumerate(questions):
+            if q_cols[i].button(q, key=f"q_{i}"):
+                st.session_state.selected_question = q
+                st.session_state.chat_history.append(("User", q))
+                with st.spinner("Generating response..."):
+                    response = prefetch.answer(pre_question_prompt(chat_eda, q), "lite", "pre_question")
+                chat_session.add_turn(q, response)
+                st.session_state.chat_history.append(("AI", response))
+                st.rerun()
+
+    for sender, msg in st.session_state.chat_history:
+        alignment_class = "user" if sender == "User" else "ai"
+        bubble_class = "chat-user" if sender == "User" else "chat-ai"
+        st.markdown(
+            f'<div class="chat-row {alignment_class}"><div class="chat-bubble {bubble_class}">{msg}</div></div>',
+            unsafe_allow_html=True
+        )
+
+    # Chat input form with enter-to-send and auto-clear
+    with st.form(key="chat_form", clear_on_submit=True):
+        chat_input = st.text_input("Type your message here", key="chat_input")
+        submit_button = st.form_submit_button("Send")
+        if submit_button and chat_input:
+            st.session_state.chat_history.append(("User", chat_input))
+            with st.spinner("Generating response..."):
+                response = chat_session.send(chat_input)
+            st.session_state.chat_history.append(("AI", response))
+            st.rerun()
+
+
+def render_subset_insights(eda, data_set_name):
+    subset_eda_summary = json.dumps(eda)
+    prompt = f"""
+            You are a senior data analyst. Given the EDA results for a subset of {data_set_name}:
+
+            1. Identify key trends (minimum 3) with statistical evidence
+            2. Highlight actionable insights with clear business implications
+            3. Find anomalies requiring investigation
+            4. Suggest data-driven recommendations
+            5. Explain technical concepts in simple terms
+
+            EDA Analysis Results:
+            ${subset_eda_summary}
+
+            Specific requirements:
+            - Use bullet points with clear headers
+            - Prioritize business impact
+            - Include confidence levels where applicable
+            - Suggest next analysis steps
+            - use a around 8110 tokens if there is enough data we needed to provide indepth analysis so you needed to more tokens whereever needed
+            """
+    with st.spinner("Generating insights..."):
+        st.markdown(get_gemini_response(prompt, "flash", call_site="subset_insights"))
+
+
+def render_analysis(df, eda, fingerprint, data_set_name, chat_eda, subset=False):
+    """
+    Analysis dashboard for df. Only the selected view is computed on each run
+    (st.tabs would execute all seven), and figures come from the figure cache,
+    so switching back to a view is cheap.
+    """
+    key_prefix = "subset_" if subset else ""
+    view = st.radio("Analysis view", ANALYSIS_VIEWS, horizontal=True, key=f"{key_prefix}analysis_view",
+                    label_visibility="collapsed")
+    with perf.stage("view", view=view, subset=subset):
+        render_view(view, df, eda, fingerprint, data_set_name, chat_eda, subset, key_prefix)
+
+
+def render_view(view, df, eda, fingerprint, data_set_name, chat_eda, subset, key_prefix):
+
+    if view == "📊 Numerical Analysis":
+        st.markdown("### :1234: Numerical Column Analysis")
+        numeric = [(col, det) for col, det in eda["columns"].items() if "numeric_stats" in det]
+        for col, det in paginate(numeric, f"{key_prefix}numeric_page"):
+            plot_numeric(col, det, df, fingerprint)
+
+    elif view == "📚 Categorical Analysis":
+        categorical = [(col, det) for col, det in eda["columns"].items() if is_categorical(det)]
+        for col, det in paginate(categorical, f"{key_prefix}categorical_page"):
+            plot_categorical(col, det, df, fingerprint)
+
+    elif view == "📈 Correlations":
+        plot_correlations(df, eda, fingerprint)
+
+    elif view == "⏳ Time Series":
+        plot_time_series(df, fingerprint)
+
+    elif view == "🔍 Outliers":
+        st.markdown("### :mag: Outlier Detection")
+        outlier_cols = [(col, det) for col, det in eda["columns"].items()
+                        if "numeric_stats" in det and det.get("outlier_count", 0) > 0]
+        outlier_index = get_outlier_index(df, fingerprint)
+        for col, det in paginate(outlier_cols, f"{key_prefix}outlier_page"):
+            fig = figures.box_figure(fingerprint, col, det, df, theme=figures.DARK)
+            st.plotly_chart(fig, use_container_width=True)
+            counts = ", ".join(f"{method}: {info['count']:,}" for method, info in det.get("outliers", {}).items())
+            if st.toggle(f"Show outlier rows for {col}" + (f" ({counts})" if counts else ""),
+                         key=f"{key_prefix}outlier_rows_{col}"):
+                methods = outlier_index.methods(col)
+                method = st.radio("Rule", methods, horizontal=True, key=f"{key_prefix}outlier_rule_{col}") \
+                    if len(methods) > 1 else "iqr"
+                st.dataframe(outlier_index.rows(df, col, method), use_container_width=True)
+
+    elif view == "📑 AI Insights":
+        st.subheader("🤖 AI Insights")
+        if subset:
+            render_subset_insights(eda, data_set_name)
+        else:
+            render_ai_insights(eda, data_set_name)
+
+    elif view == "🤖 Ask AI":
+        st.subheader("🤖 Ask AI")
+        render_chat(chat_eda)
 
 
 def main():
     # Initialize session state
-    if "numeric_figs" not in st.session_state:
-        st.session_state.numeric_figs = []
-    if "categorical_figs" not in st.session_state:
-        st.session_state.categorical_figs = []
-    if "correlation_figs" not in st.session_state:
-        st.session_state.correlation_figs = []
-    if "time_series_figs" not in st.session_state:
-        st.session_state.time_series_figs = []
-    if "outlier_figs" not in st.session_state:
-        st.session_state.outlier_figs = []
     if "subset_eda" not in st.session_state:
         st.session_state.subset_eda = {}
     if "subset_df" not in st.session_state:
         st.session_state.subset_df = pd.DataFrame()
+    if "subset_query" not in st.session_state:
+        st.session_state.subset_query = ""
     if "data_peek_mode" not in st.session_state:
         st.session_state.data_peek_mode = False
     if "df" not in st.session_state:
@@ -489,6 +648,15 @@ def main():
         st.session_state.ai_insights = ""
     if "csv_upload" not in st.session_state:
         st.session_state.csv_upload = False
+    if "report_job" not in st.session_state:
+        st.session_state.report_job = None
+    if "report_jobs" not in st.session_state:
+        st.session_state.report_jobs = []
+    if "perf_runs" not in st.session_state:
+        st.session_state.perf_runs = []
+    # Stages recorded during this script run are grouped under one perf run
+    st.session_state.perf_run = perf.begin_run()
+    st.session_state.perf_runs = (st.session_state.perf_runs + [st.session_state.perf_run])[-PERF_RUNS_KEPT:]
 
     # Header
     col1, col2 = st.columns([1, 4])
@@ -520,12 +688,16 @@ def main():
         
     st.session_state.df = None
     data_set_name = "dataset.csv"
+    # Read, cleaned and profiled datasets are shared between sessions through the
+    # dataset store; the session keeps a handle (a reference) to its current one.
+    current = st.session_state.get("dataset")
+    handle = None
     if use_demo or st.session_state.csv_upload:
         data_set_name = "lung_disease_data.csv"
         try:
             with open(data_set_name, "rb") as f:
-                st.session_state.df = read_and_validate_file(f)
-            if st.session_state.df is None:
+                handle = dataset_store.open_file(f, current=current)
+            if handle is None:
                 st.error("Failed to load the demo CSV file.")
         except Exception as e:
             st.error(f"Error loading demo file: {e}")
@@ -534,8 +706,8 @@ def main():
         file_name = uploaded_file.name.lower()
         data_set_name = file_name
         if file_name.endswith(".csv"):
-            st.session_state.df = read_and_validate_file(uploaded_file)
-            if st.session_state.df is None:
+            handle = dataset_store.open_file(uploaded_file, current=current)
+            if handle is None:
                 st.error("Failed to read the CSV file.")
         elif file_name.endswith(".xlsx"):
             excel_file = pd.ExcelFile(uploaded_file)
@@ -545,19 +717,28 @@ def main():
                 selected_sheet = st.selectbox("Select a sheet", sheet_names)
             else:
                 selected_sheet = sheet_names[0]
-            st.session_state.df = read_and_validate_file(uploaded_file, sheet_name=selected_sheet)
-            if st.session_state.df is None:
+            handle = dataset_store.open_file(uploaded_file, sheet_name=selected_sheet, current=current)
+            if handle is None:
                 st.error("Failed to read the Excel file or invalid sheet selected.")
-
-    if st.session_state.df is not None:
-        st.session_state.df = clean_data(st.session_state.df)
-        eda = enhanced_eda_json(st.session_state.df)
+    if handle is None and current is not None:
+        current.release()
+    st.session_state.dataset = handle
+
+    if handle is not None:
+        # Shared, read-only frame: anything that modifies data works on a copy
+        st.session_state.df = handle.df
+        # Keys the figure and outlier caches, so they are only rebuilt when the data changes
+        fingerprint = handle.fingerprint
+        outlier_index = handle.outlier_index
+        eda = handle.eda
         st.markdown("## :clipboard: Dataset Overview")
         col_rows, col_cols, col_explorer, col_ppt = st.columns([1, 1, 1, 1])
         with col_rows:
             st.metric("Rows", f"{st.session_state.df.shape[0]:,}")
         with col_cols:
             st.metric("Columns", f"{st.session_state.df.shape[1]}")
+        if eda is not None and eda.get("approximate"):
+            render_profile_notice(handle)
 
         with col_explorer:
             if not st.session_state.data_peek_mode:
@@ -588,165 +769,49 @@ def main():
                     st.rerun()
 
         with col_ppt:
-            if st.button("Generate PPT Report", key="generate_ppt"):
+            job = report_jobs.get_job(st.session_state.report_job) if st.session_state.report_job else None
+            report_running = job is not None and not report_jobs.is_finished(job)
+            # The report is built in the background; progress and the download show below the button
+            report_kind, report_options = report_export_options()
+            report_label = "PPT" if report_kind == "pptx" else "HTML"
+            if st.button(f"Generate {report_label} Report", key="generate_ppt", disabled=report_running):
                 if not st.session_state.data_peek_mode:
-
-                    ppt_buffer = generate_eda_report_ppt(
-                        eda_metadata=eda,
-                        df=st.session_state.df,
-                        numeric_figs=st.session_state.numeric_figs,       
-                        categorical_figs=st.session_state.categorical_figs,    
-                        correlation_figs=st.session_state.correlation_figs,    
-                        time_series_figs=st.session_state.time_series_figs,      
-                        outlier_figs=st.session_state.outlier_figs,         
-                        dataset_name=data_set_name
-                    )
-                    st.download_button(
-                        label="Download PPT",
-                        data=ppt_buffer,
-                        file_name="EDA_Full_Report.pptx",
-                        mime="application/vnd.openxmlformats-officedocument.presentationml.presentation"
+                    st.session_state.report_job = report_jobs.submit_report(
+                        eda,
+                        st.session_state.df,
+                        fingerprint,
+                        data_set_name,
+                        file_name=f"EDA_Full_Report.{report_kind}",
+                        label=f"Download {report_label}",
+                        report_options=report_options,
+                        kind=report_kind,
                     )
                 else:
-
-                    ppt_buffer = generate_eda_report_ppt(
-                        eda_metadata=st.session_state.subset_eda,
-                        df=st.session_state.subset_df,
-                        numeric_figs=st.session_state.numeric_figs,       
-                        categorical_figs=st.session_state.categorical_figs,    
-                        correlation_figs=st.session_state.correlation_figs,    
-                        time_series_figs=st.session_state.time_series_figs,      
-                        outlier_figs=st.session_state.outlier_figs,         
-                        dataset_name=data_set_name
-                    )
-                    st.download_button(
-                        label="Download PPT (Subset)",
-                        data=ppt_buffer,
-                        file_name="EDA_Subset_Report.pptx",
-                        mime="application/vnd.openxmlformats-officedocument.presentationml.presentation"
+                    st.session_state.report_job = report_jobs.submit_report(
+                        st.session_state.subset_eda,
+                        st.session_state.subset_df,
+                        dataset_fingerprint(st.session_state.subset_df),
+                        data_set_name,
+                        file_name=f"EDA_Subset_Report.{report_kind}",
+                        label=f"Download {report_label} (Subset)",
+                        report_options=report_options,
+                        kind=report_kind,
                     )
+                # Kept so the performance panel can export the session's report traces
+                st.session_state.report_jobs = (st.session_state.report_jobs + [st.session_state.report_job])[-PERF_RUNS_KEPT:]
+            if st.session_state.report_job:
+                render_report_job()
 
         if not st.session_state.data_peek_mode:
-
-            st.session_state.numeric_figs = []
-            st.session_state.categorical_figs = []
-            st.session_state.correlation_figs = []
-            st.session_state.time_series_figs = []
-            st.session_state.outlier_figs = []
+            # Answer the insights tab and pre-questions in the background while the charts render,
+            # once the profile they are written from is final
+            if not handle.profile_pending:
+                start_prefetch(eda, data_set_name)
 
             st.markdown("---")
-            tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
-                "📊 Numerical Analysis",
-                "📚 Categorical Analysis",
-                "📈 Correlations",
-                "⏳ Time Series",
-                "🔍 Outliers",
-                "📑 AI Insights",
-                "🤖 Ask AI"
-            ])
-            with tab1:
-                st.markdown("### :1234: Numerical Column Analysis")
-                for col, det in eda["columns"].items():
-                    if "numeric_stats" in det:
-                        plot_numeric(col, det, st.session_state.df)
-            with tab2:
-                for col, det in eda["columns"].items():
-                    if det.get("dtype", "").lower() == "object":
-                        plot_categorical(col, det, st.session_state.df)
-
-            with tab3:
-                plot_correlations(st.session_state.df, eda)
-
-            with tab4:
-                plot_time_series(st.session_state.df)
-
-            with tab5:
-                st.markdown("### :mag: Outlier Detection")
-                for col, det in eda["columns"].items():
-                    if "numeric_stats" in det and det.get("outlier_count", 0) > 0:
-                        fig = px.box(st.session_state.df, y=col, 
-                                    title=f"{col.capitalize()} Outlier Analysis",
-                                    template="plotly_dark")
-                        fig.update_layout(
-                            plot_bgcolor="#1A2A3A",
-                            paper_bgcolor="#1A2A3A",
-                            font_color="#FAFAFA"
-                        )
-                        st.plotly_chart(fig, use_container_width=True)
-            
-            with tab6:
-                st.subheader("🤖 AI Insights")
-                if "ai_insights" in st.session_state and st.session_state.ai_insights == "":
-                        eda_summary = json.dumps(eda)
-                        prompt = f"""
-                                You are a senior data analyst. Given the EDA results for {data_set_name}:
-
-                                1. Identify key trends (minimum 3) with statistical evidence
-                                2. Highlight actionable insights with clear business implications
-                                3. Find anomalies requiring investigation
-                                4. Suggest data-driven recommendations
-                                5. Explain technical concepts in simple terms
-
-                                EDA Analysis Results:
-                                {eda_summary}
-
-                                Specific requirements:
-                                - Use bullet points with clear headers
-                                - Prioritize business impact
-                                - Include confidence levels where applicable
-                                - use a around 8110 tokens if there is enough data we needed to provide indepth analysis so you needed to more tokens whereever needed
-                                - Suggest next analysis steps
-                                """
-                        st.session_state.ai_insights = get_gemini_response(prompt, "lite")
-                        st.markdown(st.session_state.ai_insights)
-                elif st.session_state.ai_insights != "":
-                    st.markdown(st.session_state.ai_insights)
-
-            with tab7:
-                st.subheader("🤖 Ask AI")
-                if "chat_history" not in st.session_state:
-                    st.session_state.chat_history = []
-                if "selected_question" not in st.session_state:
-                    st.session_state.selected_question = None
-
-                if not st.session_state.chat_history and st.session_state.selected_question is None:
-                    st.markdown("Select a question to start the chat:")
-                    questions = generate_pre_questions(eda)
-                    q_cols = st.columns(len(questions))
-                    for i, q in enumerate(questions):
-                        if q_cols[i].button(q, key=f"q_{i}"):
-                            st.session_state.selected_question = q
-                            st.session_state.chat_history.append(("User", q))
-                            with st.spinner("Generating response..."):
-                                response = get_gemini_response("Your role is a data analyst and answers user questions so try to be conversational and here is Dataset context: " + json.dumps(eda) + "\nQuestion: " + q, "lite")
-                            st.session_state.chat_history.append(("AI", response))
-                            st.rerun()
-
-                for sender, msg in st.session_state.chat_history:
-                    alignment_class = "user" if sender == "User" else "ai"
-                    bubble_class = "chat-user" if sender == "User" else "chat-ai"
-                    st.markdown(
-                        f'<div class="chat-row {alignment_class}"><div class="chat-bubble {bubble_class}">{msg}</div></div>',
-                        unsafe_allow_html=True
-                    )
-
-                # Chat input form with enter-to-send and auto-clear
-                with st.form(key="chat_form", clear_on_submit=True):
-                    chat_input = st.text_input("Type your message here", key="chat_input")
-                    submit_button = st.form_submit_button("Send")
-                    if submit_button and chat_input:
-                        st.session_state.chat_history.append(("User", chat_input))
-                        with st.spinner("Generating response..."):
-                            response = get_gemini_response("Your role is a data analyst and answers user questions so try to be conversational and here is Dataset context: " + json.dumps(eda) + "\nQuestion: " + chat_input, "flash")
-                        st.session_state.chat_history.append(("AI", response))
-                        st.rerun()
+            render_analysis(st.session_state.df, eda, fingerprint, data_set_name, chat_eda=eda)
         
         else:
-            st.session_state.numeric_figs = []
-            st.session_state.categorical_figs = []
-            st.session_state.correlation_figs = []
-            st.session_state.time_series_figs = []
-            st.session_state.outlier_figs = []
             st.markdown("---")
             empty_col, main_col, empty_col2 = st.columns([1,2,1])
             with main_col:
@@ -758,126 +823,40 @@ def main():
 
             if run_analysis_clicked:
                 if user_query.strip():
-                    sql_query = generate_sql_query(user_query, eda)
-
-                    st.session_state.subset_df = execute_sql_on_df(st.session_state.df, sql_query, eda)
+                    outlier_match = match_outlier_query(user_query, outlier_index)
+                    if outlier_match:
+                        # "Show me the outlier rows for X" is answered from the index, no SQL needed
+                        col, method = outlier_match
+                        st.session_state.subset_df = outlier_index.rows(st.session_state.df, col, method)
+                    else:
+                        sql_query = generate_sql_query(user_query, eda)
+                        st.session_state.subset_df = execute_sql_on_df(st.session_state.df, sql_query, eda)
                     # clean the subset_df
                     st.session_state.subset_df = clean_data(st.session_state.subset_df)
-                    st.session_state.subset_eda = enhanced_eda_json(st.session_state.subset_df)
-
                     if st.session_state.subset_df is not None and not st.session_state.subset_df.empty:
-
-                        st.markdown("### 🔍 **Filtered Data Subset**")
-                        st.dataframe(st.session_state.subset_df, use_container_width=True)
-                        st.markdown("---")
-                        tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
-                            "📊 Numerical Analysis",
-                            "📚 Categorical Analysis",
-                            "📈 Correlations",
-                            "⏳ Time Series",
-                            "🔍 Outliers",
-                            "📑 AI Insights",
-                            "🤖 Ask AI"
-                        ])
-                        with tab1:
-                            st.markdown("### :1234: Numerical Column Analysis")
-                            for col, det in st.session_state.subset_eda["columns"].items():
-                                if "numeric_stats" in det:
-                                    plot_numeric(col, det, st.session_state.subset_df)
-                        with tab2:
-                            for col, det in st.session_state.subset_eda["columns"].items():
-                                if det.get("dtype", "").lower() == "object":
-                                    plot_categorical(col, det, st.session_state.subset_df)
-
-                        with tab3:
-                            plot_correlations(st.session_state.subset_df, st.session_state.subset_eda)
-
-                        with tab4:
-                            plot_time_series(st.session_state.subset_df)
-
-                        with tab5:
-                            st.markdown("### :mag: Outlier Detection")
-                            for col, det in st.session_state.subset_eda["columns"].items():
-                                if "numeric_stats" in det and det.get("outlier_count", 0) > 0:
-                                    fig = px.box(st.session_state.subset_df, y=col, 
-                                                title=f"{col.capitalize()} Outlier Analysis",
-                                                template="plotly_dark")
-                                    fig.update_layout(
-                                        plot_bgcolor="#1A2A3A",
-                                        paper_bgcolor="#1A2A3A",
-                                        font_color="#FAFAFA"
-                                    )
-                                    st.plotly_chart(fig, use_container_width=True)
-                        
-                        with tab6:
-                            st.subheader("🤖 AI Insights")
-                            subset_eda_summary = json.dumps(st.session_state.subset_eda)
-                            prompt = f"""
-                                    You are a senior data analyst. Given the EDA results for a subset of {data_set_name}:
-
-                                    1. Identify key trends (minimum 3) with statistical evidence
-                                    2. Highlight actionable insights with clear business implications
-                                    3. Find anomalies requiring investigation
-                                    4. Suggest data-driven recommendations
-                                    5. Explain technical concepts in simple terms
-
-                                    EDA Analysis Results:
-                                    ${subset_eda_summary}
-
-                                    Specific requirements:
-                                    - Use bullet points with clear headers
-                                    - Prioritize business impact
-                                    - Include confidence levels where applicable
-                                    - Suggest next analysis steps
-                                    - use a around 8110 tokens if there is enough data we needed to provide indepth analysis so you needed to more tokens whereever needed
-                                    """
-                            st.session_state.ai_insights = get_gemini_response(prompt, "flash")
-                            st.markdown(st.session_state.ai_insights)
-                    
-                        with tab7:
-                            st.subheader("🤖 Ask AI")
-                            if "chat_history" not in st.session_state:
-                                st.session_state.chat_history = []
-                            if "selected_question" not in st.session_state:
-                                st.session_state.selected_question = None
-
-                            if not st.session_state.chat_history and st.session_state.selected_question is None:
-                                st.markdown("Select a question to start the chat:")
-                                questions = generate_pre_questions(eda)
-                                q_cols = st.columns(len(questions))
-                                for i, q in enumerate(questions):
-                                    if q_cols[i].button(q, key=f"q_{i}"):
-                                        st.session_state.selected_question = q
-                                        st.session_state.chat_history.append(("User", q))
-                                        with st.spinner("Generating response..."):
-                                            response = get_gemini_response("Dataset context: " + json.dumps(eda) + "\nQuestion: " + q, "lite")
-                                        st.session_state.chat_history.append(("AI", response))
-                                        st.rerun()
-
-                            for sender, msg in st.session_state.chat_history:
-                                alignment_class = "user" if sender == "User" else "ai"
-                                bubble_class = "chat-user" if sender == "User" else "chat-ai"
-                                st.markdown(
-                                    f'<div class="chat-row {alignment_class}"><div class="chat-bubble {bubble_class}">{msg}</div></div>',
-                                    unsafe_allow_html=True
-                                )
-
-                            # Chat input form with enter-to-send and auto-clear
-                            with st.form(key="chat_form", clear_on_submit=True):
-                                chat_input = st.text_input("Type your message here", key="chat_input")
-                                submit_button = st.form_submit_button("Send")
-                                if submit_button and chat_input:
-                                    st.session_state.chat_history.append(("User", chat_input))
-                                    with st.spinner("Generating response..."):
-                                        response = get_gemini_response("Your role is a data analyst and answers user questions so try to be conversational and here is Dataset context: " + json.dumps(eda) + "\nQuestion: " + chat_input, "flash")
-                                    st.session_state.chat_history.append(("AI", response))
-                                    st.rerun()
-
+                        subset_index = get_outlier_index(st.session_state.subset_df)
                     else:
+                        subset_index = None
+                    st.session_state.subset_eda = enhanced_eda_json(st.session_state.subset_df,
+                                                                    outlier_index=subset_index)
+                    st.session_state.subset_query = user_query
+
+                    if st.session_state.subset_df is None or st.session_state.subset_df.empty:
                         st.warning("No results found or either the question was too ambiguos, Try a different query.")
                 else:
                     st.warning("Please enter a query before running.")
 
+            # The subset stays in session state, so switching views re-renders it without re-querying
+            if st.session_state.subset_df is not None and not st.session_state.subset_df.empty:
+                subset_fingerprint = dataset_fingerprint(st.session_state.subset_df)
+
+                st.markdown("### 🔍 **Filtered Data Subset**")
+                st.caption(f"Results for: {st.session_state.subset_query}")
+                st.dataframe(st.session_state.subset_df, use_container_width=True)
+                st.markdown("---")
+                render_analysis(st.session_state.subset_df, st.session_state.subset_eda, subset_fingerprint,
+                                data_set_name, chat_eda=eda, subset=True)
+
     else:
         col1, col2 = st.columns([1.5, 3])
         with col2:
@@ -885,6 +864,9 @@ def main():
         with col1:
             st.warning(":warning: Please upload a valid CSV file or an Excel sheet to begin")
 
+    render_llm_telemetry()
+    render_performance_panel()
+
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,136 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+import perf
+from semantic_types import sample_values
+
+# Duplicate rows found through one pass of vectorised 64-bit row hashes
+# (pd.util.hash_pandas_object), replacing separate drop_duplicates() and
+# duplicated() scans. Rows whose hashes match are checked against the first
+# row of their group, so a hash collision can't merge distinct rows; should
+# one ever occur, the exact pandas scan is used instead.
+#
+# Like drop_duplicates(), missing values compare equal. Unlike it, values that
+# are equal but stored differently (0.0 and -0.0, or 1 and 1.0 in a mixed
+# object column) hash apart and are not treated as duplicates.
+
+# Rows hashed per chunk, bounding the per-column intermediates on large frames
+ROW_HASH_CHUNK_ROWS = 1_000_000
+DUPLICATE_GROUPS_REPORTED = 5
+# Odd multiplier mixing each column's hash into the row hash
+_ROW_HASH_MULTIPLIER = np.uint64(0x100000001B3)
+# Text columns more unique than this (in a sample) are hashed value by value;
+# the rest are factorized first so each distinct value is hashed once
+_CATEGORIZE_MAX_UNIQUE_RATIO = 0.5
+
+
+def _categorize(series):
+    if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+        return True
+    sample = sample_values(series, 1000)
+    try:
+        return sample.nunique() < _CATEGORIZE_MAX_UNIQUE_RATIO * max(len(sample), 1)
+    except TypeError:
+        # Unhashable cell values (lists, dicts) are hashed by their text form
+        return False
+
+
+def _column_hashes(series, categorize):
+    try:
+        return pd.util.hash_pandas_object(series, index=False, categorize=categorize).to_numpy()
+    except (TypeError, ValueError):
+        # Unhashable cell values (lists, dicts): hash their text form
+        return pd.util.hash_pandas_object(series.astype(str), index=False, categorize=categorize).to_numpy()
+
+
+def row_hashes(df, chunk_rows=ROW_HASH_CHUNK_ROWS):
+    """
+    One uint64 hash per row of df (values only, not the index). A row's hash
+    depends only on its values, so frames can be hashed chunk by chunk.
+    """
+    categorize = [_categorize(df.iloc[:, i]) for i in range(df.shape[1])]
+    hashes = np.empty(len(df), dtype=np.uint64)
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        chunk_hashes = np.zeros(len(chunk), dtype=np.uint64)
+        for i in range(chunk.shape[1]):
+            chunk_hashes *= _ROW_HASH_MULTIPLIER
+            chunk_hashes ^= _column_hashes(chunk.iloc[:, i], categorize[i])
+        hashes[start:start + len(chunk)] = chunk_hashes
+    return hashes
+
+
+class DuplicateIndex:
+    """
+    Duplicate groups of one frame: every row's group and each group's size
+    and first row, by position in the indexed frame.
+    """
+
+    def __init__(self, codes, first_positions, sizes):
+        self.n_rows = len(codes)
+        self._codes = codes
+        self._first = first_positions
+        self._sizes = sizes
+
+    def mask(self):
+        """True for every row that repeats an earlier one (drop_duplicates' keep="first")."""
+        return np.arange(self.n_rows) != self._first[self._codes]
+
+    def count(self):
+        """Number of rows that repeat an earlier one."""
+        return int(self.n_rows - len(self._sizes))
+
+    def percentage(self):
+        return round(self.count() / self.n_rows * 100, 2) if self.n_rows else 0.0
+
+    def groups(self, df, top=DUPLICATE_GROUPS_REPORTED):
+        """
+        The ``top`` largest groups of identical rows in df (the indexed frame),
+        each as its row count, first row position and the row's values.
+        """
+        repeated = np.flatnonzero(self._sizes > 1)
+        if not len(repeated):
+            return []
+        # Largest first; ties in order of first appearance
+        largest = repeated[np.argsort(-self._sizes[repeated], kind="stable")[:top]]
+        positions = self._first[largest]
+        values = json.loads(df.iloc[positions].to_json(orient="records", date_format="iso", default_handler=str))
+        return [{"rows": int(self._sizes[group]), "first_row": int(position), "values": row}
+                for group, position, row in zip(largest, positions, values)]
+
+
+def _rows_match(df, positions, first_positions):
+    left = df.iloc[positions].reset_index(drop=True)
+    right = df.iloc[first_positions].reset_index(drop=True)
+    equal = (left == right) | (left.isna() & right.isna())
+    return bool(equal.to_numpy().all())
+
+
+def _from_codes(codes):
+    # Codes are numbered in order of first appearance, so a group starts
+    # wherever the running maximum code goes up
+    running_max = np.maximum.accumulate(codes) if len(codes) else codes
+    first_positions = np.flatnonzero(np.diff(running_max, prepend=-1) > 0)
+    return DuplicateIndex(codes, first_positions, np.bincount(codes, minlength=len(first_positions)))
+
+
+@perf.timed("duplicate_index")
+def build_duplicate_index(df, hashes=None, chunk_rows=ROW_HASH_CHUNK_ROWS):
+    """
+    Groups identical rows of df by their row hashes (computed here unless
+    given, e.g. when they were already needed for the dataset fingerprint).
+    """
+    if hashes is None:
+        hashes = row_hashes(df, chunk_rows)
+    codes, _ = pd.factorize(hashes)
+    index = _from_codes(codes)
+    mask = index.mask()
+    if mask.any():
+        duplicates = np.flatnonzero(mask)
+        if not _rows_match(df, duplicates, index._first[codes[duplicates]]):
+            # A 64-bit collision: group by the values themselves instead
+            codes = df.groupby(list(df.columns), sort=False, dropna=False).ngroup().to_numpy()
+            index = _from_codes(codes)
+    return index
@@ -0,0 +1,211 @@
+import io
+import os
+import json
+import time
+import atexit
+import hashlib
+import logging
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+import perf
+
+# Figure -> image rendering for the report exporters. kaleido starts a headless
+# browser on first use, so figures are rendered in a pool of worker processes that
+# each keep a warm kaleido instance, and images are cached by a hash of the figure
+# spec so re-exporting an unchanged dashboard doesn't render anything.
+
+RENDER_WORKERS = min(4, os.cpu_count() or 1)
+# Below this many uncached figures, rendering in-process beats the pool round trip
+MIN_PARALLEL_FIGURES = 2
+
+# Formats render_figures produces. PPTX can't embed WebP, so "webp" figures are
+# rendered as WebP and re-encoded as PNG; JPEG is flattened onto white since it
+# has no alpha channel.
+IMAGE_FORMATS = ("png", "jpeg", "webp")
+JPEG_QUALITY = 85
+
+# Upper bound on the total size of cached images (bytes)
+IMAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+_image_cache = OrderedDict()
+_image_cache_bytes = 0
+_image_cache_lock = threading.Lock()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _warm_worker():
+    # Pays kaleido's browser start-up once per worker instead of on its first figure
+    try:
+        pio.to_image(go.Figure(), format="png", width=10, height=10)
+    except Exception as e:
+        logging.info(f"Could not warm up kaleido in render worker: {e}")
+
+
+def _encode(fig, format, scale, width, height):
+    if format == "png":
+        return pio.to_image(fig, format="png", scale=scale, width=width, height=height)
+    # python-pptx depends on Pillow, so it is always there when reports are built
+    from PIL import Image
+
+    rendered = pio.to_image(fig, format="webp" if format == "webp" else "png",
+                            scale=scale, width=width, height=height)
+    image = Image.open(io.BytesIO(rendered))
+    out = io.BytesIO()
+    if format == "jpeg":
+        image = image.convert("RGBA")
+        flattened = Image.new("RGB", image.size, (255, 255, 255))
+        flattened.paste(image, mask=image.getchannel("A"))
+        flattened.save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    else:
+        image.save(out, format="PNG", optimize=True)
+    return out.getvalue()
+
+
+def _render_spec(spec, format, scale, width=None, height=None):
+    """Worker entry point: returns (image bytes or None, error or None, seconds)."""
+    start = time.perf_counter()
+    try:
+        fig = go.Figure(json.loads(spec), _validate=False)
+        return _encode(fig, format, scale, width, height), None, time.perf_counter() - start
+    except Exception as e:
+        return None, str(e), time.perf_counter() - start
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the app process has Streamlit and prefetch threads running
+            _pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_warm_worker)
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+atexit.register(shutdown_pool)
+
+
+def spec_hash(spec, format, scale, width=None, height=None):
+    return hashlib.sha1(f"{format}:{scale}:{width}x{height}:{spec}".encode("utf-8")).hexdigest()
+
+
+def _cache_get(key):
+    with _image_cache_lock:
+        image = _image_cache.get(key)
+        if image is not None:
+            _image_cache.move_to_end(key)
+        return image
+
+
+def _cache_put(key, image):
+    global _image_cache_bytes
+    with _image_cache_lock:
+        if key not in _image_cache:
+            _image_cache[key] = image
+            _image_cache_bytes += len(image)
+        while _image_cache_bytes > IMAGE_CACHE_MAX_BYTES and len(_image_cache) > 1:
+            _, evicted = _image_cache.popitem(last=False)
+            _image_cache_bytes -= len(evicted)
+
+
+def clear_image_cache():
+    global _image_cache_bytes
+    with _image_cache_lock:
+        _image_cache.clear()
+        _image_cache_bytes = 0
+
+
+def _render_all(specs, options, on_rendered):
+    """
+    Renders {hash: spec}, in the worker pool when there are enough of them.
+    on_rendered() is called after each figure completes.
+    """
+    if len(specs) >= MIN_PARALLEL_FIGURES and RENDER_WORKERS > 1:
+        try:
+            pool = _get_pool()
+            futures = {pool.submit(_render_spec, spec, *options): key for key, spec in specs.items()}
+            results = {}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                on_rendered()
+            return results
+        except (BrokenProcessPool, OSError, RuntimeError) as e:
+            # e.g. a worker was killed, or processes can't be started here
+            logging.warning(f"Render pool unavailable, rendering in-process: {e}")
+            shutdown_pool()
+    results = {}
+    for key, spec in specs.items():
+        results[key] = _render_spec(spec, *options)
+        on_rendered()
+    return results
+
+
+@perf.timed("report:render_figures")
+def render_figures(figs, format="png", scale=2, width=None, height=None, progress_callback=None):
+    """
+    Renders figs to images of the given format (see IMAGE_FORMATS), layout size
+    in CSS pixels (the figure's own size when None) and scale. Returns one dict
+    per figure, in order, with
+    "image" (bytes, or None on failure), "error", "seconds" (render time in the
+    worker, 0 for cache hits) and "cached". Identical figures are rendered once.
+
+    progress_callback(done, total), if given, is called as distinct figures
+    finish; cache hits count as done straight away.
+    """
+    if format not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported image format {format!r}, expected one of {IMAGE_FORMATS}")
+    options = (format, scale, width, height)
+    start = time.perf_counter()
+    keys = []
+    specs = {}
+    results = {}
+    for fig in figs:
+        spec = fig.to_json()
+        key = spec_hash(spec, *options)
+        keys.append(key)
+        image = _cache_get(key)
+        if image is not None:
+            results[key] = {"image": image, "error": None, "seconds": 0.0, "cached": True}
+        elif key not in specs:
+            specs[key] = spec
+
+    total = len(set(keys))
+    done = [total - len(specs)]
+
+    def on_rendered():
+        # min(): after a pool failure the in-process fallback re-renders the batch
+        done[0] = min(done[0] + 1, total)
+        if progress_callback is not None:
+            progress_callback(done[0], total)
+
+    if progress_callback is not None:
+        progress_callback(done[0], total)
+    for key, (image, error, seconds) in _render_all(specs, options, on_rendered).items():
+        if image is not None:
+            _cache_put(key, image)
+        results[key] = {"image": image, "error": error, "seconds": round(seconds, 3), "cached": False}
+
+    rendered = [dict(results[key]) for key in keys]
+    if rendered:
+        hits = sum(result["cached"] for result in rendered)
+        slowest = max(result["seconds"] for result in rendered)
+        logging.info(f"Rendered {len(rendered)} figures ({hits} cached, {len(specs)} rendered) in "
+                     f"{time.perf_counter() - start:.2f}s; slowest figure {slowest:.2f}s")
+    return rendered
@@ -0,0 +1,504 @@
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.utils import PlotlyJSONEncoder
+
+import perf
+from utils import json_fingerprint
+from outlier_index import get_outlier_index
+from semantic_types import is_categorical
+
+# Plotly figure builders shared by the dashboard and the report exporters, plus a
+# process-wide cache of figure specs keyed by
+# (dataset fingerprint, column, chart kind, theme) so a figure is built once per
+# dataset instead of on every Streamlit rerun.
+
+LIGHT = "light"
+DARK = "dark"
+
+THEME_TEMPLATES = {LIGHT: "plotly_white", DARK: "plotly_dark"}
+THEME_LAYOUTS = {
+    LIGHT: dict(plot_bgcolor="rgba(0,0,0,0)", paper_bgcolor="rgba(0,0,0,0)", font_color="#333333"),
+    DARK: dict(plot_bgcolor="#1A2A3A", paper_bgcolor="#1A2A3A", font_color="#FAFAFA"),
+}
+
+ACCENT = "#FF69B4"
+CATEGORY_COLORS = ["#FF69B4", "#FF85C1", "#FF9EC6", "#FFB8CB", "#FFD2D0"]
+CORRELATION_THRESHOLD = 0.3
+
+# Correlation scatters above this many rows are binned or sampled instead of
+# shipping every point to the browser
+LARGE_SCATTER_ROWS = 50_000
+SCATTER_SAMPLE_SIZE = 5_000
+DENSITY_BINS = 60
+
+# Box plots show at most this many individual outlier points
+MAX_OUTLIER_POINTS = 200
+
+# Time-series charts ship at most about this many points per series
+TIME_SERIES_MAX_POINTS = 2000
+BUCKET_FREQUENCIES = ["1s", "10s", "1min", "5min", "15min", "30min", "1h", "3h", "6h", "12h",
+                      "1D", "2D", "7D", "14D", "30D", "91D", "365D"]
+
+# Upper bound on the total size of cached specs (characters of JSON)
+FIGURE_CACHE_MAX_CHARS = 64 * 1024 * 1024
+
+_figure_cache = OrderedDict()
+_figure_cache_chars = 0
+_figure_cache_lock = threading.Lock()
+_template_json = {}
+
+
+def _to_spec(fig):
+    # The template is the bulk of a serialised figure and is re-applied from the
+    # theme on load, so it isn't stored.
+    data = fig.to_plotly_json()
+    data["layout"] = {k: v for k, v in data["layout"].items() if k != "template"}
+    return json.dumps(data, cls=PlotlyJSONEncoder, separators=(",", ":"))
+
+
+def _from_spec(spec, theme):
+    # Specs were produced by plotly itself, so skip re-validating them; that and
+    # re-resolving the template through update_layout dominate load time.
+    if theme not in _template_json:
+        template = pio.templates[THEME_TEMPLATES[theme]]
+        _template_json[theme] = json.dumps(template.to_plotly_json(), cls=PlotlyJSONEncoder)
+    data = json.loads(spec)
+    data["layout"]["template"] = json.loads(_template_json[theme])
+    return go.Figure(data, _validate=False)
+
+
+def cached_figure(fingerprint, column, kind, theme, build):
+    """
+    Returns the figure for (fingerprint, column, kind, theme), calling
+    ``build()`` only when it isn't cached yet.
+    """
+    global _figure_cache_chars
+    key = (fingerprint, column, kind, theme)
+    with _figure_cache_lock:
+        spec = _figure_cache.get(key)
+        if spec is not None:
+            _figure_cache.move_to_end(key)
+    if spec is not None:
+        with perf.stage("plot:cache_load", kind=kind, column=column):
+            return _from_spec(spec, theme)
+
+    with perf.stage(f"plot:{kind.split(':')[0]}", column=column):
+        fig = build()
+    spec = _to_spec(fig)
+    with _figure_cache_lock:
+        if key not in _figure_cache:
+            _figure_cache[key] = spec
+            _figure_cache_chars += len(spec)
+        while _figure_cache_chars > FIGURE_CACHE_MAX_CHARS and len(_figure_cache) > 1:
+            _, evicted = _figure_cache.popitem(last=False)
+            _figure_cache_chars -= len(evicted)
+    return fig
+
+
+def clear_figure_cache():
+    global _figure_cache_chars
+    with _figure_cache_lock:
+        _figure_cache.clear()
+        _figure_cache_chars = 0
+
+
+def _profile_kind(kind, details):
+    # Figures drawn from a column's profile are keyed on it too, so one built
+    # from a sampled profile isn't served once the exact profile replaces it
+    return f"{kind}:{json_fingerprint(details)}"
+
+
+def _style(fig, theme, **layout):
+    fig.update_layout(**THEME_LAYOUTS[theme], **layout)
+    return fig
+
+
+def histogram_figure(fingerprint, col, details, df):
+    def build():
+        bins = details.get("histogram", {}).get("bins", [])
+        counts = details.get("histogram", {}).get("counts", [])
+        if bins and counts:
+            df_hist = pd.DataFrame({"Bin": bins[:-1], "Count": counts})
+            fig = px.bar(df_hist, x="Bin", y="Count", title=f"{col.capitalize()} Distribution",
+                         template="plotly_white")
+        else:
+            fig = px.histogram(df, x=col, nbins=10, title=f"{col.capitalize()} Distribution",
+                               template="plotly_white")
+        _style(fig, LIGHT, bargap=0.3, bargroupgap=0.1)
+        fig.update_traces(marker_color=ACCENT)
+        return fig
+
+    return cached_figure(fingerprint, col, _profile_kind("histogram", details), LIGHT, build)
+
+
+def outlier_sample(values, lower_bound, upper_bound, max_points=MAX_OUTLIER_POINTS):
+    """
+    Up to max_points of the values outside [lower_bound, upper_bound], evenly
+    spaced over their sorted order so the extremes are always included.
+    """
+    values = np.asarray(values, dtype="float64")
+    outliers = np.sort(values[(values < lower_bound) | (values > upper_bound)])
+    if len(outliers) > max_points:
+        outliers = outliers[np.linspace(0, len(outliers) - 1, max_points).round().astype(np.int64)]
+    return outliers
+
+
+def box_figure(fingerprint, col, details, df, theme=LIGHT):
+    """
+    Box plot of one numeric column; the light variant is the pink one on the
+    numeric tab. The box is drawn from the profile's quartiles and whiskers
+    and only a capped sample of outlier points is sent to the browser,
+    instead of the raw column. Profiles without the summary fall back to
+    px.box over the data.
+    """
+    stats = details.get("numeric_stats", {})
+    bounds = details.get("outlier_bounds", {})
+    has_summary = all(stats.get(k) is not None for k in ("25%", "median", "75%")) and bounds
+
+    def build():
+        if theme == LIGHT:
+            title, template, color = f"{col.capitalize()} Outliers", "plotly_white", ACCENT
+        else:
+            title, template, color = f"{col.capitalize()} Outlier Analysis", "plotly_dark", None
+
+        if not has_summary:
+            fig = px.box(df, y=col, title=title, template=template)
+        else:
+            whiskers = details.get("whiskers") or {
+                "lower": max(stats.get("min", bounds["lower_bound"]), bounds["lower_bound"]),
+                "upper": min(stats.get("max", bounds["upper_bound"]), bounds["upper_bound"]),
+            }
+            fig = go.Figure(go.Box(
+                x=[col], q1=[stats["25%"]], median=[stats["median"]], q3=[stats["75%"]],
+                lowerfence=[whiskers["lower"]], upperfence=[whiskers["upper"]],
+                mean=[stats["mean"]] if stats.get("mean") is not None else None,
+                name=col, boxpoints=False,
+            ))
+            # Outlier rows come from the dataset's outlier index rather than a rescan
+            positions = get_outlier_index(df, fingerprint).positions(col, "iqr")
+            points = outlier_sample(df[col].to_numpy(dtype="float64", na_value=np.nan)[positions],
+                                    bounds["lower_bound"], bounds["upper_bound"])
+            if len(points):
+                shown = f"{len(points)} of {details.get('outlier_count', len(points))}"
+                fig.add_trace(go.Scatter(x=[col] * len(points), y=points, mode="markers",
+                                         name=f"outliers ({shown})", marker=dict(size=5)))
+            fig.update_layout(title=title, yaxis_title=col, template=template, showlegend=False)
+
+        _style(fig, theme)
+        if color:
+            fig.update_traces(marker_color=color)
+            fig.update_traces(line=dict(color=color), selector=dict(type="box"))
+        return fig
+
+    return cached_figure(fingerprint, col, _profile_kind("box", details), theme, build)
+
+
+def categorical_figure(fingerprint, col, details, df):
+    def build():
+        if "top_categories" in details:
+            data = details["top_categories"]
+            df_bar = pd.DataFrame(list(data.items()), columns=["Category", "Count"])
+            if len(data) <= 6:
+                # Pie chart for few categories
+                fig = px.pie(df_bar, names="Category", values="Count", title=f"{col.capitalize()} Distribution",
+                             template="plotly_white", hole=0.3, color_discrete_sequence=CATEGORY_COLORS)
+                _style(fig, LIGHT)
+                return fig
+            title = f"Top {col.capitalize()} Categories"
+        else:
+            uniq = df[col].value_counts().nlargest(10)
+            df_bar = pd.DataFrame(uniq.items(), columns=["Category", "Count"])
+            title = f"Top 10 {col.capitalize()} Categories"
+        fig = px.bar(df_bar, x="Category", y="Count", title=title, template="plotly_white",
+                     color_discrete_sequence=CATEGORY_COLORS)
+        _style(fig, LIGHT, bargap=0.3, bargroupgap=0.1)
+        fig.update_traces(marker_color=ACCENT)
+        return fig
+
+    return cached_figure(fingerprint, col, _profile_kind("categorical", details), LIGHT, build)
+
+
+def correlated_pairs(df, num_cols, threshold=CORRELATION_THRESHOLD):
+    """Correlation matrix of num_cols and the (c1, c2, r) pairs with |r| >= threshold."""
+    corr = df[num_cols].corr()
+    pairs = []
+    for i in range(len(num_cols)):
+        for j in range(i + 1, len(num_cols)):
+            c1, c2 = num_cols[i], num_cols[j]
+            r = corr.loc[c1, c2]
+            if abs(r) >= threshold:
+                pairs.append((c1, c2, r))
+    return corr, pairs
+
+
+def trendline_from_moments(x, y):
+    """
+    Least-squares fit y = slope * x + intercept from the first and second
+    moments of the paired non-null values. Same line as an OLS trendline,
+    without fitting a statsmodels model. Returns (slope, intercept), or None
+    when x is constant.
+    """
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[valid], y[valid]
+    if len(x) < 2:
+        return None
+    mean_x, mean_y = x.mean(), y.mean()
+    var_x = np.mean((x - mean_x) ** 2)
+    if var_x == 0:
+        return None
+    slope = np.mean((x - mean_x) * (y - mean_y)) / var_x
+    return slope, mean_y - slope * mean_x
+
+
+def stratified_sample_positions(x, sample_size, strata=20, seed=0):
+    """
+    Row positions of a sample stratified on x quantiles: each stratum gets an
+    equal share, so sparse tails keep their points instead of being swamped by
+    the dense middle of the distribution.
+    """
+    x = np.asarray(x, dtype="float64")
+    n = len(x)
+    if n <= sample_size:
+        return np.arange(n)
+    edges = np.unique(np.nanquantile(x, np.linspace(0, 1, strata + 1)[1:-1]))
+    stratum = np.digitize(x, edges)
+    order = np.random.default_rng(seed).permutation(n)
+    rank = pd.Series(stratum[order]).groupby(stratum[order]).cumcount().to_numpy()
+    per_stratum = max(1, sample_size // (len(edges) + 1))
+    return np.sort(order[rank < per_stratum])
+
+
+def _add_trendline(fig, x, y):
+    fit = trendline_from_moments(x, y)
+    if fit is None:
+        return
+    slope, intercept = fit
+    x_range = np.array([np.nanmin(x), np.nanmax(x)])
+    fig.add_trace(go.Scattergl(x=x_range, y=slope * x_range + intercept, mode="lines",
+                               name="OLS trendline", line=dict(color=ACCENT, width=2)))
+
+
+def scatter_figure(fingerprint, c1, c2, r, df, mode="auto"):
+    """
+    Scatter of c2 against c1 with a trendline.
+
+    mode="points" draws every row (the original px.scatter with an OLS
+    trendline). Above LARGE_SCATTER_ROWS, "auto" switches to "density": a 2D
+    histogram computed server-side. "sample" draws a stratified sample of
+    SCATTER_SAMPLE_SIZE points as a WebGL trace. In both large modes the
+    trendline is fitted on all rows from their moments.
+    """
+    if mode == "auto":
+        mode = "density" if len(df) > LARGE_SCATTER_ROWS else "points"
+    title = f"{c1.capitalize()} vs {c2.capitalize()} (r = {r:.2f})"
+
+    def build():
+        if mode == "points":
+            fig = px.scatter(df, x=c1, y=c2, trendline="ols", title=title, template="plotly_dark")
+            return _style(fig, DARK)
+
+        x = df[c1].to_numpy(dtype="float64", na_value=np.nan)
+        y = df[c2].to_numpy(dtype="float64", na_value=np.nan)
+        valid = ~(np.isnan(x) | np.isnan(y))
+        fig = go.Figure()
+        if mode == "density":
+            counts, x_edges, y_edges = np.histogram2d(x[valid], y[valid], bins=DENSITY_BINS)
+            fig.add_trace(go.Heatmap(
+                x=(x_edges[:-1] + x_edges[1:]) / 2,
+                y=(y_edges[:-1] + y_edges[1:]) / 2,
+                # Empty bins are left transparent; counts on a log scale so sparse regions stay visible
+                z=np.where(counts.T > 0, np.log10(counts.T + 1), np.nan),
+                customdata=counts.T,
+                hovertemplate=f"{c1}: %{{x}}<br>{c2}: %{{y}}<br>rows: %{{customdata:.0f}}<extra></extra>",
+                colorscale="Magma",
+                colorbar=dict(title="log10 rows"),
+            ))
+            title_suffix = f" — density of {int(valid.sum()):,} rows"
+        else:
+            positions = np.flatnonzero(valid)[stratified_sample_positions(x[valid], SCATTER_SAMPLE_SIZE)]
+            fig.add_trace(go.Scattergl(x=x[positions], y=y[positions], mode="markers", name="sampled rows",
+                                       marker=dict(size=4, opacity=0.6)))
+            title_suffix = f" — {len(positions):,} of {int(valid.sum()):,} rows sampled"
+        _add_trendline(fig, x[valid], y[valid])
+        fig.update_layout(title=title + title_suffix, xaxis_title=c1, yaxis_title=c2, template="plotly_dark")
+        return _style(fig, DARK)
+
+    return cached_figure(fingerprint, f"{c1}|{c2}", f"scatter:{mode}", DARK, build)
+
+
+def heatmap_figure(fingerprint, corr):
+    def build():
+        fig = px.imshow(corr, text_auto=True, aspect="auto", title="Correlation Heatmap",
+                        template="plotly_dark")
+        return _style(fig, DARK)
+
+    return cached_figure(fingerprint, None, "heatmap", DARK, build)
+
+
+def detect_date_columns(df):
+    """
+    Datetime columns of df, plus columns with "date" in their name that parse as
+    dates. Returns (df, date_cols); df is a copy with those columns converted
+    when any conversion was needed.
+    """
+    date_cols = df.select_dtypes(include=["datetime", "datetime64[ns]"]).columns.tolist()
+    converted = {}
+    for col in df.columns:
+        if "date" in col.lower() and col not in date_cols:
+            try:
+                converted[col] = pd.to_datetime(df[col])
+                date_cols.append(col)
+            except Exception:
+                continue
+    if converted:
+        df = df.assign(**converted)
+    return df, date_cols
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling: indices of n_out points of the
+    (sorted) series that best preserve its visual shape. Each bucket is
+    evaluated with vectorized NumPy; only the loop over buckets is in Python.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_start = end
+        avg_x = x[next_start:next_end].mean() if next_end > next_start else x[-1]
+        avg_y = y[next_start:next_end].mean() if next_end > next_start else y[-1]
+        area = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.nanargmax(area)) if np.isfinite(area).any() else start
+        selected[i + 1] = previous
+    return selected
+
+
+def bucket_frequency(dates, max_points):
+    """Smallest 'nice' resampling frequency that yields at most max_points buckets."""
+    step = (dates.max() - dates.min()) / max_points
+    for freq in BUCKET_FREQUENCIES:
+        if pd.Timedelta(freq) >= step:
+            return freq
+    return BUCKET_FREQUENCIES[-1]
+
+
+def _band_figure(bands, date_col, num_col, freq):
+    fig = go.Figure([
+        go.Scatter(x=bands.index, y=bands[(num_col, "max")], mode="lines", line=dict(width=0),
+                   name="max", showlegend=False),
+        go.Scatter(x=bands.index, y=bands[(num_col, "min")], mode="lines", line=dict(width=0),
+                   fill="tonexty", fillcolor="rgba(255,105,180,0.25)", name="min–max"),
+        go.Scatter(x=bands.index, y=bands[(num_col, "mean")], mode="lines", line=dict(color=ACCENT),
+                   name=f"mean per {freq}"),
+    ])
+    fig.update_layout(title=f"{num_col.capitalize()} Over Time", xaxis_title=date_col, yaxis_title=num_col,
+                      template="plotly_dark")
+    return fig
+
+
+def time_series_figures(fingerprint, df, date_col, mode="auto", max_points=TIME_SERIES_MAX_POINTS):
+    """
+    One line chart per numeric column over date_col, as (num_col, fig) pairs.
+
+    Each chart ships at most about max_points points:
+    - "raw" draws every row (used by "auto" for small frames);
+    - "bands" (the "auto" default above max_points) resamples to an adaptive
+      time bucket and draws the mean with a min/max band;
+    - "lttb" keeps max_points original points chosen by LTTB.
+    The sort/resample work is shared by all numeric columns of a date column
+    and only runs if some chart isn't cached yet.
+    """
+    numeric_cols = df.select_dtypes(include=["number"]).columns.tolist()
+    if mode == "auto":
+        mode = "raw" if len(df) <= max_points else "bands"
+    prepared = {}
+
+    def prepare():
+        if not prepared:
+            frame = df[[date_col] + numeric_cols].dropna(subset=[date_col])
+            if mode == "bands":
+                freq = bucket_frequency(frame[date_col], max_points)
+                prepared["freq"] = freq
+                prepared["bands"] = (
+                    frame.groupby(pd.Grouper(key=date_col, freq=freq))[numeric_cols]
+                    .agg(["mean", "min", "max"])
+                    .dropna(how="all")
+                )
+            else:
+                prepared["sorted"] = frame.sort_values(by=date_col, kind="stable")
+        return prepared
+
+    def build(num_col):
+        data = prepare()
+        if mode == "bands":
+            fig = _band_figure(data["bands"], date_col, num_col, data["freq"])
+        elif mode == "lttb":
+            series = data["sorted"][[date_col, num_col]].dropna()
+            dates = series[date_col].to_numpy()
+            values = series[num_col].to_numpy(dtype="float64")
+            keep = lttb_indices(dates.astype("datetime64[ns]").astype(np.int64), values, max_points)
+            fig = go.Figure(go.Scatter(x=dates[keep], y=values[keep], mode="lines", line=dict(color=ACCENT)))
+            fig.update_layout(title=f"{num_col.capitalize()} Over Time ({len(keep):,} of {len(series):,} points)",
+                              xaxis_title=date_col, yaxis_title=num_col, template="plotly_dark")
+        else:
+            fig = px.line(data["sorted"], x=date_col, y=num_col, title=f"{num_col.capitalize()} Over Time",
+                          template="plotly_dark")
+        return _style(fig, DARK)
+
+    return [
+        (num_col, cached_figure(fingerprint, f"{date_col}|{num_col}", f"time_series:{mode}:{max_points}", DARK,
+                                lambda num_col=num_col: build(num_col)))
+        for num_col in numeric_cols
+    ]
+
+
+def report_figures(fingerprint, df, eda):
+    """
+    All dashboard figures for a dataset grouped by report section, built from
+    (or into) the figure cache so the PPT export reuses what the dashboard drew.
+    """
+    figs = {"numeric": [], "categorical": [], "correlation": [], "time_series": [], "outlier": []}
+
+    num_cols = []
+    for col, det in eda["columns"].items():
+        if "numeric_stats" in det:
+            num_cols.append(col)
+            figs["numeric"].append(histogram_figure(fingerprint, col, det, df))
+            if det.get("outlier_count", 0) > 0:
+                figs["outlier"].append(box_figure(fingerprint, col, det, df))
+        elif is_categorical(det):
+            figs["categorical"].append(categorical_figure(fingerprint, col, det, df))
+
+    if len(num_cols) >= 2:
+        corr, pairs = correlated_pairs(df, num_cols)
+        figs["correlation"].append(heatmap_figure(fingerprint, corr))
+        for c1, c2, r in pairs:
+            figs["correlation"].append(scatter_figure(fingerprint, c1, c2, r, df))
+
+    df, date_cols = detect_date_columns(df)
+    for date_col in date_cols:
+        figs["time_series"].extend(fig for _, fig in time_series_figures(fingerprint, df, date_col))
+
+    return figs
@@ -5,9 +5,68 @@ from pptx.enum.text import PP_ALIGN
 from pptx.shapes.shapetree import SlideShapes
 import io
 import re
+import html
+import json
+import hashlib
+import logging
 import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from plotly.utils import PlotlyJSONEncoder
 
 from utils import get_gemini_response
+import perf
+from figure_render import render_figures, IMAGE_FORMATS
+
+# Report sections with commentary, in slide order, and the topic each prompt summarises
+SECTION_TOPICS = {
+    "numeric": "numeric columns",
+    "categorical": "categorical columns",
+    "correlation": "correlation columns",
+    "time_series": "time series columns",
+    "outlier": "outlier columns",
+}
+
+SECTION_INSTRUCTIONS = """
+- Write about 150 to 250 words total.
+- Use plain text only—no code blocks, no triple backticks, no excessive Markdown.
+- Organize the summary in **bullet points** (1–2 lines each).
+- For each bullet, give a short explanation suitable for **non-technical** users.
+- Include each numeric column’s typical range, average, or any key outliers or patterns.
+"""
+
+OVERALL_INSTRUCTIONS = """
+- Provide an **depth summary** of the entire EDA in a friendly, user-focused way and breif enough.
+- Use plain text only—no code blocks, no triple backticks, no excessive Markdown.
+- Focus on **actionable insights**, key findings, or interesting patterns across numeric, categorical, correlation, or time-series data.
+- Avoid repeating trivial details; highlight the big takeaways that **non-technical** readers can understand.
+"""
+
+# Figures fill an 11.5 x 5 inch area on their slide. They are laid out at 96 CSS
+# pixels per inch (so fonts keep their on-screen size) and scaled up to the
+# requested DPI, capped so neither side of the image exceeds max_dimension.
+FIGURE_WIDTH_IN = 11.5
+FIGURE_HEIGHT_IN = 5.0
+CSS_DPI = 96
+DEFAULT_IMAGE_FORMAT = "png"
+DEFAULT_DPI = 150
+DEFAULT_MAX_DIMENSION = 2000
+
+
+def figure_render_size(dpi=DEFAULT_DPI, max_dimension=DEFAULT_MAX_DIMENSION):
+    """(width, height, scale) to pass to render_figures for slide figures."""
+    width = round(FIGURE_WIDTH_IN * CSS_DPI)
+    height = round(FIGURE_HEIGHT_IN * CSS_DPI)
+    scale = min(dpi / CSS_DPI, max_dimension / max(width, height))
+    return width, height, round(scale, 3)
+
+
+def format_size(num_bytes):
+    for unit in ("B", "KB", "MB"):
+        if num_bytes < 1024 or unit == "MB":
+            return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+
 
 def clean_ai_text(text: str) -> str:
     """
@@ -38,6 +97,122 @@ def clean_ai_text(text: str) -> str:
     
     return cleaned
 
+def _section_prompt(eda_metadata, section):
+    topic = SECTION_TOPICS[section]
+    return f"""Here is the dataset context (in JSON):
+{eda_metadata}
+
+INSTRUCTIONS:
+- Summarize the **{topic}** in a friendly, user-focused way.{SECTION_INSTRUCTIONS}- If the dataset has no {topic}, say “No {topic} found.”
+- Output must be the **final text only** no formatting.
+"""
+
+
+def _overall_prompt(eda_metadata):
+    return f"""Here is the dataset context (in JSON):
+{eda_metadata}
+
+INSTRUCTIONS:{OVERALL_INSTRUCTIONS}- Output must be the **final text only**, no formatting.
+"""
+
+
+def _combined_prompt(eda_metadata):
+    fields = "\n".join(
+        f'- "{section}": summary of the **{topic}** (if there are none, say “No {topic} found.”)'
+        for section, topic in SECTION_TOPICS.items()
+    )
+    return f"""Here is the dataset context (in JSON):
+{eda_metadata}
+
+Write the commentary for every section of an EDA report in one reply.
+
+Return ONLY a JSON object (no code fences, no extra text) with exactly these string fields:
+{fields}
+- "overall": summary of the whole EDA
+
+Rules for each section field:{SECTION_INSTRUCTIONS}
+Rules for the "overall" field:{OVERALL_INSTRUCTIONS}
+Use "\\n" for line breaks between bullet points inside the JSON strings.
+"""
+
+
+def parse_combined_insights(raw_output):
+    """
+    Extracts and validates the JSON object returned for the combined prompt.
+    Returns a dict with one non-empty string per section (plus "overall"),
+    or None if the reply is not usable.
+    """
+    cleaned = re.sub(r"```(?:json)?", "", raw_output, flags=re.IGNORECASE).strip()
+    match = re.search(r"\{.*\}", cleaned, re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    insights = {}
+    for key in list(SECTION_TOPICS) + ["overall"]:
+        value = data.get(key)
+        if not isinstance(value, str) or not value.strip():
+            return None
+        insights[key] = value
+    return insights
+
+
+@perf.timed("report:insights")
+def generate_section_insights(eda_metadata, report_mode="combined"):
+    """
+    Returns the cleaned AI commentary for each report section plus "overall".
+
+    In "combined" mode the dataset context is sent once and all sections come
+    back in a single JSON reply; if that reply can't be parsed we fall back to
+    one call per section, run concurrently.
+    """
+    insights = None
+    if report_mode == "combined":
+        raw_output = get_gemini_response(_combined_prompt(eda_metadata), "flash", call_site="report:combined")
+        insights = parse_combined_insights(raw_output)
+        if insights is None:
+            logging.info("Combined report insights could not be parsed, falling back to per-section calls.")
+
+    if insights is None:
+        prompts = {section: _section_prompt(eda_metadata, section) for section in SECTION_TOPICS}
+        prompts["overall"] = _overall_prompt(eda_metadata)
+        with ThreadPoolExecutor(max_workers=len(prompts)) as pool:
+            futures = {
+                key: pool.submit(get_gemini_response, prompt, "flash", call_site=f"report:{key}")
+                for key, prompt in prompts.items()
+            }
+            insights = {key: future.result() for key, future in futures.items()}
+
+    return {key: clean_ai_text(text) for key, text in insights.items()}
+
+
+REPORT_SECTIONS = [
+    ("numeric", "Numeric Analysis"),
+    ("categorical", "Categorical Analysis"),
+    ("correlation", "Correlation Analysis"),
+    ("time_series", "Time Series Analysis"),
+    ("outlier", "Outlier Analysis"),
+]
+
+
+def report_sections(insights, figs_by_section):
+    """
+    (title, commentary, figures) for each report section, in report order.
+    Sections without commentary are skipped by the exporters, so they get no figures.
+    """
+    sections = []
+    for key, title in REPORT_SECTIONS:
+        text = insights.get(key, "")
+        sections.append((title, text, list(figs_by_section.get(key) or []) if text.strip() else []))
+    return sections
+
+
+@perf.timed("report:pptx")
 def generate_eda_report_ppt(
     eda_metadata,
     df,
@@ -46,7 +221,13 @@ def generate_eda_report_ppt(
     correlation_figs=None,
     time_series_figs=None,
     outlier_figs=None,
-    dataset_name="Dataset.csv"
+    dataset_name="Dataset.csv",
+    report_mode="combined",
+    progress_callback=None,
+    image_format=DEFAULT_IMAGE_FORMAT,
+    dpi=DEFAULT_DPI,
+    max_dimension=DEFAULT_MAX_DIMENSION,
+    insights=None
 ):
     """
     Generates a PPTX report with a dark background and white text,
@@ -56,104 +237,44 @@ def generate_eda_report_ppt(
     1) Title slide (dark background).
     2) Overview slide (rows, columns).
     3) Per-section commentary + figure slides.
-    4) Graceful kaleido error handling for figures.
+    4) Graceful kaleido error handling for figures, which are rendered in
+       parallel and cached by spec (figure_render.render_figures).
     5) Conclusion.
 
+    report_mode="combined" asks for all section commentaries in one structured
+    LLM call (falling back to per-section calls if the reply can't be parsed);
+    "per_section" always uses one call per section.
+
+    progress_callback(stage, done, total), if given, is called as the build
+    advances, with stage "insights", "figures" or "sections".
+
+    insights, if given, is a generate_section_insights() result to use instead
+    of asking the model again (e.g. when the HTML report is built as well).
+
+    Figures are embedded as image_format ("png", "jpeg", or "webp", which is
+    re-encoded as PNG) at dpi, capped at max_dimension pixels per side. Figures
+    whose image is identical to one already in the deck are left out.
+
     Returns a BytesIO with the PPTX content.
     """
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported image format {image_format!r}, expected one of {IMAGE_FORMATS}")
 
-    # Convert None to empty lists
-    numeric_figs = numeric_figs or []
-    categorical_figs = categorical_figs or []
-    correlation_figs = correlation_figs or []
-    time_series_figs = time_series_figs or []
-    outlier_figs = outlier_figs or []
-
-    numeric_insights = get_gemini_response(f""" Here is the dataset context (in JSON):
-                                            {eda_metadata}
-
-                                            INSTRUCTIONS:
-                                            - Summarize the **numeric columns** in a friendly, user-focused way.
-                                            - Write about 150 to 250 words total.
-                                            - Use plain text only—no code blocks, no triple backticks, no excessive Markdown.
-                                            - Organize the summary in **bullet points** (1–2 lines each).
-                                            - For each bullet, give a short explanation suitable for **non-technical** users.
-                                            - Include each numeric column’s typical range, average, or any key outliers or patterns.
-                                            - If the dataset has no numeric columns, say “No numeric columns found.”
-                                            - Output must be the **final text only** no formatting.
-                                            """)
-    categorical_insights = get_gemini_response(f""" Here is the dataset context (in JSON):
-                                            {eda_metadata}
-
-                                            INSTRUCTIONS:
-                                            - Summarize the **categorical columns** in a friendly, user-focused way.
-                                            - Write about 150 to 250 words total.
-                                            - Use plain text only—no code blocks, no triple backticks, no excessive Markdown.
-                                            - Organize the summary in **bullet points** (1–2 lines each).
-                                            - For each bullet, give a short explanation suitable for **non-technical** users.
-                                            - Include each numeric column’s typical range, average, or any key outliers or patterns.
-                                            - If the dataset has no categorical columns, say “No categorical columns found.”
-                                            - Output must be the **final text only** no formatting.
-                                            """)
-    correlation_insights = get_gemini_response(f""" Here is the dataset context (in JSON):
-                                            {eda_metadata}
-
-                                            INSTRUCTIONS:
-                                            - Summarize the **correlation columns** in a friendly, user-focused way.
-                                            - Write about 150 to 250 words total.
-                                            - Use plain text only—no code blocks, no triple backticks, no excessive Markdown.
-                                            - Organize the summary in **bullet points** (1–2 lines each).
-                                            - For each bullet, give a short explanation suitable for **non-technical** users.
-                                            - Include each numeric column’s typical range, average, or any key outliers or patterns.
-                                            - If the dataset has no correlation columns, say “No correlation columns found.”
-                                            - Output must be the **final text only** no formatting.
-                                            """)
-    outlier_insights = get_gemini_response(f""" Here is the dataset context (in JSON):
-                                            {eda_metadata}
-
-                                            INSTRUCTIONS:
-                                            - Summarize the **outliners columns** in a friendly, user-focused way.
-                                            - Write about 150 to 250 words total.
-                                            - Use plain text only—no code blocks, no triple backticks, no excessive Markdown.
-                                            - Organize the summary in **bullet points** (1–2 lines each).
-                                            - For each bullet, give a explanation suitable for **non-technical** users.
-                                            - Include each numeric column’s typical range, average, or any key outliers or patterns.
-                                            - If the dataset has no outliners columns, say “No outliners columns found.”
-                                            - Output must be the **final text only** no formatting.
-                                            """)
-    time_series_insights = get_gemini_response(f""" Here is the dataset context (in JSON):
-                                            {eda_metadata}
-
-                                            INSTRUCTIONS:
-                                            - Summarize the **time series columns** in a friendly, user-focused way.
-                                            - Write about 150 to 250 words total.
-                                            - Use plain text only—no code blocks, no triple backticks, no excessive Markdown.
-                                            - Organize the summary in **bullet points** (1–2 lines each).
-                                            - For each bullet, give a short explanation suitable for **non-technical** users.
-                                            - Include each numeric column’s typical range, average, or any key outliers or patterns.
-                                            - If the dataset has no time series columns, say “No time series columns found.”
-                                            - Output must be the **final text only** no formatting.
-                                            """)
-    overall_insights = get_gemini_response(f"""Here is the dataset context (in JSON):
-                                            {eda_metadata}
-
-                                            INSTRUCTIONS:
-                                            - Provide an **depth summary** of the entire EDA in a friendly, user-focused way and breif enough.
-                                            - Use plain text only—no code blocks, no triple backticks, no excessive Markdown.
-                                            - Focus on **actionable insights**, key findings, or interesting patterns across numeric, categorical, correlation, or time-series data.
-                                            - Avoid repeating trivial details; highlight the big takeaways that **non-technical** readers can understand.
-                                            - Output must be the **final text only**, no formatting.
-                                            """)
-    
-    # Clean AI-generated text
-    numeric_insights = clean_ai_text(numeric_insights)
-    categorical_insights = clean_ai_text(categorical_insights)
-    correlation_insights = clean_ai_text(correlation_insights)
-    outlier_insights = clean_ai_text(outlier_insights)
-    time_series_insights = clean_ai_text(time_series_insights)
-    overall_insights = clean_ai_text(overall_insights)
-
+    def report_progress(stage, done, total):
+        if progress_callback is not None:
+            progress_callback(stage, done, total)
 
+    if insights is None:
+        report_progress("insights", 0, 1)
+        insights = generate_section_insights(eda_metadata, report_mode=report_mode)
+    report_progress("insights", 1, 1)
+    sections = report_sections(insights, {
+        "numeric": numeric_figs,
+        "categorical": categorical_figs,
+        "correlation": correlation_figs,
+        "time_series": time_series_figs,
+        "outlier": outlier_figs,
+    })
 
     prs = Presentation()
     prs.slide_width = Inches(13.33)
@@ -223,8 +344,8 @@ def generate_eda_report_ppt(
             chunks.append("\n".join(current_chunk))
         return chunks
 
-    def add_section(section_title, commentary_text, figs):
-        """Add section with commentary and figures"""
+    def add_section(section_title, commentary_text, images):
+        """Add section with commentary and pre-rendered figures (see render_figures)"""
         if not commentary_text.strip():
             return
             
@@ -254,7 +375,18 @@ def generate_eda_report_ppt(
                 align=PP_ALIGN.LEFT
             )
             
-        for i, fig in enumerate(figs):
+        # The same chart can come up in several sections; it is only shown once
+        unique_images = []
+        for rendered in images:
+            if rendered["image"] is not None:
+                digest = hashlib.sha1(rendered["image"]).hexdigest()
+                if digest in seen_images:
+                    logging.debug(f"Skipping duplicate figure in {section_title}")
+                    continue
+                seen_images.add(digest)
+            unique_images.append(rendered)
+
+        for i, rendered in enumerate(unique_images):
             slide = add_dark_slide(prs)
             
             # Figure title
@@ -270,9 +402,10 @@ def generate_eda_report_ppt(
             
             # Figure image
             try:
-                img_bytes = fig.to_image(format="png", scale=2)
+                if rendered["image"] is None:
+                    raise RuntimeError(rendered["error"])
                 pic = slide.shapes.add_picture(
-                    io.BytesIO(img_bytes),
+                    io.BytesIO(rendered["image"]),
                     left=Inches(0.7),
                     top=Inches(1.5),
                     width=Inches(11.5),
@@ -337,12 +470,21 @@ def generate_eda_report_ppt(
         font_name='Calibri'
     )
 
-    # Add analysis sections
-    add_section("Numeric Analysis", numeric_insights, numeric_figs)
-    add_section("Categorical Analysis", categorical_insights, categorical_figs)
-    add_section("Correlation Analysis", correlation_insights, correlation_figs)
-    add_section("Time Series Analysis", time_series_insights, time_series_figs)
-    add_section("Outlier Analysis", outlier_insights, outlier_figs)
+    # Add analysis sections. Figures of all sections that get slides are rendered
+    # in one batch so they can be converted in parallel.
+    width, height, scale = figure_render_size(dpi, max_dimension)
+    seen_images = set()
+    rendered = iter(render_figures(
+        [fig for _, _, figs in sections for fig in figs],
+        format=image_format, scale=scale, width=width, height=height,
+        progress_callback=lambda done, total: report_progress("figures", done, total),
+    ))
+    for section_number, (title, text, figs) in enumerate(sections, start=1):
+        images = [next(rendered) for _ in figs]
+        for i, image in enumerate(images):
+            logging.debug(f"{title} - Figure {i+1}: {image['seconds']:.2f}s{' (cached)' if image['cached'] else ''}")
+        add_section(title, text, images)
+        report_progress("sections", section_number, len(sections))
 
     # Conclusion
     conclusion_slide = add_dark_slide(prs)
@@ -368,4 +510,157 @@ def generate_eda_report_ppt(
     ppt_buffer = io.BytesIO()
     prs.save(ppt_buffer)
     ppt_buffer.seek(0)
+    logging.info(f"Report deck for {dataset_name}: {len(prs.slides)} slides, "
+                 f"{format_size(ppt_buffer.getbuffer().nbytes)}")
     return ppt_buffer
+
+
+HTML_STYLE = """
+body { background: #1A2A3A; color: #FAFAFA; font-family: Calibri, "Segoe UI", sans-serif; margin: 0; }
+main { max-width: 1100px; margin: 0 auto; padding: 32px 24px; }
+h1 { font-size: 40px; margin-bottom: 4px; }
+h2 { font-size: 28px; margin-top: 48px; border-bottom: 1px solid #34495E; padding-bottom: 6px; }
+.meta, .overview { color: #C8D1DA; }
+.commentary p { font-size: 16px; line-height: 1.5; margin: 6px 0; }
+.figure { height: 480px; margin: 24px 0; background: #FFFFFF; border-radius: 6px; }
+"""
+
+# Figures are drawn when they scroll into view, so a report with many charts
+# opens immediately. Templates are shared between figures instead of repeated.
+HTML_SCRIPT = """
+(function () {
+  function draw(el) {
+    var spec = JSON.parse(document.getElementById(el.dataset.spec).textContent);
+    spec.layout.template = JSON.parse(document.getElementById(el.dataset.template).textContent);
+    Plotly.newPlot(el, spec.data, spec.layout, {responsive: true, displaylogo: false});
+  }
+  var figures = document.querySelectorAll(".figure");
+  if (!("IntersectionObserver" in window)) { figures.forEach(draw); return; }
+  var observer = new IntersectionObserver(function (entries) {
+    entries.forEach(function (entry) {
+      if (entry.isIntersecting) { observer.unobserve(entry.target); draw(entry.target); }
+    });
+  }, {rootMargin: "400px"});
+  figures.forEach(function (el) { observer.observe(el); });
+})();
+"""
+
+
+def _json_script(element_id, text):
+    # "</" would end the <script> element early
+    text = text.replace("</", "<\\/")
+    return f'<script type="application/json" id="{element_id}">{text}</script>\n'
+
+
+def _html_commentary(text):
+    paragraphs = "".join(f"<p>{html.escape(line)}</p>" for line in text.splitlines() if line.strip())
+    return f'<div class="commentary">{paragraphs}</div>\n'
+
+
+def _plotlyjs_tag(plotlyjs):
+    if plotlyjs == "cdn":
+        from plotly.io._utils import plotly_cdn_url
+        return f'<script src="{plotly_cdn_url()}" charset="utf-8"></script>\n'
+    from plotly.offline import get_plotlyjs
+    return f'<script type="text/javascript">{get_plotlyjs()}</script>\n'
+
+
+@perf.timed("report:html")
+def generate_eda_report_html(
+    eda_metadata,
+    df,
+    numeric_figs=None,
+    categorical_figs=None,
+    correlation_figs=None,
+    time_series_figs=None,
+    outlier_figs=None,
+    dataset_name="Dataset.csv",
+    report_mode="combined",
+    insights=None,
+    output_path=None,
+    plotlyjs="inline",
+    progress_callback=None
+):
+    """
+    Interactive HTML version of the PPT report: same sections and AI commentary,
+    with the Plotly figures embedded as JSON and drawn in the browser, so no
+    kaleido rendering is needed.
+
+    plotly.js is included once, either inline ("inline", a self-contained file
+    of about 4.5 MB) or from the Plotly CDN ("cdn"). The document is written
+    piece by piece to output_path; without one it is returned as a BytesIO.
+    insights and progress_callback work as in generate_eda_report_ppt.
+    """
+    def report_progress(stage, done, total):
+        if progress_callback is not None:
+            progress_callback(stage, done, total)
+
+    if insights is None:
+        report_progress("insights", 0, 1)
+        insights = generate_section_insights(eda_metadata, report_mode=report_mode)
+    report_progress("insights", 1, 1)
+    sections = report_sections(insights, {
+        "numeric": numeric_figs,
+        "categorical": categorical_figs,
+        "correlation": correlation_figs,
+        "time_series": time_series_figs,
+        "outlier": outlier_figs,
+    })
+
+    buffer = io.BytesIO() if output_path is None else None
+    out = open(output_path, "w", encoding="utf-8") if output_path is not None else \
+        io.TextIOWrapper(buffer, encoding="utf-8")
+    try:
+        title = html.escape(f"EDA Analysis Report - {dataset_name}")
+        out.write(f'<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n<title>{title}</title>\n')
+        out.write(f"<style>{HTML_STYLE}</style>\n")
+        out.write(_plotlyjs_tag(plotlyjs))
+        out.write("</head>\n<body>\n<main>\n")
+        out.write("<h1>EDA Analysis Report</h1>\n")
+        out.write(f'<p class="meta">Dataset: {html.escape(dataset_name)}<br>'
+                  f"Generated: {datetime.datetime.now():%B %d, %Y}</p>\n")
+
+        out.write("<h2>Dataset Overview</h2>\n")
+        overview = f"Rows: {df.shape[0]:,} &middot; Columns: {df.shape[1]}"
+        if eda_metadata.get("columns"):
+            overview += "<br>" + ", ".join(html.escape(str(col)) for col in eda_metadata["columns"])
+        out.write(f'<p class="overview">{overview}</p>\n')
+        if insights.get("overall", "").strip():
+            out.write("<h2>Summary</h2>\n")
+            out.write(_html_commentary(insights["overall"]))
+
+        templates = {}
+        figure_count = 0
+        for section_number, (section_title, text, figs) in enumerate(sections, start=1):
+            if text.strip():
+                out.write(f"<h2>{html.escape(section_title)}</h2>\n")
+                out.write(_html_commentary(text))
+            for fig in figs:
+                data = fig.to_plotly_json()
+                layout = dict(data["layout"])
+                template = json.dumps(layout.pop("template", {}), cls=PlotlyJSONEncoder, separators=(",", ":"))
+                if template not in templates:
+                    templates[template] = f"template-{len(templates)}"
+                    out.write(_json_script(templates[template], template))
+                spec = json.dumps({"data": data["data"], "layout": layout}, cls=PlotlyJSONEncoder,
+                                  separators=(",", ":"))
+                out.write(_json_script(f"figure-{figure_count}", spec))
+                out.write(f'<div class="figure" data-spec="figure-{figure_count}" '
+                          f'data-template="{templates[template]}"></div>\n')
+                figure_count += 1
+            report_progress("sections", section_number, len(sections))
+
+        out.write(f"</main>\n<script>{HTML_SCRIPT}</script>\n</body>\n</html>\n")
+        out.flush()
+    finally:
+        if buffer is not None:
+            out.detach()
+        else:
+            out.close()
+
+    if buffer is None:
+        logging.info(f"HTML report for {dataset_name}: {figure_count} figures written to {output_path}")
+        return output_path
+    logging.info(f"HTML report for {dataset_name}: {figure_count} figures, {format_size(buffer.getbuffer().nbytes)}")
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,84 @@
+"""
+Import-time profile for the Data Whisperer modules.
+
+Imports each module in a fresh interpreter with ``python -X importtime`` (the same
+cold start a new Streamlit worker pays), prints the slowest imports and fails if a
+module's cumulative import time is over the budget.
+
+    python import_profile.py                      # profile the app modules
+    python import_profile.py dataviz --budget-ms 1500 --top 20
+"""
+import argparse
+import re
+import subprocess
+import sys
+
+DEFAULT_MODULES = ["utils", "smart_query", "clean_and_EDA_generate", "generate_report", "dataviz"]
+DEFAULT_BUDGET_MS = 2000
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_import(module):
+    """
+    Imports ``module`` in a subprocess and returns a list of
+    (package, self_us, cumulative_us, depth) tuples in import order.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        last_line = (proc.stderr.strip().splitlines() or [f"exit code {proc.returncode}"])[-1]
+        raise RuntimeError(f"Importing {module} failed:\n{last_line}")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, package = match.groups()
+            entries.append((package, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return entries
+
+
+def print_report(module, entries, budget_ms, top):
+    # -X importtime prints children before their parent, so the module's own
+    # imports are the nested entries directly preceding its top-level line.
+    end = max(i for i, e in enumerate(entries) if e[0] == module and e[3] == 0)
+    start = end
+    while start > 0 and entries[start - 1][3] > 0:
+        start -= 1
+    total_ms = entries[end][2] / 1000
+    status = "OK" if total_ms <= budget_ms else "OVER BUDGET"
+    print(f"\n{module}: {total_ms:.1f} ms cumulative (budget {budget_ms} ms) -> {status}")
+
+    # Only imports triggered directly by the module, heaviest first
+    direct = [e for e in entries[start:end] if e[3] == 1]
+    for package, self_us, cumulative_us, _ in sorted(direct, key=lambda e: e[2], reverse=True)[:top]:
+        print(f"    {cumulative_us / 1000:9.1f} ms  {package}  (self {self_us / 1000:.1f} ms)")
+    return total_ms <= budget_ms
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report cold-start import time of Data Whisperer modules.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="Maximum cumulative import time per module, in milliseconds.")
+    parser.add_argument("--top", type=int, default=10, help="Number of heaviest imports to list.")
+    args = parser.parse_args(argv)
+
+    within_budget = True
+    for module in args.modules:
+        try:
+            entries = profile_import(module)
+        except RuntimeError as e:
+            print(f"\n{e}")
+            within_budget = False
+            continue
+        within_budget = print_report(module, entries, args.budget_ms, args.top) and within_budget
+    return 0 if within_budget else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
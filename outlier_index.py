@@ -0,0 +1,198 @@
+import re
+import zlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from utils import dataset_fingerprint
+import perf
+
+# Outlier rules: IQR (1.5 * IQR beyond the quartiles), z-score (|z| > 3) and the
+# optional MAD rule (modified z-score |0.6745 * (x - median) / MAD| > 3.5).
+IQR_MULTIPLIER = 1.5
+Z_THRESHOLD = 3.0
+MAD_THRESHOLD = 3.5
+DEFAULT_METHODS = ("iqr", "zscore")
+
+OUTLIER_INDEX_CACHE_SIZE = 16
+_index_cache = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+class OutlierIndex:
+    """
+    Outlier rows of one dataset per (column, method), computed once and stored
+    as compressed bitmasks (np.packbits + zlib, so well under 1 bit per row for
+    sparse outliers). Rows are identified by position in the indexed frame.
+    """
+
+    def __init__(self, n_rows):
+        self.n_rows = n_rows
+        self._masks = {}
+        self.bounds = {}
+        self.counts = {}
+
+    def add(self, col, method, mask, lower_bound, upper_bound):
+        mask = np.asarray(mask, dtype=bool)
+        self._masks[(col, method)] = zlib.compress(np.packbits(mask).tobytes(), 1)
+        self.bounds[(col, method)] = (float(lower_bound), float(upper_bound))
+        self.counts[(col, method)] = int(mask.sum())
+
+    def columns(self):
+        return list(dict.fromkeys(col for col, _ in self._masks))
+
+    def methods(self, col):
+        return [method for c, method in self._masks if c == col]
+
+    def mask(self, col, method="iqr"):
+        packed = np.frombuffer(zlib.decompress(self._masks[(col, method)]), dtype=np.uint8)
+        return np.unpackbits(packed, count=self.n_rows).astype(bool)
+
+    def positions(self, col, method="iqr"):
+        return np.flatnonzero(self.mask(col, method))
+
+    def count(self, col, method="iqr"):
+        return self.counts.get((col, method), 0)
+
+    def rows(self, df, col, method="iqr", limit=None):
+        """The outlier rows of df (the frame this index was built on) for col."""
+        positions = self.positions(col, method)
+        if limit is not None:
+            positions = positions[:limit]
+        return df.iloc[positions]
+
+    def whiskers(self, series, method="iqr"):
+        """
+        Box plot whiskers of series (the indexed frame's column): the most
+        extreme values still inside the method's bounds.
+        """
+        lower_bound, upper_bound = self.bounds[(series.name, method)]
+        inliers = series[~self.mask(series.name, method) & series.notna().to_numpy()]
+        return {
+            "lower": float(inliers.min()) if not inliers.empty else lower_bound,
+            "upper": float(inliers.max()) if not inliers.empty else upper_bound
+        }
+
+    def summary(self, col):
+        """Per-method counts and bounds for the EDA output."""
+        return {
+            method: {
+                "count": self.counts[(col, method)],
+                "lower_bound": self.bounds[(col, method)][0],
+                "upper_bound": self.bounds[(col, method)][1],
+            }
+            for method in self.methods(col)
+        }
+
+    def nbytes(self):
+        return sum(len(mask) for mask in self._masks.values())
+
+
+@perf.timed("outlier_index")
+def build_outlier_index(df, methods=DEFAULT_METHODS):
+    """
+    Scans every numeric column of df once per method. Quantiles, means and
+    standard deviations are computed for all columns in one call each.
+    """
+    index = OutlierIndex(len(df))
+    numeric_df = df.select_dtypes(include=["number"])
+    if numeric_df.empty:
+        return index
+
+    quartiles = numeric_df.quantile([0.25, 0.75])
+    means = numeric_df.mean()
+    stds = numeric_df.std()
+    medians = numeric_df.median() if "mad" in methods else None
+
+    for col in numeric_df.columns:
+        values = numeric_df[col].to_numpy(dtype="float64", na_value=np.nan)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if "iqr" in methods:
+                q1, q3 = quartiles.loc[0.25, col], quartiles.loc[0.75, col]
+                lower_bound = q1 - IQR_MULTIPLIER * (q3 - q1)
+                upper_bound = q3 + IQR_MULTIPLIER * (q3 - q1)
+                index.add(col, "iqr", (values < lower_bound) | (values > upper_bound), lower_bound, upper_bound)
+            if "zscore" in methods:
+                mean, std = means[col], stds[col]
+                lower_bound, upper_bound = mean - Z_THRESHOLD * std, mean + Z_THRESHOLD * std
+                mask = np.zeros(len(values), dtype=bool) if not std > 0 else (
+                    (values < lower_bound) | (values > upper_bound))
+                index.add(col, "zscore", mask, lower_bound, upper_bound)
+            if "mad" in methods:
+                median = medians[col]
+                mad = np.nanmedian(np.abs(values - median))
+                spread = MAD_THRESHOLD * mad / 0.6745
+                lower_bound, upper_bound = median - spread, median + spread
+                mask = np.zeros(len(values), dtype=bool) if not mad > 0 else (
+                    (values < lower_bound) | (values > upper_bound))
+                index.add(col, "mad", mask, lower_bound, upper_bound)
+    return index
+
+
+def get_outlier_index(df, fingerprint=None, methods=DEFAULT_METHODS):
+    """
+    Cached build_outlier_index, keyed by dataset fingerprint, so reruns and
+    other sessions on the same data don't rescan it.
+    """
+    key = (fingerprint or dataset_fingerprint(df), tuple(methods))
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+    index = build_outlier_index(df, methods)
+    with _index_cache_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > OUTLIER_INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
+# Only questions that are nothing but a request for one column's outlier rows
+# take the index fast path. Any other word, number or comparison (a filter such
+# as "where gender is male" or "above 50", a second column, "excluding ...")
+# means the question asks for something else, so it goes to SQL.
+_OUTLIER_QUERY_RE = re.compile(r"\b(show|list|which|find|display|give|get|return|what are)\b.*\boutliers?\b",
+                               re.IGNORECASE)
+_OUTLIER_QUERY_WORDS = {
+    "show", "list", "which", "find", "display", "give", "get", "return", "what", "are", "is", "me", "us", "i",
+    "you", "can", "want", "to", "see", "please", "the", "a", "an", "all", "any", "there", "outlier", "outliers",
+    "outlying", "row", "rows", "record", "records", "entries", "cases", "observations", "data", "values", "value",
+    "for", "in", "of", "on", "by", "from", "column", "field", "using", "method", "rule", "detected", "based",
+}
+_METHOD_WORDS = {"z-score": "zscore", "zscore": "zscore", "z score": "zscore", "mad": "mad", "iqr": "iqr"}
+
+
+def _phrase_re(phrase):
+    return re.compile(r"\b" + re.escape(phrase) + r"\b")
+
+
+def match_outlier_query(question, index):
+    """
+    Recognises questions like "show me the outlier rows for age" and returns
+    (column, method) if the index can answer them directly, else None.
+    """
+    if not _OUTLIER_QUERY_RE.search(question):
+        return None
+    text = question.lower()
+    columns = []
+    # Longest names first so "final_score" wins over "score"; each match is
+    # cut out so it can't also count as a shorter name
+    for col in sorted(index.columns(), key=len, reverse=True):
+        name = col.lower()
+        for phrase in dict.fromkeys([name, name.replace("_", " ")]):
+            text, found = _phrase_re(phrase).subn(" ", text)
+            if found and col not in columns:
+                columns.append(col)
+    if len(columns) != 1:
+        return None
+    method = "iqr"
+    for word, word_method in _METHOD_WORDS.items():
+        text, found = _phrase_re(word).subn(" ", text)
+        if found:
+            method = word_method
+    if any(token not in _OUTLIER_QUERY_WORDS for token in re.findall(r"[^\s?.!,'\"]+", text)):
+        return None
+    col = columns[0]
+    return (col, method) if method in index.methods(col) else (col, "iqr")
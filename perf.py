@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import uuid
+import functools
+import threading
+import contextvars
+import tracemalloc
+from contextlib import contextmanager
+from collections import deque, defaultdict
+
+# In-process timings of the pipeline's hot paths (file read, cleaning,
+# profiling, SQL, plotting, report export). Each stage records its wall time
+# and, when memory tracking is on, its tracemalloc peak. Stages are grouped by
+# run (one Streamlit script run, one report job, ...) and can be exported in the
+# Chrome trace event format (chrome://tracing, Perfetto, speedscope).
+MAX_EVENTS = 5000
+
+_events = deque(maxlen=MAX_EVENTS)
+_events_lock = threading.Lock()
+# Peak memory tracking slows every allocation in the process down noticeably,
+# so it is a process-wide setting chosen at startup (DW_PERF_MEMORY=1) rather
+# than something one session can switch on or off under the others
+_memory_tracking = os.environ.get("DW_PERF_MEMORY") == "1"
+if _memory_tracking and not tracemalloc.is_tracing():
+    tracemalloc.start()
+_current_run = contextvars.ContextVar("perf_run", default=None)
+_local = threading.local()
+# Trace timestamps are relative to process start
+_origin = time.perf_counter()
+
+
+def begin_run(label=None):
+    """Starts a new run in the current context; stages recorded from here on belong to it."""
+    run_id = label or uuid.uuid4().hex[:12]
+    _current_run.set(run_id)
+    return run_id
+
+
+def current_run():
+    return _current_run.get()
+
+
+def memory_tracking():
+    """Whether stages record their peak memory (DW_PERF_MEMORY=1 at startup)."""
+    return _memory_tracking
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+@contextmanager
+def stage(name, **args):
+    """
+    Times the enclosed block as stage ``name``. Extra keyword arguments are
+    stored with the event (and shown as trace args).
+
+    Peak memory is the highest traced allocation above the level at entry.
+    tracemalloc has one process-wide peak, so nested stages hand their peaks
+    up to the enclosing stage; stages overlapping in other threads can inflate
+    each other's peaks.
+    """
+    track = _memory_tracking and tracemalloc.is_tracing()
+    stack = _stack()
+    frame = {"peak": 0}
+    if track:
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+        tracemalloc.reset_peak()
+        frame["base"] = current
+    stack.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        stack.pop()
+        event = {
+            "name": name,
+            "run": _current_run.get(),
+            "start": start - _origin,
+            "seconds": duration,
+            "thread": threading.get_ident(),
+            "thread_name": threading.current_thread().name,
+            "depth": len(stack),
+            "peak_mb": None,
+            "args": args,
+        }
+        if track and tracemalloc.is_tracing():
+            peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+            event["peak_mb"] = round(max(peak - frame["base"], 0) / (1024 * 1024), 2)
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+        with _events_lock:
+            _events.append(event)
+
+
+def timed(name):
+    """Decorator form of stage()."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_events(runs=None):
+    """Recorded events, optionally only those of the given run ids."""
+    with _events_lock:
+        events = list(_events)
+    if runs is not None:
+        runs = set(runs)
+        events = [event for event in events if event["run"] in runs]
+    return events
+
+
+def summarize(runs=None):
+    """Per stage-name totals for the given runs (all runs if None), slowest first."""
+    totals = defaultdict(lambda: {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "peak_mb": None})
+    for event in get_events(runs):
+        row = totals[event["name"]]
+        row["calls"] += 1
+        row["seconds"] += event["seconds"]
+        row["max_seconds"] = max(row["max_seconds"], event["seconds"])
+        if event["peak_mb"] is not None:
+            row["peak_mb"] = max(row["peak_mb"] or 0.0, event["peak_mb"])
+    rows = [{"stage": name, "calls": row["calls"], "total_s": round(row["seconds"], 3),
+             "max_s": round(row["max_seconds"], 3), "peak_mb": row["peak_mb"]}
+            for name, row in totals.items()]
+    return sorted(rows, key=lambda row: row["total_s"], reverse=True)
+
+
+def export_chrome_trace(runs=None, indent=None):
+    """Events as Chrome trace JSON ("complete" events, microsecond timestamps)."""
+    pid = os.getpid()
+    trace_events = []
+    thread_names = {}
+    for event in get_events(runs):
+        thread_names[event["thread"]] = event["thread_name"]
+        args = {key: str(value) for key, value in event["args"].items()}
+        args["run"] = event["run"]
+        if event["peak_mb"] is not None:
+            args["peak_mb"] = event["peak_mb"]
+        trace_events.append({
+            "name": event["name"],
+            "cat": "datawhisperer",
+            "ph": "X",
+            "ts": round(event["start"] * 1e6, 1),
+            "dur": round(event["seconds"] * 1e6, 1),
+            "pid": pid,
+            "tid": event["thread"],
+            "args": args,
+        })
+    for tid, thread_name in thread_names.items():
+        trace_events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                             "args": {"name": thread_name}})
+    return json.dumps({"traceEvents": trace_events, "displayTimeUnit": "ms"}, indent=indent)
+
+
+def reset():
+    with _events_lock:
+        _events.clear()
@@ -0,0 +1,128 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import get_gemini_response, cached_response, model_name
+from chat_session import compact_eda_context
+
+PRE_QUESTIONS = [
+    "What are the key trends in this dataset?",
+    "Do you notice any significant outliers?",
+    "How do the variables correlate?",
+    "What time-based patterns are present?",
+    "Any suggestions for further analysis?"
+]
+
+# Background LLM calls started once the EDA is ready. Results land in the
+# utils response cache, so a later click is served without calling the model.
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def insights_prompt(eda, data_set_name):
+    eda_summary = json.dumps(eda)
+    return f"""
+            You are a senior data analyst. Given the EDA results for {data_set_name}:
+
+            1. Identify key trends (minimum 3) with statistical evidence
+            2. Highlight actionable insights with clear business implications
+            3. Find anomalies requiring investigation
+            4. Suggest data-driven recommendations
+            5. Explain technical concepts in simple terms
+
+            EDA Analysis Results:
+            {eda_summary}
+
+            Specific requirements:
+            - Use bullet points with clear headers
+            - Prioritize business impact
+            - Include confidence levels where applicable
+            - use a around 8110 tokens if there is enough data we needed to provide indepth analysis so you needed to more tokens whereever needed
+            - Suggest next analysis steps
+            """
+
+
+def pre_question_prompt(eda, question):
+    return (
+        "Your role is a data analyst and answers user questions so try to be conversational "
+        "and here is Dataset context: " + compact_eda_context(eda) + "\nQuestion: " + question
+    )
+
+
+def _pending_key(prompt, type):
+    return (model_name(type), prompt)
+
+
+def _discard(key):
+    with _pending_lock:
+        _pending.pop(key, None)
+
+
+def _on_done(key, future):
+    # Successful answers are in the response cache now; failed ones stay
+    # pending so the error can be shown once by ready()/answer().
+    if not future.result().startswith("Error:"):
+        _discard(key)
+
+
+def prefetch(prompt, type="flash", call_site="prefetch"):
+    """
+    Starts answering ``prompt`` in the background unless it is already cached
+    or in flight. Returns the Future, or None if nothing had to be started.
+    """
+    if cached_response(prompt, type) is not None:
+        return None
+    key = _pending_key(prompt, type)
+    with _pending_lock:
+        if key in _pending:
+            return None
+        future = _executor.submit(get_gemini_response, prompt, type, call_site=call_site)
+        _pending[key] = future
+    future.add_done_callback(lambda future, key=key: _on_done(key, future))
+    return future
+
+
+def answer(prompt, type="flash", call_site="prefetch"):
+    """
+    Returns the response for ``prompt``: from the cache, by waiting on a
+    prefetch that is still running, or by calling the model directly.
+    """
+    key = _pending_key(prompt, type)
+    with _pending_lock:
+        future = _pending.get(key)
+    if future is not None:
+        result = future.result()
+        _discard(key)
+        return result
+    return get_gemini_response(prompt, type, call_site=call_site)
+
+
+def ready(prompt, type="flash", call_site="prefetch"):
+    """
+    Non-blocking variant of answer(): returns the response if it is already
+    available, otherwise makes sure it is being prefetched and returns None.
+    """
+    cached = cached_response(prompt, type)
+    if cached is not None:
+        return cached
+    key = _pending_key(prompt, type)
+    with _pending_lock:
+        future = _pending.get(key)
+    if future is None:
+        prefetch(prompt, type, call_site)
+        return None
+    if future.done():
+        _discard(key)
+        return future.result()
+    return None
+
+
+def start_prefetch(eda, data_set_name):
+    """Queues the AI Insights text and the answers to all pre-questions for this dataset."""
+    started = [prefetch(insights_prompt(eda, data_set_name), "lite", "insights")]
+    started += [prefetch(pre_question_prompt(eda, q), "lite", "pre_question") for q in PRE_QUESTIONS]
+    count = sum(future is not None for future in started)
+    if count:
+        logging.info(f"Prefetching {count} AI responses for {data_set_name}.")
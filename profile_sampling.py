@@ -0,0 +1,184 @@
+import os
+import math
+
+import numpy as np
+import pandas as pd
+
+from semantic_types import CATEGORY, detect_semantic_types, sample_values
+
+# Approximate profiles of large frames: the per-column statistics are computed
+# on a random sample of rows and reported with 95% confidence intervals, while
+# the exact profile is built in the background (see dataset_store).
+#
+# Samples are drawn uniformly without replacement, or stratified by one column
+# with each stratum sampled in proportion to its size. Proportional allocation
+# keeps the sample self-weighting, so both kinds are scaled up the same way;
+# the intervals are the simple-random-sampling ones, which are conservative
+# for a stratified sample. All intervals use the finite population correction.
+Z_95 = 1.959964
+CONFIDENCE = 0.95
+# Rows profiled in sampled mode, and the frame size from which it is used
+SAMPLE_SIZE = int(os.environ.get("DW_PROFILE_SAMPLE_SIZE", "100000"))
+SAMPLED_PROFILE_MIN_ROWS = int(os.environ.get("DW_SAMPLED_PROFILE_ROWS", "1000000"))
+# A column needs between 2 and this many distinct values to stratify by
+MAX_STRATA = 50
+
+
+def sample_positions(n_rows, size, strata=None, seed=0):
+    """
+    Sorted positions of ``size`` rows out of n_rows, uniform or, given
+    ``strata`` (one label per row), proportionally allocated per stratum.
+    """
+    rng = np.random.default_rng(seed)
+    if size >= n_rows:
+        return np.arange(n_rows)
+    if strata is None:
+        return np.sort(rng.choice(n_rows, size, replace=False))
+    # Missing labels form a stratum of their own
+    codes, _ = pd.factorize(strata, use_na_sentinel=False)
+    counts = np.bincount(codes)
+    quota = counts * size / n_rows
+    take = np.floor(quota).astype(int)
+    # Rows left over after rounding down go to the largest remainders
+    take[np.argsort(take - quota, kind="stable")[:size - take.sum()]] += 1
+    order = np.argsort(codes, kind="stable")
+    starts = np.cumsum(counts) - counts
+    picks = [order[start + rng.choice(count, k, replace=False)]
+             for start, count, k in zip(starts, counts, take) if k]
+    return np.sort(np.concatenate(picks))
+
+
+def default_strata(df):
+    """The category column with the fewest distinct values (at least two), or None."""
+    best, best_unique = None, MAX_STRATA + 1
+    for col, kind in detect_semantic_types(df).items():
+        if kind != CATEGORY:
+            continue
+        unique = sample_values(df[col]).nunique()
+        if 2 <= unique < best_unique:
+            best, best_unique = col, unique
+    return best
+
+
+def _fpc(n, population):
+    return math.sqrt((population - n) / (population - 1)) if population > n else 0.0
+
+
+def proportion_interval(successes, n, population, z=Z_95):
+    """Wilson score interval for the share of a population seen in a sample of n rows."""
+    if n == 0:
+        return 0.0, 1.0
+    p = successes / n
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator * _fpc(n, population)
+    return max(centre - half, 0.0), min(centre + half, 1.0)
+
+
+def mean_interval(values, population, z=Z_95):
+    """Normal interval for the mean of a population, from a sample of its values."""
+    n = len(values)
+    mean = float(np.mean(values))
+    if n < 2:
+        return mean, mean
+    half = z * float(np.std(values, ddof=1)) / math.sqrt(n) * _fpc(n, population)
+    return mean - half, mean + half
+
+
+def quantile_interval(sorted_values, q, z=Z_95):
+    """Distribution-free interval for the q-quantile, from the order statistics of a sorted sample."""
+    n = len(sorted_values)
+    half = z * math.sqrt(n * q * (1 - q))
+    low = min(max(int(math.floor(n * q - half)), 0), n - 1)
+    high = min(max(int(math.ceil(n * q + half)), 0), n - 1)
+    return float(sorted_values[low]), float(sorted_values[high])
+
+
+def correlation_interval(r, n, z=Z_95):
+    """Fisher z interval for a Pearson correlation measured on n rows."""
+    if n <= 3 or abs(r) >= 1:
+        return r, r
+    centre = math.atanh(r)
+    half = z / math.sqrt(n - 3)
+    return math.tanh(centre - half), math.tanh(centre + half)
+
+
+def _rounded(interval, digits=4):
+    return [round(float(bound), digits) for bound in interval]
+
+
+def _count_interval(count, n, population):
+    low, high = proportion_interval(count, n, population)
+    return [int(round(low * population)), int(round(high * population))]
+
+
+def annotate_sampled_profile(eda, sample, population, stratify_by=None, outlier_index=None):
+    """
+    Turns the profile of ``sample`` into an estimate for the whole frame
+    ``population``: counts are scaled up, confidence intervals are added next
+    to the statistics they bound (``*_ci`` keys) and eda["approximate"]
+    describes the sample. Outlier counts, bounds and box plot whiskers are
+    taken from outlier_index (built on the whole frame) when given, since they
+    are then known exactly; otherwise all three stay sample values.
+    """
+    n = len(sample)
+    population_rows = len(population)
+    scale = population_rows / n
+    eda["num_rows"] = population_rows
+    for col, info in eda["columns"].items():
+        info["missing_percent_ci"] = [round(bound * 100, 2) for bound in
+                                      proportion_interval(info["missing_count"], n, population_rows)]
+        info["missing_count"] = int(round(info["missing_count"] * scale))
+
+        if "numeric_stats" in info:
+            values = np.sort(sample[col].dropna().to_numpy(dtype=float))
+            if len(values):
+                present = len(values) * scale
+                info["numeric_stats_ci"] = {
+                    "mean": _rounded(mean_interval(values, present)),
+                    "median": _rounded(quantile_interval(values, 0.5)),
+                    "25%": _rounded(quantile_interval(values, 0.25)),
+                    "75%": _rounded(quantile_interval(values, 0.75)),
+                }
+            info["histogram"]["counts"] = [int(round(count * scale)) for count in info["histogram"]["counts"]]
+            if outlier_index is not None:
+                lower_bound, upper_bound = outlier_index.bounds[(col, "iqr")]
+                info["outlier_count"] = outlier_index.count(col, "iqr")
+                info["outlier_bounds"] = {"lower_bound": lower_bound, "upper_bound": upper_bound}
+                info["outliers"] = outlier_index.summary(col)
+                info["whiskers"] = outlier_index.whiskers(population[col])
+            else:
+                info["outlier_count_ci"] = _count_interval(info["outlier_count"], n, population_rows)
+                info["outlier_count"] = int(round(info["outlier_count"] * scale))
+                for summary in info["outliers"].values():
+                    summary["count"] = int(round(summary["count"] * scale))
+
+        if "top_categories" in info:
+            info["top_categories_ci"] = {value: _count_interval(count, n, population_rows)
+                                         for value, count in info["top_categories"].items()}
+            info["top_categories"] = {value: int(round(count * scale))
+                                      for value, count in info["top_categories"].items()}
+        if "monthly_distribution" in info:
+            info["monthly_distribution"] = {month: int(round(count * scale))
+                                            for month, count in info["monthly_distribution"].items()}
+
+    strong = eda.get("strong_correlations", {})
+    intervals = {}
+    for col1, row in eda.get("correlations", {}).items():
+        for col2, r in row.items():
+            key = f"{col2} vs {col1}"
+            if key in strong and r is not None:
+                pairs = int(sample[[col1, col2]].notna().all(axis=1).sum())
+                intervals[key] = _rounded(correlation_interval(r, pairs), 2)
+    eda["strong_correlations_ci"] = intervals
+
+    eda["approximate"] = {
+        "sample_rows": n,
+        "population_rows": population_rows,
+        "sampling": "stratified" if stratify_by is not None else "uniform",
+        "stratify_by": stratify_by,
+        "confidence": CONFIDENCE,
+        "note": ("Statistics are estimated from a random sample of rows; *_ci entries are "
+                 f"{CONFIDENCE:.0%} confidence intervals. Min, max, skewness and kurtosis are sample values."),
+    }
+    return eda
@@ -0,0 +1,132 @@
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import perf
+import figures
+
+# Report builds (PPT or HTML) run here, off the Streamlit script thread, so the session stays
+# usable while the LLM commentary and figure images are produced. Jobs live in
+# the process and are looked up by id, which the session keeps across reruns.
+MAX_CONCURRENT_REPORTS = 2
+MAX_FINISHED_JOBS = 20
+
+_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REPORTS, thread_name_prefix="report")
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def _update(job_id, **fields):
+    with _jobs_lock:
+        _jobs[job_id].update(fields)
+
+
+def _prune():
+    # Keeps the most recent finished jobs; unfinished ones are never dropped
+    with _jobs_lock:
+        finished = sorted((job["finished"], job_id) for job_id, job in _jobs.items()
+                          if job["status"] in (DONE, FAILED))
+        for _, job_id in finished[:-MAX_FINISHED_JOBS]:
+            del _jobs[job_id]
+
+
+REPORT_BUILDERS = {"pptx": "generate_eda_report_ppt", "html": "generate_eda_report_html"}
+
+
+def report_run_id(job_id):
+    """perf run id the job's stages are recorded under."""
+    return f"report-{job_id[:8]}"
+
+
+def _run(job_id, eda, df, fingerprint, dataset_name, kind, report_options):
+    # python-pptx is only needed once a report is requested
+    import generate_report
+    build_report = getattr(generate_report, REPORT_BUILDERS[kind])
+
+    def on_progress(stage, done, total):
+        _update(job_id, stage=stage, **{f"{stage}_done": done, f"{stage}_total": total})
+
+    perf.begin_run(report_run_id(job_id))
+    _update(job_id, status=RUNNING, stage="charts", started=time.time())
+    try:
+        report_figs = figures.report_figures(fingerprint, df, eda)
+        report_buffer = build_report(
+            eda_metadata=eda,
+            df=df,
+            numeric_figs=report_figs["numeric"],
+            categorical_figs=report_figs["categorical"],
+            correlation_figs=report_figs["correlation"],
+            time_series_figs=report_figs["time_series"],
+            outlier_figs=report_figs["outlier"],
+            dataset_name=dataset_name,
+            progress_callback=on_progress,
+            **report_options,
+        )
+        result = report_buffer.getvalue()
+        _update(job_id, status=DONE, result=result, size_bytes=len(result), finished=time.time())
+    except Exception as e:
+        logging.exception(f"Report job {job_id} failed")
+        _update(job_id, status=FAILED, error=str(e), finished=time.time())
+    _prune()
+
+
+def submit_report(eda, df, fingerprint, dataset_name, file_name="EDA_Full_Report.pptx", label="Download PPT",
+                  report_options=None, kind="pptx"):
+    """
+    Queues a report build and returns its job id. kind is "pptx" or "html";
+    report_options are passed on to the builder (for the PPT: image_format,
+    dpi, max_dimension).
+    """
+    job_id = uuid.uuid4().hex
+    with _jobs_lock:
+        _jobs[job_id] = {
+            "id": job_id,
+            "status": QUEUED,
+            "stage": None,
+            "dataset_name": dataset_name,
+            "kind": kind,
+            "file_name": file_name,
+            "label": label,
+            "insights_done": 0, "insights_total": 1,
+            "figures_done": 0, "figures_total": 0,
+            "sections_done": 0, "sections_total": 0,
+            "submitted": time.time(),
+            "started": None,
+            "finished": None,
+            "result": None,
+            "size_bytes": None,
+            "error": None,
+        }
+    _executor.submit(_run, job_id, eda, df, fingerprint, dataset_name, kind, report_options or {})
+    return job_id
+
+
+def get_job(job_id):
+    """Snapshot of the job's state, or None if it is unknown (e.g. pruned or another process)."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+
+def is_finished(job):
+    return job is not None and job["status"] in (DONE, FAILED)
+
+
+def progress_fraction(job):
+    """Overall progress in [0, 1]: commentary, then figures, then slides."""
+    weights = {"insights": 0.4, "figures": 0.4, "sections": 0.2}
+    fraction = 0.0
+    for stage, weight in weights.items():
+        total = job[f"{stage}_total"]
+        if total:
+            fraction += weight * job[f"{stage}_done"] / total
+        elif job["stage"] == "sections" or is_finished(job):
+            fraction += weight
+    return min(fraction, 1.0)
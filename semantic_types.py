@@ -0,0 +1,118 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Cheap semantic typing of columns from a sample of their values, so cleaning
+# and profiling can skip work that is expensive and meaningless for a column's
+# kind: a mode() or value_counts() over unique IDs or emails, a yes/no check
+# that lowercases every value of a column with thousands of distinct values.
+#
+# Types are decided on at most SAMPLE_SIZE non-missing values. Routing that
+# only skips work is exact where it matters: a column whose sample already
+# holds values other than yes/no (or true/false) can't be a yes/no column.
+
+ID = "id"
+FREE_TEXT = "free_text"
+CATEGORY = "category"
+BOOLEAN = "boolean"
+NUMERIC_STRING = "numeric_string"
+NUMERIC = "numeric"
+DATETIME = "datetime"
+
+SAMPLE_SIZE = 5000
+# A text column this unique in its sample is an identifier or free text...
+ID_UNIQUE_RATIO = 0.95
+# ...as long as the sample is big enough to tell
+MIN_ID_SAMPLE = 100
+# Values averaging this many words are free text rather than labels
+FREE_TEXT_MIN_WORDS = 5
+# Share of sampled values that must parse as numbers for numeric_string
+NUMERIC_STRING_RATIO = 0.95
+# Placeholder text that stands for a missing value in a numeric-string column
+NULL_TOKENS = {"", "n/a", "na", "nan", "null", "none", "-", "--", "?"}
+
+BOOLEAN_VALUE_SETS = [{"yes", "no"}, {"true", "false"}]
+_LEADING_ZERO = re.compile(r"^0\d")
+
+
+def sample_values(series, size=SAMPLE_SIZE):
+    """
+    The non-missing values among ``size`` randomly chosen rows of series.
+    Rows are sampled before dropping missing values, since a full-column
+    isnull() on text costs more than the rest of the detection. The seed is
+    fixed, so a dataset always gets the same types.
+    """
+    if len(series) > size:
+        positions = np.random.default_rng(0).choice(len(series), size, replace=False)
+        series = series.iloc[np.sort(positions)]
+    return series.dropna()
+
+
+def _is_text(series):
+    return (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+            or isinstance(series.dtype, pd.CategoricalDtype))
+
+
+def detect_semantic_type(series):
+    """One of ID, FREE_TEXT, CATEGORY, BOOLEAN, NUMERIC_STRING, NUMERIC or DATETIME."""
+    if pd.api.types.is_bool_dtype(series):
+        return BOOLEAN
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return DATETIME
+    if pd.api.types.is_numeric_dtype(series):
+        # Cleaned yes/no columns come back as 0/1
+        sample = sample_values(series)
+        if len(sample) and set(np.unique(sample)) <= {0, 1}:
+            return BOOLEAN
+        return NUMERIC
+    if not _is_text(series):
+        return CATEGORY
+
+    sample = sample_values(series).astype(str)
+    if sample.empty:
+        return CATEGORY
+    distinct = pd.unique(sample)
+    normalized = {value.strip().lower() for value in distinct}
+    # A rare "no" may be missing from the sample, so any subset of a yes/no
+    # pair counts; cleaning then checks the full column
+    if any(normalized <= values for values in BOOLEAN_VALUE_SETS):
+        return BOOLEAN
+    if not any(_LEADING_ZERO.match(value.strip()) for value in distinct[:1000]):
+        values = sample[~sample.str.strip().str.lower().isin(NULL_TOKENS)]
+        if len(values) and pd.to_numeric(values, errors="coerce").notna().mean() >= NUMERIC_STRING_RATIO:
+            return NUMERIC_STRING
+
+    words = sample.str.split().str.len().mean()
+    if len(distinct) / len(sample) >= ID_UNIQUE_RATIO and len(sample) >= MIN_ID_SAMPLE:
+        return FREE_TEXT if words >= FREE_TEXT_MIN_WORDS else ID
+    if words >= FREE_TEXT_MIN_WORDS:
+        return FREE_TEXT
+    return CATEGORY
+
+
+def detect_semantic_types(df):
+    """{column: semantic type} for every column of df."""
+    return {col: detect_semantic_type(df[col]) for col in df.columns}
+
+
+def describe_sample(series):
+    """
+    Stand-in for top_categories on ID and free-text columns: estimated
+    uniqueness, typical length and a few example values, all from the sample.
+    """
+    sample = sample_values(series).astype(str)
+    if sample.empty:
+        return {"sample_size": 0}
+    return {
+        "sample_size": int(len(sample)),
+        "sample_unique_ratio": round(sample.nunique() / len(sample), 3),
+        "avg_length": round(float(sample.str.len().mean()), 1),
+        "examples": sample.head(3).tolist(),
+    }
+
+
+def is_categorical(details):
+    """Whether a profiled column (an eda["columns"] entry) gets category charts."""
+    return (details.get("dtype", "").lower() in ("object", "string", "category")
+            and details.get("semantic_type") not in (ID, FREE_TEXT))
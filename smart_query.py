@@ -1,16 +1,15 @@
-import duckdb
 import pandas as pd
 import json
 import re
 import os
-import deepnote_toolkit
 
 from difflib import get_close_matches
 from utils import get_gemini_response
-
-deepnote_toolkit.set_integration_env()
+import arrow_backend
+import perf
 
 
+@perf.timed("sql_generate")
 def generate_sql_query(user_input: str, eda_metadata: dict) -> str:
     """
     Generate a valid SQL query based on the provided EDA metadata and user natural language query.
@@ -41,7 +40,7 @@ def generate_sql_query(user_input: str, eda_metadata: dict) -> str:
         "If no valid query can be generated, output: SELECT * FROM dataset WHERE 1=0;\n"
     )
 
-    raw_output = get_gemini_response(prompt, "thinking")
+    raw_output = get_gemini_response(prompt, "thinking", call_site="generate_sql_query")
 
     # Remove any backticks or triple backticks
     cleaned_output = re.sub(r"(```sql|```|\`)", "", raw_output, flags=re.IGNORECASE).strip()
@@ -81,20 +80,34 @@ def validate_and_fix_query(sql_query: str, eda_metadata: dict) -> str:
                 fixed_query = re.sub(r'\b' + re.escape(col) + r'\b', closest_match[0], fixed_query, flags=re.IGNORECASE)
 
     return fixed_query
-def execute_sql_on_df(df: pd.DataFrame, sql_query: str, eda_metadata: dict) -> pd.DataFrame:
+
+
+@perf.timed("sql_execute")
+def execute_sql_on_df(df: pd.DataFrame, sql_query: str, eda_metadata: dict, raise_errors: bool = False) -> pd.DataFrame:
     """
     Executes the given SQL query on the provided DataFrame using DuckDB.
     - First, validates and fixes column names in the query.
     - Registers the DataFrame as a table named 'dataset'.
-    Returns the result as a Pandas DataFrame.
+    Returns the result as a Pandas DataFrame. In Arrow-backed mode (see
+    arrow_backend) the data goes to DuckDB and back as Arrow tables.
+    A failing query gives an empty DataFrame, or raises if raise_errors is set.
     """
     try:
+        import duckdb
+
         fixed_query = validate_and_fix_query(sql_query, eda_metadata)
-        con = duckdb.connect(database=':memory:')
-        con.register("dataset", df)
-        result_df = con.execute(fixed_query).df()
+        # The query only needs the registered frame; keep it off the file system
+        con = duckdb.connect(database=':memory:', config={'enable_external_access': False})
+        if arrow_backend.enabled():
+            con.register("dataset", arrow_backend.to_arrow(df))
+            result_df = arrow_backend.from_arrow(con.execute(fixed_query).arrow())
+        else:
+            con.register("dataset", df)
+            result_df = con.execute(fixed_query).df()
         con.close()
         return result_df
     except Exception as e:
+        if raise_errors:
+            raise
         print("Error executing SQL query:", e)
         return pd.DataFrame()
@@ -0,0 +1,156 @@
+"""
+Synthetic datasets for benchmarking, modelled on the bundled sample files.
+
+"students" mirrors Students_Grading_Dataset.csv (ids, names, emails, scores,
+grades, Yes/No flags) and "lung" mirrors lung_disease_data.csv (a few numeric
+and categorical clinical columns). Frames come out "raw", the way
+read_and_validate_file returns them: original column names, missing values and
+some duplicate rows, so clean_data has its usual work to do.
+
+    python synthetic_data.py --rows 1000000 --profile students -o students_1m.csv
+"""
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+
+FIRST_NAMES = ["Omar", "Maria", "Ahmed", "John", "Liam", "Sara", "Emma", "Ali", "Jane", "Noah"]
+LAST_NAMES = ["Williams", "Brown", "Jones", "Smith", "Davis", "Johnson", "Garcia", "Kim", "Lee", "Patel"]
+
+# (column, kind, parameters). Kinds: id, first_name, last_name, email,
+# category (values[, weights]), int (low, high), float (mean, std, decimals,
+# low, high), flag (Yes/No with P(Yes)).
+PROFILES = {
+    "students": [
+        ("Student_ID", "id", {"prefix": "S", "start": 1000}),
+        ("First_Name", "first_name", {}),
+        ("Last_Name", "last_name", {}),
+        ("Email", "email", {}),
+        ("Gender", "category", {"values": ["Male", "Female"]}),
+        ("Age", "int", {"low": 18, "high": 24}),
+        ("Department", "category", {"values": ["Engineering", "Business", "Mathematics", "CS"]}),
+        ("Attendance (%)", "float", {"mean": 75, "std": 14, "decimals": 2, "low": 50, "high": 100}),
+        ("Midterm_Score", "float", {"mean": 70, "std": 17, "decimals": 2, "low": 40, "high": 100}),
+        ("Final_Score", "float", {"mean": 70, "std": 17, "decimals": 2, "low": 40, "high": 100}),
+        ("Assignments_Avg", "float", {"mean": 75, "std": 14, "decimals": 2, "low": 50, "high": 100}),
+        ("Quizzes_Avg", "float", {"mean": 75, "std": 14, "decimals": 2, "low": 50, "high": 100}),
+        ("Participation_Score", "float", {"mean": 5, "std": 2.9, "decimals": 2, "low": 0, "high": 10}),
+        ("Projects_Score", "float", {"mean": 75, "std": 14, "decimals": 2, "low": 50, "high": 100}),
+        ("Total_Score", "float", {"mean": 75, "std": 14, "decimals": 2, "low": 50, "high": 100}),
+        ("Grade", "category", {"values": ["A", "B", "C", "D", "F"], "weights": [0.3, 0.18, 0.16, 0.16, 0.2]}),
+        ("Study_Hours_per_Week", "float", {"mean": 17.5, "std": 7, "decimals": 1, "low": 5, "high": 30}),
+        ("Extracurricular_Activities", "flag", {"p": 0.3}),
+        ("Internet_Access_at_Home", "flag", {"p": 0.9}),
+        ("Parent_Education_Level", "category", {"values": ["None", "High School", "Bachelor's", "Master's", "PhD"]}),
+        ("Family_Income_Level", "category", {"values": ["Low", "Medium", "High"], "weights": [0.4, 0.4, 0.2]}),
+        ("Stress_Level (1-10)", "int", {"low": 1, "high": 10}),
+        ("Sleep_Hours_per_Night", "float", {"mean": 6.5, "std": 1.4, "decimals": 1, "low": 4, "high": 9}),
+    ],
+    "lung": [
+        ("Age", "float", {"mean": 54, "std": 20, "decimals": 0, "low": 18, "high": 89}),
+        ("Gender", "category", {"values": ["Male", "Female"]}),
+        ("Smoking Status", "flag", {"p": 0.5}),
+        ("Lung Capacity", "float", {"mean": 3.5, "std": 1.2, "decimals": 2, "low": 1, "high": 6}),
+        ("Disease Type", "category", {"values": ["COPD", "Bronchitis", "Asthma", "Lung Cancer", "Pneumonia"]}),
+        ("Treatment Type", "category", {"values": ["Therapy", "Surgery", "Medication"]}),
+        ("Hospital Visits", "float", {"mean": 8, "std": 4.3, "decimals": 0, "low": 1, "high": 15}),
+        ("Recovered", "flag", {"p": 0.5}),
+    ],
+}
+
+
+def _column(kind, params, rows, rng):
+    if kind == "id":
+        return np.char.add(params["prefix"], (np.arange(rows) + params["start"]).astype(str))
+    if kind == "first_name":
+        return rng.choice(FIRST_NAMES, rows)
+    if kind == "last_name":
+        return rng.choice(LAST_NAMES, rows)
+    if kind == "email":
+        return np.char.add(np.char.add("student", np.arange(rows).astype(str)), "@university.com")
+    if kind == "category":
+        weights = params.get("weights")
+        return rng.choice(params["values"], rows, p=weights)
+    if kind == "int":
+        return rng.integers(params["low"], params["high"] + 1, rows)
+    if kind == "float":
+        values = rng.normal(params["mean"], params["std"], rows).clip(params["low"], params["high"])
+        return values.round(params["decimals"])
+    if kind == "flag":
+        return np.where(rng.random(rows) < params["p"], "Yes", "No")
+    raise ValueError(f"Unknown column kind {kind!r}")
+
+
+def generate_dataset(rows, profile="students", missing_rate=0.02, duplicate_rate=0.01,
+                     extra_numeric=0, extra_categorical=0, cardinality=20, date_columns=0, seed=0):
+    """
+    A raw synthetic frame of ``rows`` rows following ``profile``.
+
+    - missing_rate: share of cells blanked in every column except ids.
+    - duplicate_rate: share of rows that repeat an earlier row.
+    - extra_numeric / extra_categorical: additional Metric_<n> / Category_<n>
+      columns, the categorical ones drawing from ``cardinality`` distinct values.
+    - date_columns: number of Date_<n> columns, as ISO date strings the way
+      they arrive from a CSV.
+    """
+    rng = np.random.default_rng(seed)
+    data = {}
+    for name, kind, params in PROFILES[profile]:
+        data[name] = _column(kind, params, rows, rng)
+    for i in range(extra_numeric):
+        data[f"Metric_{i + 1}"] = rng.lognormal(3, 1, rows).round(3)
+    for i in range(extra_categorical):
+        data[f"Category_{i + 1}"] = np.char.add("level_", rng.integers(0, cardinality, rows).astype(str))
+    for i in range(date_columns):
+        days = rng.integers(0, 3 * 365, rows)
+        data[f"Date_{i + 1}"] = (np.datetime64("2022-01-01") + days).astype(str)
+    df = pd.DataFrame(data)
+
+    if missing_rate > 0:
+        id_columns = {name for name, kind, _ in PROFILES[profile] if kind in ("id", "email")}
+        for col in df.columns:
+            if col not in id_columns:
+                mask = rng.random(rows) < missing_rate
+                if mask.any():
+                    df[col] = df[col].mask(mask)
+
+    duplicates = int(rows * duplicate_rate)
+    if duplicates:
+        # Replace the last rows with copies of random earlier ones
+        source = rng.integers(0, rows - duplicates, duplicates)
+        df = pd.concat([df.iloc[:rows - duplicates], df.iloc[source]], ignore_index=True)
+    return df
+
+
+def write_dataset(df, path):
+    if path.lower().endswith(".xlsx"):
+        df.to_excel(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic dataset modelled on the sample files.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="students")
+    parser.add_argument("--missing-rate", type=float, default=0.02)
+    parser.add_argument("--duplicate-rate", type=float, default=0.01)
+    parser.add_argument("--extra-numeric", type=int, default=0)
+    parser.add_argument("--extra-categorical", type=int, default=0)
+    parser.add_argument("--cardinality", type=int, default=20)
+    parser.add_argument("--date-columns", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="synthetic.csv", help="A .csv or .xlsx path.")
+    args = parser.parse_args(argv)
+
+    df = generate_dataset(args.rows, args.profile, args.missing_rate, args.duplicate_rate, args.extra_numeric,
+                          args.extra_categorical, args.cardinality, args.date_columns, args.seed)
+    write_dataset(df, args.output)
+    print(f"Wrote {len(df):,} rows x {df.shape[1]} columns to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import json
+import time
+import threading
+from collections import deque
+
+# In-process record of every LLM call. Recent calls are kept for inspection;
+# per (call_site, model) aggregates are kept for the lifetime of the process so
+# the Prometheus counters stay monotonic.
+MAX_RECORDS = 1000
+METRIC_PREFIX = "datawhisperer_llm"
+
+_records = deque(maxlen=MAX_RECORDS)
+_aggregates = {}
+_lock = threading.Lock()
+
+
+def _empty_aggregate():
+    return {
+        "calls": 0,
+        "errors": 0,
+        "cache_hits": 0,
+        "latency_seconds": 0.0,
+        "max_latency_seconds": 0.0,
+        "prompt_chars": 0,
+        "response_chars": 0,
+        "prompt_tokens": 0,
+        "response_tokens": 0,
+    }
+
+
+def record_llm_call(call_site, model, prompt_chars, response_chars, latency_seconds,
+                    prompt_tokens=None, response_tokens=None, error=None, cache_hit=False):
+    """
+    Records one LLM call. Token counts come from the API's usage metadata when
+    available and are otherwise estimated from the character counts.
+    """
+    record = {
+        "timestamp": time.time(),
+        "call_site": call_site,
+        "model": model,
+        "prompt_chars": prompt_chars,
+        "response_chars": response_chars,
+        "prompt_tokens": prompt_tokens if prompt_tokens is not None else prompt_chars // 4,
+        "response_tokens": response_tokens if response_tokens is not None else response_chars // 4,
+        "tokens_estimated": prompt_tokens is None,
+        "latency_seconds": round(latency_seconds, 4),
+        "error": error,
+        "cache_hit": cache_hit,
+    }
+    with _lock:
+        _records.append(record)
+        agg = _aggregates.setdefault((call_site, model), _empty_aggregate())
+        agg["calls"] += 1
+        agg["errors"] += error is not None
+        agg["cache_hits"] += cache_hit
+        agg["latency_seconds"] += latency_seconds
+        agg["max_latency_seconds"] = max(agg["max_latency_seconds"], latency_seconds)
+        agg["prompt_chars"] += prompt_chars
+        agg["response_chars"] += response_chars
+        # Cache hits don't reach the API, so they don't count towards spend
+        if not cache_hit:
+            agg["prompt_tokens"] += record["prompt_tokens"]
+            agg["response_tokens"] += record["response_tokens"]
+    return record
+
+
+def usage_tokens(response):
+    """Returns (prompt_tokens, response_tokens) from a Gemini response, or (None, None)."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None, None
+    return getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None)
+
+
+def get_records():
+    with _lock:
+        return list(_records)
+
+
+def summarize():
+    """Per call-site summary, slowest total latency first."""
+    with _lock:
+        items = [(key, dict(agg)) for key, agg in _aggregates.items()]
+    rows = []
+    for (call_site, model), agg in items:
+        calls = agg["calls"]
+        rows.append({
+            "call_site": call_site,
+            "model": model,
+            "calls": calls,
+            "errors": agg["errors"],
+            "cache_hit_rate": round(agg["cache_hits"] / calls, 3) if calls else 0.0,
+            "total_latency_s": round(agg["latency_seconds"], 2),
+            "avg_latency_s": round(agg["latency_seconds"] / calls, 2) if calls else 0.0,
+            "max_latency_s": round(agg["max_latency_seconds"], 2),
+            "prompt_tokens": agg["prompt_tokens"],
+            "response_tokens": agg["response_tokens"],
+        })
+    return sorted(rows, key=lambda row: row["total_latency_s"], reverse=True)
+
+
+def export_json(indent=2):
+    return json.dumps({"summary": summarize(), "records": get_records()}, indent=indent)
+
+
+def export_prometheus():
+    """Aggregates in the Prometheus text exposition format."""
+    metrics = [
+        ("calls_total", "counter", "LLM calls made.", "calls"),
+        ("errors_total", "counter", "LLM calls that failed.", "errors"),
+        ("cache_hits_total", "counter", "LLM calls served from the response cache.", "cache_hits"),
+        ("latency_seconds_sum", "counter", "Total LLM call latency in seconds.", "latency_seconds"),
+        ("latency_seconds_max", "gauge", "Slowest LLM call in seconds.", "max_latency_seconds"),
+        ("prompt_tokens_total", "counter", "Prompt tokens sent (estimated when not reported).", "prompt_tokens"),
+        ("response_tokens_total", "counter", "Response tokens received (estimated when not reported).", "response_tokens"),
+    ]
+    with _lock:
+        items = sorted((key, dict(agg)) for key, agg in _aggregates.items())
+
+    lines = []
+    for suffix, metric_type, help_text, field in metrics:
+        name = f"{METRIC_PREFIX}_{suffix}"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for (call_site, model), agg in items:
+            lines.append(f'{name}{{call_site="{call_site}",model="{model}"}} {agg[field]}')
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _records.clear()
+        _aggregates.clear()
@@ -1,23 +1,143 @@
 import os
-import google.generativeai as genai
-import deepnote_toolkit
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
 
-deepnote_toolkit.set_integration_env()
+from telemetry import record_llm_call, usage_tokens
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-thinking_model = genai.GenerativeModel("gemini-2.0-flash-thinking-exp")
-lite = genai.GenerativeModel("gemini-2.0-flash-lite")
-model = genai.GenerativeModel("gemini-2.0-flash")
+# Model clients are created on first use so that importing this module (and
+# everything that imports it) does not pull in google.generativeai.
+MODEL_NAMES = {
+    "thinking": "gemini-2.0-flash-thinking-exp",
+    "lite": "gemini-2.0-flash-lite",
+    "flash": "gemini-2.0-flash",
+}
 
+_models = {}
+_models_lock = threading.Lock()
+_integration_env_ready = False
+_genai = None
 
-def get_gemini_response(prompt, type):
+# Process-wide LRU of successful responses, keyed by model type and prompt hash
+RESPONSE_CACHE_SIZE = 256
+_response_cache = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+
+def set_integration_env():
+    """
+    Loads the Deepnote integration environment (GEMINI_API_KEY etc.) once per process.
+    Outside Deepnote the toolkit is not installed and the key is read from the
+    environment as usual.
+    """
+    global _integration_env_ready
+    if _integration_env_ready:
+        return
+    try:
+        import deepnote_toolkit
+        deepnote_toolkit.set_integration_env()
+    except ImportError:
+        logging.info("deepnote_toolkit not installed, using GEMINI_API_KEY from the environment.")
+    _integration_env_ready = True
+
+
+def get_genai():
+    """Imports and configures google.generativeai on the first call."""
+    global _genai
+    if _genai is None:
+        set_integration_env()
+        import google.generativeai as genai
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        _genai = genai
+    return _genai
+
+
+def model_name(type):
+    """Maps a model type ("thinking", "lite" or "flash") to the Gemini model name."""
+    return MODEL_NAMES.get(type, MODEL_NAMES["flash"])
+
+
+def get_model(type):
+    """
+    Returns the Gemini client for the given type, creating it on first use.
+    Unknown types fall back to "flash".
+    """
+    name = model_name(type)
+    model = _models.get(name)
+    if model is not None:
+        return model
+    with _models_lock:
+        if name not in _models:
+            _models[name] = get_genai().GenerativeModel(name)
+        return _models[name]
+
+
+def json_fingerprint(obj):
+    """Stable short hash of a JSON-serialisable object (e.g. an EDA summary)."""
+    payload = json.dumps(obj, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()[:16]
+
+
+def _response_cache_key(prompt, type):
+    return (model_name(type), hashlib.sha1(str(prompt).encode("utf-8")).hexdigest())
+
+
+def cached_response(prompt, type="flash"):
+    """Returns the cached response for this prompt, or None if it hasn't been answered yet."""
+    key = _response_cache_key(prompt, type)
+    with _response_cache_lock:
+        if key in _response_cache:
+            _response_cache.move_to_end(key)
+            return _response_cache[key]
+    return None
+
+
+def dataset_fingerprint(df, row_hashes=None):
+    """
+    Content hash of a DataFrame (values, index, column names and dtypes), used
+    to key caches that must survive reruns and be shared between sessions.
+    row_hashes are df's duplicate_index.row_hashes, if already computed.
+    """
+    import pandas as pd
+    from duplicate_index import row_hashes as compute_row_hashes
+
+    if row_hashes is None:
+        row_hashes = compute_row_hashes(df)
+    digest = hashlib.sha1(str([(str(c), str(t)) for c, t in df.dtypes.items()]).encode("utf-8"))
+    digest.update(row_hashes.tobytes())
+    digest.update(pd.util.hash_pandas_object(df.index).values.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def get_gemini_response(prompt, type="flash", use_cache=True, call_site="unknown"):
+    """
+    Sends a single-shot prompt to Gemini and returns the stripped text, or
+    "Error: ..." on failure. Every call is recorded in telemetry under call_site.
+    """
+    prompt_chars = len(str(prompt))
+    start = time.perf_counter()
+    if use_cache:
+        cached = cached_response(prompt, type)
+        if cached is not None:
+            record_llm_call(call_site, model_name(type), prompt_chars, len(cached),
+                            time.perf_counter() - start, cache_hit=True)
+            return cached
     try:
-        if type == "thinking":
-            response = thinking_model.generate_content(prompt)
-        elif type == "lite":
-            response = lite.generate_content(prompt)
-        else:
-            response = model.generate_content(prompt)
-        return response.text.strip()
+        response = get_model(type).generate_content(prompt)
+        text = response.text.strip()
     except Exception as e:
+        record_llm_call(call_site, model_name(type), prompt_chars, 0,
+                        time.perf_counter() - start, error=str(e))
         return f"Error: {e}"
+    prompt_tokens, response_tokens = usage_tokens(response)
+    record_llm_call(call_site, model_name(type), prompt_chars, len(text), time.perf_counter() - start,
+                    prompt_tokens=prompt_tokens, response_tokens=response_tokens)
+    if use_cache:
+        with _response_cache_lock:
+            _response_cache[_response_cache_key(prompt, type)] = text
+            while len(_response_cache) > RESPONSE_CACHE_SIZE:
+                _response_cache.popitem(last=False)
+    return text